@@ -0,0 +1,108 @@
+"""Всплеск комментариев: транзакция на запрос против группового коммита.
+
+Каждый режим запускается в отдельном процессе на новом файле БД;
+``N`` потоков-комментаторов одновременно пишут по ``M`` комментариев.
+
+Запуск: ``python benchmarks/comment_queue.py [потоки] [комментарии]``.
+"""
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from common import setup_django
+
+
+def run(mode, commenters, per_commenter):
+    db_path = Path(tempfile.mkdtemp()) / 'bench.sqlite3'
+    # Короткий busy_timeout, как у нагруженного сервера с таймаутами.
+    setup_django(
+        db_path,
+        COMMENT_GROUP_COMMIT=(mode == 'group'),
+        SQLITE_PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+                        'busy_timeout': 200},
+    )
+    from django.contrib.auth import get_user_model
+    from contextlib import nullcontext
+
+    from django.db import DatabaseError, connection, transaction
+
+    from blog.comments import save_comment
+    from blog.models import Comment, Post
+
+    user = get_user_model().objects.create(username='bench')
+    posts = Post.objects.bulk_create(
+        Post(title=f'Пост {i}', text='Текст', author=user) for i in range(20)
+    )
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    connection.close()
+
+    timings, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(commenters)
+
+    def commenter(index):
+        local, failed = [], 0
+        barrier.wait()
+        for i in range(per_commenter):
+            comment = Comment(
+                text='Комментарий', author=user,
+                post_id=post_ids[(index + i) % len(posts)],
+            )
+            start = time.perf_counter()
+            # Без группового коммита запрос пишет в своей транзакции.
+            atomic = (
+                nullcontext() if mode == 'group' else transaction.atomic()
+            )
+            try:
+                with atomic:
+                    save_comment(comment)
+            except DatabaseError:
+                failed += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            timings.extend(local)
+            errors.append(failed)
+        connection.close()
+
+    threads = [
+        threading.Thread(target=commenter, args=(i,))
+        for i in range(commenters)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+
+    def percentile(share):
+        return timings[int(len(timings) * share)] * 1000
+
+    stored = Comment.objects.count()
+    counted = sum(Post.objects.values_list('comment_count', flat=True))
+    print(f'{mode}: {len(timings) / elapsed:.0f} comments/s, '
+          f'p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms, '
+          f'p99 {percentile(0.99):.1f} ms, errors {sum(errors)}, '
+          f'stored {stored}, counters {counted}')
+
+
+def main():
+    commenters = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    per_commenter = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    for mode in ('per-request', 'group'):
+        subprocess.run([
+            sys.executable, __file__, '--mode', mode,
+            str(commenters), str(per_commenter),
+        ], check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--mode']:
+        run(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,49 @@
+"""Общая подготовка Django для скриптов бенчмарков.
+
+Скрипты запускаются из корня репозитория: ``python benchmarks/<name>.py``.
+"""
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = ROOT_DIR / 'blogicum'
+
+
+def setup_django(db_name=':memory:', **overrides):
+    """Настроить Django на чистой базе ``db_name`` с применёнными миграциями.
+
+    ``overrides`` заменяют одноимённые настройки проекта.
+    """
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = str(db_name)
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0, interactive=False)
+
+
+def measure(func, repeat=2000):
+    """Вернуть медиану и p95 времени вызова ``func`` в микросекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def report(title, rows):
+    """Напечатать таблицу ``(название, медиана, p95)``."""
+    print(title)
+    for name, median, p95 in rows:
+        print(f'  {name:<40} median {median:9.1f} us   p95 {p95:9.1f} us')
@@ -0,0 +1,45 @@
+"""Рендеринг форм: ``form.as_p()`` против ``bootstrap_form`` с планом.
+
+Запуск: ``python benchmarks/forms.py``.
+"""
+from common import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from blog.forms import CommentForm, PostForm, UserProfileForm
+    from blog.models import Category, Location
+    from django_bootstrap5.templatetags.django_bootstrap5 import (
+        bootstrap_button, bootstrap_form)
+
+    for i in range(20):
+        Category.objects.create(
+            title=f'Категория {i}', description='-', slug=f'cat-{i}'
+        )
+        Location.objects.create(name=f'Место {i}')
+    user = get_user_model().objects.create(username='bench')
+
+    cases = {
+        'PostForm': lambda: PostForm(),
+        'PostForm (invalid POST)': lambda: PostForm({'title': ''}),
+        'CommentForm': lambda: CommentForm(),
+        'UserProfileForm': lambda: UserProfileForm(instance=user),
+    }
+    for name, make_form in cases.items():
+        form = make_form()
+        form.is_bound and form.is_valid()
+        report(name, [
+            ('before: form.as_p()', *measure(form.as_p)),
+            ('after: bootstrap_form', *measure(lambda: bootstrap_form(form))),
+        ])
+    report('bootstrap_button', [
+        ('after: cached button', *measure(
+            lambda: bootstrap_button(content='Отправить'), repeat=20000
+        )),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Конкурентные чтение и запись в SQLite: стандартные прагмы против профиля.
+
+Каждый режим запускается в отдельном процессе на новом файле БД:
+читатели листают ленту, писатели добавляют комментарии.
+
+Запуск::
+
+    python benchmarks/sqlite_pragmas.py [секунды] [читатели] [писатели]
+"""
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from common import setup_django
+
+POSTS = 2000
+
+
+def create_posts():
+    """Автор и посты для замера; вернуть автора и id постов."""
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from blog.models import Post
+
+    user = get_user_model().objects.create(username='bench')
+    Post.objects.bulk_create(
+        Post(title=f'Пост {i}', text='Текст ' * 50, author=user)
+        for i in range(POSTS)
+    )
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    connection.close()
+    return user, post_ids
+
+
+def reader(stats, lock, stop, offset):
+    from django.db import connection
+
+    from blog.views import posts_queryset
+
+    timings = []
+    page = offset
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        list(posts_queryset()[page * 10 % POSTS:][:10])
+        timings.append(time.perf_counter() - start)
+        page += 1
+    with lock:
+        stats['read'].extend(timings)
+    connection.close()
+
+
+def writer(stats, lock, stop, offset, user, post_ids):
+    from django.db import OperationalError, connection
+
+    from blog.models import Comment
+
+    timings, errors = [], 0
+    index = offset
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        try:
+            Comment.objects.create(
+                text='Комментарий', author=user,
+                post_id=post_ids[index % len(post_ids)],
+            )
+        except OperationalError:
+            errors += 1
+        timings.append(time.perf_counter() - start)
+        index += 7
+    with lock:
+        stats['write'].extend(timings)
+        stats['errors'] += errors
+    connection.close()
+
+
+def run_workers(seconds, readers, writers, user, post_ids):
+    """Запустить читателей и писателей на ``seconds``; вернуть замеры."""
+    stop = time.perf_counter() + seconds
+    stats = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=reader, args=(stats, lock, stop, i))
+        for i in range(readers)
+    ] + [
+        threading.Thread(
+            target=writer, args=(stats, lock, stop, i, user, post_ids)
+        )
+        for i in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def report(mode, seconds, stats):
+    print(f'{mode}:')
+    for kind in ('read', 'write'):
+        timings = sorted(stats[kind])
+        if not timings:
+            print(f'  {kind}: no operations')
+            continue
+        p95 = timings[int(len(timings) * 0.95)] * 1000
+        print(f'  {kind:<5} {len(timings) / seconds:8.0f} ops/s   '
+              f'p95 {p95:8.2f} ms')
+    print(f'  errors {stats["errors"]}')
+
+
+def run(mode, seconds, readers, writers):
+    db_path = Path(tempfile.mkdtemp()) / 'bench.sqlite3'
+    overrides = {} if mode == 'tuned' else {'SQLITE_PRAGMAS': {}}
+    setup_django(db_path, **overrides)
+    user, post_ids = create_posts()
+    stats = run_workers(seconds, readers, writers, user, post_ids)
+    report(mode, seconds, stats)
+
+
+def main():
+    seconds, readers, writers = (
+        float(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 2,
+    )
+    for mode in ('default', 'tuned'):
+        subprocess.run([
+            sys.executable, __file__, '--mode', mode,
+            str(seconds), str(readers), str(writers),
+        ], check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--mode']:
+        mode = sys.argv[2]
+        run(mode, float(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5]))
+    else:
+        main()
@@ -0,0 +1,355 @@
+"""Производительность всех страниц: запросы, время SQL и рендеринга, задержка.
+
+Каждый маршрут из ``blog.urls``, ``pages.urls`` и адресов авторизации
+запрашивается ``--repeat`` раз на большом наборе данных из
+``generate_dataset`` (файл БД создаётся один раз и переиспользуется).
+Запросы выполняются в транзакции с откатом, поэтому POST-запросы не
+меняют данные между повторами.
+
+Страницы из ``PAGE_CACHE_VIEWS`` измеряются дважды: основная строка —
+с кэшем страниц, сброшенным перед каждым запросом (рендеринг и SQL
+представления, как при промахе), строка ``<маршрут> (cached)`` — ответы
+из кэша.
+
+Результат сравнивается с бюджетами из ``view_budgets.json`` (число
+запросов и p95; это цели, а не записанные замеры — бюджет меняется,
+только когда меняется цель) и с прошлым сохранённым прогоном из
+``baselines/views.json``: скрипт завершается с кодом 1, если страница
+вышла за бюджет или замедлилась больше чем на ``--threshold``.
+
+Запуск: ``python benchmarks/views.py [--posts 20000] [--save-baseline]``.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from common import ROOT_DIR, setup_django
+
+BENCH_DIR = ROOT_DIR / 'benchmarks'
+DATA_DIR = BENCH_DIR / '.data'
+BUDGETS_FILE = BENCH_DIR / 'view_budgets.json'
+BASELINE_FILE = BENCH_DIR / 'baselines' / 'views.json'
+
+
+class Case:
+    """Один запрос к маршруту: адрес, метод, пользователь и данные."""
+
+    def __init__(self, path, method='get', user=None, data=None,
+                 prepare=None, content_type=None):
+        self.path = path
+        self.method = method
+        self.user = user
+        self.data = data or {}
+        self.prepare = prepare
+        # Для тела запроса не из формы, например JSONL
+        self.extra = {'content_type': content_type} if content_type else {}
+
+
+class Probe:
+    """Время и число SQL-запросов и время рендеринга шаблонов."""
+
+    def __init__(self):
+        self.depth = 0
+        self.reset()
+
+    def reset(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+    def wrap_render(self, render):
+        # Виджеты форм тоже рендерятся шаблонами бэкенда: время считается
+        # только у внешнего вызова, чтобы не учитывать его дважды.
+        def timed(*args, **kwargs):
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return render(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.render += time.perf_counter() - start
+        return timed
+
+
+def prepare_database(args):
+    DATA_DIR.mkdir(exist_ok=True)
+    db_path = DATA_DIR / f'views-{args.posts}-{args.seed}.sqlite3'
+    exists = db_path.exists()
+    setup_django(db_path, DEBUG=False, ALLOWED_HOSTS=['testserver'])
+    if not exists:
+        from django.core.management import call_command
+
+        print(f'Генерация набора данных в {db_path}...')
+        call_command(
+            'generate_dataset', posts=args.posts, users=args.posts // 50,
+            seed=args.seed, verbosity=0,
+        )
+
+
+def build_cases():
+    """Случаи для всех маршрутов; берутся самые «тяжёлые» объекты."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.tokens import default_token_generator
+    from django.db.models import Count
+    from django.utils import timezone
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+
+    from blog.models import Category, Comment, Post
+
+    User = get_user_model()
+    now = timezone.now()
+    visible = Post.objects.filter(
+        is_published=True, pub_date__lte=now, category__is_published=True
+    )
+    post = visible.order_by('-comment_count').first()
+    author = post.author
+    comment = Comment.objects.filter(post=post).first()
+    profile = User.objects.annotate(total=Count('posts')).order_by(
+        '-total'
+    ).first()
+    category = Category.objects.filter(is_published=True).annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    # Токен сброса зависит от last_login, поэтому берём пользователя,
+    # от имени которого другие случаи не входят.
+    resetting = User.objects.exclude(
+        pk__in=[author.pk, comment.author_id]
+    ).first()
+    uid = urlsafe_base64_encode(force_bytes(resetting.pk))
+    token = default_token_generator.make_token(resetting)
+    staff, _ = User.objects.get_or_create(
+        username='bench-staff', defaults={'is_staff': True}
+    )
+    import_body = ''.join(
+        json.dumps({
+            'post': post.pk, 'author': author.username,
+            'text': f'Импортированный комментарий {index}',
+        }) + '\n'
+        for index in range(100)
+    )
+
+    def login(client):
+        client.force_login(author)
+
+    return {
+        'blog:index': Case('/'),
+        'blog:search': Case('/search/', data={'q': post.title.split()[0]}),
+        'blog:typeahead': Case(
+            '/typeahead/', data={'q': post.title[:3]}
+        ),
+        'blog:post_detail': Case(f'/posts/{post.pk}/'),
+        'blog:category_posts': Case(f'/category/{category.slug}/'),
+        'blog:edit_profile': Case(
+            f'/profile/{author.username}/edit/', user=author
+        ),
+        'blog:profile': Case(f'/profile/{profile.username}/'),
+        'blog:create_post': Case('/posts/create/', user=author),
+        'blog:edit_post': Case(f'/posts/{post.pk}/edit/', user=author),
+        'blog:delete_post': Case(f'/posts/{post.pk}/delete/', user=author),
+        'blog:add_comment': Case(
+            f'/posts/{post.pk}/comment/', method='post', user=author,
+            data={'text': 'Комментарий для бенчмарка'},
+        ),
+        'blog:edit_comment': Case(
+            f'/posts/{post.pk}/edit_comment/{comment.pk}/',
+            user=comment.author,
+        ),
+        'blog:delete_comment': Case(
+            f'/posts/{post.pk}/delete_comment/{comment.pk}/',
+            user=comment.author,
+        ),
+        'blog:import_comments': Case(
+            '/comments/import/', method='post', user=staff,
+            data=import_body, content_type='application/x-ndjson',
+        ),
+        'blog:picker_choices': Case(
+            '/choices/location/', user=author, data={'q': 'М'}
+        ),
+        'pages:about': Case('/pages/about/'),
+        'pages:rules': Case('/pages/rules/'),
+        'registration': Case('/auth/registration/'),
+        'login': Case('/auth/login/'),
+        'logout': Case('/auth/logout/', prepare=login),
+        'password_change': Case('/auth/password_change/', user=author),
+        'password_change_done': Case(
+            '/auth/password_change/done/', user=author
+        ),
+        'password_reset': Case('/auth/password_reset/'),
+        'password_reset_done': Case('/auth/password_reset/done/'),
+        'password_reset_confirm': Case(f'/auth/reset/{uid}/{token}/'),
+        'password_reset_complete': Case('/auth/reset/done/'),
+    }
+
+
+def route_names():
+    from django.contrib.auth import urls as auth_urls
+
+    from blog import urls as blog_urls
+    from pages import urls as pages_urls
+
+    names = {'registration'}
+    for module in (blog_urls, pages_urls, auth_urls):
+        prefix = f'{module.app_name}:' if hasattr(module, 'app_name') else ''
+        names.update(
+            prefix + pattern.name for pattern in module.urlpatterns
+        )
+    return names
+
+
+def run_case(case, repeat, probe, cached=False):
+    from django.db import transaction
+    from django.test import Client
+
+    from blogicum import pagecache
+
+    client = Client()
+    if case.user is not None:
+        client.force_login(case.user)
+    send = getattr(client, case.method)
+    wall, queries, sql, render = [], [], [], []
+    for iteration in range(repeat + 3):
+        if case.prepare is not None:
+            case.prepare(client)
+        if not cached:
+            # Иначе замерялись бы только попадания в кэш страниц.
+            pagecache.bump()
+        probe.reset()
+        start = time.perf_counter()
+        with transaction.atomic():
+            response = send(case.path, case.data, **case.extra)
+            transaction.set_rollback(True)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'{case.path}: HTTP {response.status_code}')
+        # Первые запросы прогревают кэши и индекс подсказок.
+        if iteration >= 3:
+            wall.append(elapsed * 1000)
+            queries.append(probe.queries)
+            sql.append(probe.sql * 1000)
+            render.append(probe.render * 1000)
+    wall.sort()
+    return {
+        'queries': max(queries),
+        'sql_ms': round(statistics.mean(sql), 3),
+        'render_ms': round(statistics.mean(render), 3),
+        'p50_ms': round(statistics.median(wall), 3),
+        'p95_ms': round(wall[int(len(wall) * 0.95)], 3),
+        'p99_ms': round(wall[int(len(wall) * 0.99)], 3),
+    }
+
+
+def print_result(name, result):
+    print(
+        f'{name:<35} {result["queries"]:3} q  '
+        f'sql {result["sql_ms"]:7.2f}  '
+        f'render {result["render_ms"]:7.2f}  '
+        f'p50 {result["p50_ms"]:7.2f}  '
+        f'p95 {result["p95_ms"]:7.2f}  '
+        f'p99 {result["p99_ms"]:7.2f} ms'
+    )
+
+
+def check(results, budgets, baseline, threshold):
+    """Список нарушений бюджетов и регрессий относительно прошлого прогона."""
+    problems = []
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            problems.append(f'{name}: нет бюджета в {BUDGETS_FILE.name}')
+            continue
+        if result['queries'] > budget['queries']:
+            problems.append(
+                f'{name}: {result["queries"]} запросов '
+                f'при бюджете {budget["queries"]}'
+            )
+        if result['p95_ms'] > budget['p95_ms']:
+            problems.append(
+                f'{name}: p95 {result["p95_ms"]} мс '
+                f'при бюджете {budget["p95_ms"]} мс'
+            )
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            problems.append(
+                f'{name}: запросов стало {result["queries"]}, '
+                f'было {previous["queries"]}'
+            )
+        if result['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            problems.append(
+                f'{name}: p95 вырос с {previous["p95_ms"]} '
+                f'до {result["p95_ms"]} мс'
+            )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='Допустимый рост p95 относительно прошлого '
+                             'прогона (доля).')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('routes', nargs='*',
+                        help='Только эти маршруты (например, blog:index).')
+    args = parser.parse_args()
+
+    prepare_database(args)
+    from django.conf import settings
+    from django.db import connection
+    from django.template.backends.django import Template
+
+    cases = build_cases()
+    missing = route_names() - set(cases)
+    if missing:
+        sys.exit(f'Нет случаев для маршрутов: {", ".join(sorted(missing))}')
+
+    probe = Probe()
+    Template.render = probe.wrap_render(Template.render)
+    results = {}
+    with connection.execute_wrapper(probe):
+        for name in args.routes or sorted(cases):
+            runs = [(name, False)]
+            if (name in settings.PAGE_CACHE_VIEWS
+                    and cases[name].method == 'get'):
+                runs.append((f'{name} (cached)', True))
+            for label, cached in runs:
+                results[label] = run_case(
+                    cases[name], args.repeat, probe, cached
+                )
+                print_result(label, results[label])
+
+    budgets = json.loads(BUDGETS_FILE.read_text())
+    baseline = (
+        json.loads(BASELINE_FILE.read_text())
+        if BASELINE_FILE.exists() else {}
+    )
+    problems = check(results, budgets, baseline, args.threshold)
+    if args.save_baseline:
+        BASELINE_FILE.parent.mkdir(exist_ok=True)
+        BASELINE_FILE.write_text(
+            json.dumps({**baseline, **results}, indent=2, sort_keys=True)
+            + '\n'
+        )
+        print(f'Результаты сохранены в {BASELINE_FILE}')
+    for problem in problems:
+        print(f'FAIL {problem}')
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
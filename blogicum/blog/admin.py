@@ -1,8 +1,21 @@
 from django.contrib import admin
 
-from .models import Category, Location, Post, Comment
+from .models import (
+    Category, Comment, Location, OutgoingEmail, Post, PostDeletion,
+)
 
 admin.site.register(Category)
 admin.site.register(Location)
 admin.site.register(Post)
 admin.site.register(Comment)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'created_at', 'attempts', 'next_attempt_at')
+    readonly_fields = ('message',)
+
+
+@admin.register(PostDeletion)
+class PostDeletionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'requested_at', 'attempts')
@@ -0,0 +1,165 @@
+"""Источники вариантов для полей выбора местоположения и категории.
+
+Пока таблица небольшая, все её строки лежат в кэше под ключом с номером
+версии: форма рендерит и валидирует выбор без запросов к БД, а любое
+сохранение или удаление строки увеличивает версию. Когда строк больше
+``BLOG_PICKER_CHOICES_LIMIT``, поле переключается на автодополнение
+через JSON-эндпоинт с поиском по префиксу индексированной колонки.
+
+Версия и строки лежат в кэше ``BLOG_PICKER_CACHE_ALIAS``. Если это кэш в
+памяти процесса, сохранение сбрасывает списки только в своём процессе:
+остальные воркеры показывают (и принимают при валидации) старый список
+не дольше ``BLOG_PICKER_CACHE_TIMEOUT``. Общий кэш (Memcached, Redis,
+таблица в БД) сбрасывает их сразу во всех процессах.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from blogicum.timing import count_cache
+
+from .models import Category, Location
+
+DEFAULT_ALIAS = 'default'
+DEFAULT_CHOICES_LIMIT = 500
+DEFAULT_CACHE_TIMEOUT = 300
+SEARCH_RESULTS = 20
+# Верхняя граница диапазона для поиска по префиксу: строки,
+# начинающиеся с ``prefix``, лежат в [prefix, prefix + MAX_CHAR).
+MAX_CHAR = '\U0010ffff'
+
+
+def _cache():
+    return caches[getattr(settings, 'BLOG_PICKER_CACHE_ALIAS', DEFAULT_ALIAS)]
+
+
+class ChoiceSource:
+    """Варианты выбора одной модели с кэшированием по версии."""
+
+    def __init__(self, name, model, search_field):
+        self.name = name
+        self.model = model
+        self.search_field = search_field
+        self.attnames = [
+            field.attname for field in model._meta.concrete_fields
+        ]
+        self.key = f'blog:choices:{model._meta.label_lower}'
+
+    @property
+    def limit(self):
+        return getattr(
+            settings, 'BLOG_PICKER_CHOICES_LIMIT', DEFAULT_CHOICES_LIMIT
+        )
+
+    def version(self):
+        version_key = f'{self.key}:version'
+        cache = _cache()
+        # Начальная версия уникальна, чтобы после вытеснения ключа
+        # из кэша не совпасть со старыми сохранёнными строками.
+        cache.add(version_key, time.time_ns(), None)
+        return cache.get(version_key)
+
+    def bump_version(self):
+        cache = _cache()
+        try:
+            cache.incr(f'{self.key}:version')
+        except ValueError:
+            cache.set(f'{self.key}:version', time.time_ns(), None)
+
+    def rows(self):
+        """Строки таблицы или ``None``, если она слишком велика."""
+        payload_key = f'{self.key}:{self.version()}'
+        cache = _cache()
+        payload = cache.get(payload_key)
+        count_cache(payload is not None)
+        if payload is None:
+            limit = self.limit
+            rows = list(
+                self.model.objects.order_by('pk')
+                .values_list(*self.attnames)[:limit + 1]
+            )
+            payload = {'rows': rows if len(rows) <= limit else None}
+            cache.set(
+                payload_key,
+                payload,
+                getattr(settings, 'BLOG_PICKER_CACHE_TIMEOUT',
+                        DEFAULT_CACHE_TIMEOUT),
+            )
+        return payload['rows']
+
+    def is_large(self):
+        return self.rows() is None
+
+    def _instance(self, row):
+        return self.model.from_db(
+            self.model.objects.db, self.attnames, row
+        )
+
+    def instances(self):
+        """Закэшированные объекты модели, если таблица небольшая."""
+        rows = self.rows()
+        if rows is None:
+            return None
+        return [self._instance(row) for row in rows]
+
+    def get(self, pk):
+        """Объект по первичному ключу или ``None``."""
+        rows = self.rows()
+        if rows is None:
+            return self.model.objects.filter(pk=pk).first()
+        for row in rows:
+            if row[0] == pk:
+                return self._instance(row)
+        return None
+
+    def labels(self, pks):
+        """Подписи для уже выбранных значений."""
+        pks = set(pks)
+        if not pks:
+            return []
+        instances = self.instances()
+        if instances is None:
+            instances = self.model.objects.filter(pk__in=pks)
+        return [(obj.pk, str(obj)) for obj in instances if obj.pk in pks]
+
+    def search(self, prefix, limit=SEARCH_RESULTS):
+        """Варианты, подпись которых начинается с ``prefix``."""
+        prefix = prefix.strip()
+        instances = self.instances()
+        if instances is not None:
+            folded = prefix.casefold()
+            return [
+                (obj.pk, str(obj)) for obj in instances
+                if str(obj).casefold().startswith(folded)
+            ][:limit]
+        # Диапазон по индексу вместо LIKE: SQLite не использует индекс
+        # для регистронезависимого LIKE. Вариант с заглавной буквы
+        # покрывает привычный ввод названий.
+        condition = Q()
+        for variant in {prefix, prefix[:1].upper() + prefix[1:]}:
+            condition |= Q(**{
+                f'{self.search_field}__gte': variant,
+                f'{self.search_field}__lt': variant + MAX_CHAR,
+            })
+        return list(
+            self.model.objects.filter(condition)
+            .order_by(self.search_field)
+            .values_list('pk', self.search_field)[:limit]
+        )
+
+
+CHOICE_SOURCES = {
+    source.name: source for source in (
+        ChoiceSource('location', Location, 'name'),
+        ChoiceSource('category', Category, 'title'),
+    )
+}
+
+
+def get_source(model):
+    for source in CHOICE_SOURCES.values():
+        if source.model is model:
+            return source
+    raise LookupError(f'Нет источника вариантов для {model.__name__}')
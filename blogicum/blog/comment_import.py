@@ -0,0 +1,147 @@
+"""Массовый импорт комментариев из JSONL.
+
+Каждая строка — объект ``{"post": id, "author": "имя", "text": "…"}`` и
+необязательный ``"created_at"`` в ISO 8601 (без него — текущее время).
+Строки разбираются пачками: авторы и посты пачки проверяются двумя
+запросами, годные комментарии вставляются как есть (с датой из файла),
+а счётчики затронутых постов обновляются одним UPDATE — всё в одной
+транзакции на пачку. Ошибки копятся по номерам строк, остальные строки
+пачки импортируются.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .comments import count_new_comments
+from .fixtures import insert_rows
+from .models import Comment, Post
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class RowError(ValueError):
+    """Строку нельзя импортировать."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        # (номер строки, сообщение)
+        self.errors = []
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'errors': [
+                {'line': line, 'error': error}
+                for line, error in sorted(self.errors)
+            ],
+        }
+
+
+def _created_at(value):
+    if value is None:
+        return timezone.now()
+    try:
+        created_at = parse_datetime(value)
+    except (TypeError, ValueError):
+        created_at = None
+    if created_at is None:
+        raise RowError('поле created_at должно быть датой в ISO 8601')
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return created_at
+
+
+def parse_row(line):
+    """Поля комментария из строки JSONL."""
+    try:
+        row = json.loads(line)
+    except ValueError as error:
+        raise RowError(f'некорректный JSON: {error}') from error
+    if not isinstance(row, dict):
+        raise RowError('ожидался JSON-объект')
+    post, author, text = row.get('post'), row.get('author'), row.get('text')
+    if not isinstance(post, int) or isinstance(post, bool):
+        raise RowError('поле post должно быть id поста')
+    if not isinstance(author, str) or not author:
+        raise RowError('поле author должно быть именем пользователя')
+    if not isinstance(text, str) or not text.strip():
+        raise RowError('поле text не может быть пустым')
+    return post, author, text, _created_at(row.get('created_at'))
+
+
+class CommentImporter:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE,
+                 using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size
+        self.using = using
+        self.result = ImportResult()
+
+    def run(self, lines):
+        """Импортировать строки (``str`` или ``bytes``) и вернуть итог."""
+        batch = []
+        for number, line in enumerate(lines, 1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', errors='replace')
+            if not line.strip():
+                continue
+            try:
+                batch.append((number, parse_row(line)))
+            except RowError as error:
+                self.result.errors.append((number, str(error)))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.result
+
+    def flush(self, batch):
+        authors = dict(
+            User.objects.using(self.using).filter(
+                username__in={row[1] for _, row in batch}
+            ).values_list('username', 'pk')
+        )
+        posts = set(
+            Post.objects.using(self.using).filter(
+                pk__in={row[0] for _, row in batch}
+            ).values_list('pk', flat=True)
+        )
+        comments, numbers = [], []
+        for number, (post, author, text, created_at) in batch:
+            if post not in posts:
+                self.result.errors.append((number, f'нет поста {post}'))
+            elif author not in authors:
+                self.result.errors.append(
+                    (number, f'нет пользователя {author}')
+                )
+            else:
+                comments.append(Comment(
+                    post_id=post, author_id=authors[author], text=text,
+                    created_at=created_at,
+                ))
+                numbers.append(number)
+        if not comments:
+            return
+        try:
+            with transaction.atomic(using=self.using):
+                insert_rows(Comment, comments, self.using)
+                count_new_comments(comments, using=self.using)
+        except DatabaseError as error:
+            # Пост мог исчезнуть после проверки: пачка не записана целиком.
+            self.result.errors.extend(
+                (number, f'пачка не записана: {error}') for number in numbers
+            )
+            return
+        self.result.created += len(comments)
+
+
+def import_comments(lines, batch_size=DEFAULT_BATCH_SIZE,
+                    using=DEFAULT_DB_ALIAS):
+    return CommentImporter(batch_size, using).run(lines)
@@ -0,0 +1,203 @@
+"""Запись комментариев и групповой коммит для конкурентной нагрузки.
+
+SQLite допускает одного писателя: при всплеске комментариев отдельные
+транзакции на каждый запрос ждут блокировку и падают с
+``database is locked``. При ``COMMENT_GROUP_COMMIT = True`` запросы
+кладут комментарии в очередь процесса, а единственный поток-писатель
+каждые ``COMMENT_GROUP_COMMIT_WINDOW_MS`` записывает накопившееся одной
+транзакцией и отпускает ожидающие запросы после коммита.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import (
+    Case, Count, F, OuterRef, PositiveIntegerField, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from blogicum import pagecache
+from .models import Comment, Post
+
+
+class CommentQueueTimeout(Exception):
+    """Пачка с комментарием не была записана за отведённое время."""
+
+
+def write_comments(comments):
+    """Вставить комментарии одним запросом и обновить счётчики постов.
+
+    Вызывается внутри транзакции; сигналы ``post_save`` не отправляются,
+    поэтому счётчики обновляются и кэш страниц сбрасывается здесь.
+    """
+    Comment.objects.bulk_create(comments)
+    fill_pks(comments)
+    count_new_comments(comments)
+
+
+def fill_pks(comments):
+    """Проставить ``pk`` комментариям, если ``bulk_create`` их не вернул.
+
+    SQLite в Django 3.2 не возвращает ключи вставленных строк, а без
+    ``pk`` фрагмент нового комментария остался бы без ссылок автора.
+    Строки ищутся одним запросом по автору, посту и времени создания
+    в той же транзакции.
+    """
+    missing = [comment for comment in comments if comment.pk is None]
+    if not missing:
+        return
+    rows = Comment.objects.filter(
+        created_at__in={comment.created_at for comment in missing},
+        post_id__in={comment.post_id for comment in missing},
+    ).values_list('pk', 'author_id', 'post_id', 'created_at')
+    pks = {tuple(row[1:]): row[0] for row in rows}
+    for comment in missing:
+        comment.pk = pks.get(
+            (comment.author_id, comment.post_id, comment.created_at)
+        )
+
+
+def count_new_comments(comments, using=None):
+    """Прибавить вставленные в обход ``save()`` комментарии к счётчикам.
+
+    Все затронутые посты обновляются одним UPDATE.
+    """
+    added = Counter(comment.post_id for comment in comments)
+    if not added:
+        return
+    Post.objects.using(using).filter(pk__in=added).update(
+        comment_count=F('comment_count') + Case(
+            *(When(pk=pk, then=Value(count)) for pk, count in added.items()),
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+    )
+    pagecache.bump()
+
+
+def recount_comments(using=None, post_ids=None):
+    """Пересчитать ``comment_count`` по таблице комментариев.
+
+    По умолчанию — у всех постов, с ``post_ids`` — только у этих.
+    """
+    counts = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    posts = Post.objects.using(using)
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    posts.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class PendingComment:
+    def __init__(self, comment):
+        self.comment = comment
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout):
+        if not self.done.wait(timeout):
+            raise CommentQueueTimeout(
+                f'Комментарий не записан за {timeout} с'
+            )
+        if self.error is not None:
+            raise self.error
+
+
+class GroupCommitQueue:
+    """Очередь комментариев с одним потоком-писателем на процесс."""
+
+    def __init__(self, window=0.005, max_batch=200):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def submit(self, comment):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._run, name='comment-writer', daemon=True
+                    )
+                    self._writer.start()
+        pending = PendingComment(comment)
+        self._queue.put(pending)
+        return pending
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            close_old_connections()
+            try:
+                self._commit(batch)
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def _commit(self, batch):
+        try:
+            with transaction.atomic():
+                write_comments([pending.comment for pending in batch])
+            return
+        except Exception:
+            pass
+        # Одна плохая строка (например, пост уже удалён) не должна
+        # ронять всю пачку: повторяем по одному, ошибки — каждому своя.
+        for pending in batch:
+            pending.comment.pk = None
+            try:
+                with transaction.atomic():
+                    write_comments([pending.comment])
+            except Exception as error:
+                pending.error = error
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = GroupCommitQueue(
+            window=getattr(settings, 'COMMENT_GROUP_COMMIT_WINDOW_MS', 5)
+            / 1000,
+            max_batch=getattr(settings, 'COMMENT_GROUP_COMMIT_MAX_BATCH', 200),
+        )
+    return _queue
+
+
+def save_comment(comment):
+    """Сохранить новый комментарий с учётом ``COMMENT_GROUP_COMMIT``.
+
+    Внутри открытой транзакции комментарий пишется сразу: она может
+    держать блокировку, которой ждал бы поток-писатель.
+    """
+    if (
+        not getattr(settings, 'COMMENT_GROUP_COMMIT', False)
+        or transaction.get_connection().in_atomic_block
+    ):
+        # Один INSERT и UPDATE счётчика из сигнала — одной транзакцией.
+        with transaction.atomic():
+            comment.save()
+        return
+    get_queue().submit(comment).wait(
+        getattr(settings, 'COMMENT_GROUP_COMMIT_TIMEOUT', 5)
+    )
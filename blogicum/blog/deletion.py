@@ -0,0 +1,163 @@
+"""Удаление постов с большими ветками комментариев.
+
+``post.delete()`` сначала загружает в память все комментарии поста:
+у ``Comment`` есть обработчики ``post_delete``, и коллектор Django
+удаляет такие объекты по одному списку. Здесь комментарии удаляются
+напрямую в SQL кусками по ``POST_DELETE_CHUNK_SIZE`` строк, каждый кусок
+в своей короткой транзакции, и только потом удаляется сам пост — уже
+обычным ``delete()``, чтобы сигналы поста убрали его из поискового
+индекса, подсказок и кэша страниц. Удаление намеренно не атомарно (см.
+``delete_post()``).
+
+Пост, у которого комментариев больше ``POST_DELETE_DEFER_COMMENTS``,
+сразу снимается с публикации и попадает в очередь ``PostDeletion``; её
+после коммита разбирает фоновый поток процесса, а то, что осталось после
+перезапуска, — ``manage.py delete_pending_posts``. Ошибка при удалении
+одного поста записывается в его строку очереди и не мешает остальным;
+после ``POST_DELETE_MAX_ATTEMPTS`` попыток пост остаётся в очереди для
+разбора. Пока пост в очереди, автор не может его редактировать.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import (
+    close_old_connections, connections, router, transaction,
+)
+from django.db.models import F
+
+from .comments import recount_comments
+from .models import Comment, PostDeletion
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_DEFER_COMMENTS = 1000
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def delete_comments(post_id, chunk_size=None):
+    """Удалить комментарии поста кусками; вернуть число удалённых."""
+    if chunk_size is None:
+        chunk_size = getattr(
+            settings, 'POST_DELETE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE
+        )
+    using = router.db_for_write(Comment)
+    quote_name = connections[using].ops.quote_name
+    table = quote_name(Comment._meta.db_table)
+    pk = quote_name(Comment._meta.pk.column)
+    post = quote_name(Comment._meta.get_field('post').column)
+    sql = (
+        f'DELETE FROM {table} WHERE {pk} IN '
+        f'(SELECT {pk} FROM {table} WHERE {post} = %s LIMIT %s)'
+    )
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using), \
+                connections[using].cursor() as cursor:
+            cursor.execute(sql, [post_id, chunk_size])
+            count = cursor.rowcount
+        deleted += count
+        if count < chunk_size:
+            return deleted
+
+
+def delete_post(post, chunk_size=None):
+    """Удалить пост: комментарии кусками, затем сам пост с сигналами.
+
+    Намеренно не атомарно: одна транзакция на всю ветку держала бы
+    блокировку записи SQLite всё время удаления. Если удаление прервалось,
+    у поста остаётся часть комментариев, а его ``comment_count`` устарел;
+    ``delete_pending()`` пересчитывает счётчик такого поста и повторяет
+    удаление, которое продолжится с оставшихся комментариев.
+    """
+    delete_comments(post.pk, chunk_size)
+    post.delete()
+
+
+def delete_pending():
+    """Удалить посты из очереди; вернуть число удалённых."""
+    max_attempts = getattr(
+        settings, 'POST_DELETE_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS
+    )
+    queue = list(
+        PostDeletion.objects.filter(attempts__lt=max_attempts)
+        .values_list('pk', flat=True)
+    )
+    deleted = 0
+    for pk in queue:
+        # Строку мог уже разобрать другой процесс.
+        pending = PostDeletion.objects.select_related('post').filter(
+            pk=pk
+        ).first()
+        if pending is None:
+            continue
+        try:
+            delete_post(pending.post)
+        except Exception as error:
+            logger.exception('Не удалось удалить пост %s', pending.post_id)
+            PostDeletion.objects.filter(pk=pk).update(
+                attempts=F('attempts') + 1,
+                last_error=f'{type(error).__name__}: {error}',
+            )
+            # Часть комментариев могла уже удалиться.
+            recount_comments(post_ids=[pending.post_id])
+        else:
+            deleted += 1
+    return deleted
+
+
+class DeletionWorker:
+    """Поток процесса, разбирающий очередь удаления."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = False
+        self._thread = None
+
+    def wake(self):
+        with self._lock:
+            self._pending = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='post-deletion', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            close_old_connections()
+            try:
+                delete_pending()
+            except Exception:
+                logger.exception('Не удалось удалить посты из очереди')
+            finally:
+                close_old_connections()
+
+
+worker = DeletionWorker()
+
+
+def request_deletion(post):
+    """Удалить пост сразу или снять с публикации и поставить в очередь.
+
+    Возвращает ``True``, если пост уже удалён.
+    """
+    defer_over = getattr(
+        settings, 'POST_DELETE_DEFER_COMMENTS', DEFAULT_DEFER_COMMENTS
+    )
+    if defer_over is None or post.comment_count <= defer_over:
+        delete_post(post)
+        return True
+    with transaction.atomic():
+        post.is_published = False
+        # Сигнал post_save уберёт пост из подсказок и кэша страниц.
+        post.save(update_fields=['is_published'])
+        PostDeletion.objects.get_or_create(post=post)
+        transaction.on_commit(worker.wake)
+    return False
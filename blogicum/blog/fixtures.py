@@ -0,0 +1,224 @@
+"""Потоковый импорт и экспорт фикстур Django.
+
+``loaddata`` читает файл целиком и сохраняет объекты по одному, а
+``dumpdata`` собирает весь дамп в памяти. Здесь файл (JSON-массив в
+формате фикстур или JSONL — объект на строку, можно сжатый ``.gz``)
+разбирается по кускам, объекты пишутся пачками, а выгрузка идёт через
+``.iterator()``: память ограничена размером пачки, а не дампа.
+"""
+import gzip
+import json
+from collections import defaultdict
+
+from django.core.serializers import base
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.python import (
+    Deserializer as PythonDeserializer,
+    Serializer as PythonSerializer,
+)
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connections
+
+from .choices import CHOICE_SOURCES
+from .comments import recount_comments
+from .models import Comment, Post
+
+READ_SIZE = 1 << 16
+# Больше объект фикстуры не бывает: дальше файл считается испорченным,
+# а не дочитывается в память до конца.
+MAX_ITEM_SIZE = 4 << 20
+WHITESPACE = ' \t\r\n'
+
+
+def open_fixture(path, mode='r'):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def is_jsonl(path):
+    return str(path).endswith(('.jsonl', '.jsonl.gz'))
+
+
+def iter_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise base.DeserializationError(
+                    f'Строка {line_number}: {error}'
+                ) from error
+
+
+class JsonArrayReader:
+    """Элементы JSON-массива верхнего уровня по мере чтения файла."""
+
+    def __init__(self, stream, read_size=READ_SIZE,
+                 max_item_size=MAX_ITEM_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.max_item_size = max_item_size
+        self.decoder = json.JSONDecoder()
+        self.buffer, self.position, self.eof = '', 0, False
+        # Сколько байт (UTF-8) уже отброшено из начала буфера.
+        self.dropped_bytes = 0
+
+    def read_more(self, keep_from):
+        chunk = self.stream.read(self.read_size)
+        self.eof = not chunk
+        self.dropped_bytes += len(self.buffer[:keep_from].encode())
+        self.buffer = self.buffer[keep_from:] + chunk
+        self.position -= keep_from
+
+    def offset(self):
+        """Смещение текущей позиции в байтах от начала данных."""
+        return (
+            self.dropped_bytes
+            + len(self.buffer[:self.position].encode())
+        )
+
+    def skip(self, chars):
+        """Пропустить ``chars``; вернуть следующий символ или ``''``."""
+        while True:
+            buffer, position = self.buffer, self.position
+            while position < len(buffer) and buffer[position] in chars:
+                position += 1
+            self.position = position
+            if position < len(buffer) or self.eof:
+                return buffer[position:position + 1]
+            self.read_more(self.position)
+
+    def __iter__(self):
+        if self.skip(WHITESPACE) != '[':
+            raise base.DeserializationError('Ожидался JSON-массив объектов.')
+        self.position += 1
+        while True:
+            char = self.skip(WHITESPACE + ',')
+            if char == ']':
+                return
+            if not char:
+                raise base.DeserializationError('Массив не закрыт.')
+            try:
+                item, self.position = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except ValueError as error:
+                if self.eof:
+                    raise base.DeserializationError(
+                        f'Байт {self.offset()}: {error}'
+                    ) from error
+                if len(self.buffer) - self.position > self.max_item_size:
+                    raise base.DeserializationError(
+                        f'Байт {self.offset()}: объект не разобран и в '
+                        f'{self.max_item_size} символах — файл испорчен?'
+                    ) from error
+                # Объект не поместился в прочитанный кусок: дочитываем.
+                self.read_more(self.position)
+                continue
+            yield item
+
+
+def iter_objects(path, using, ignorenonexistent=False):
+    """``DeserializedObject`` из файла фикстуры без чтения его целиком."""
+    with open_fixture(path) as stream:
+        items = iter_jsonl(stream) if is_jsonl(path) else (
+            JsonArrayReader(stream)
+        )
+        yield from PythonDeserializer(
+            items, using=using, ignorenonexistent=ignorenonexistent
+        )
+
+
+def insert_rows(model, objs, using, ignore_conflicts=False):
+    """Вставить объекты как есть, с их pk и датами; вернуть размер пачки.
+
+    Тот же вставочный запрос, что и в ``bulk_create``, но в режиме
+    ``raw``: значения ``auto_now_add`` не заменяются текущим временем.
+    """
+    fields = model._meta.local_concrete_fields
+    batch_size = max(
+        connections[using].ops.bulk_batch_size(fields, objs), 1
+    )
+    for start in range(0, len(objs), batch_size):
+        model._base_manager._insert(
+            objs[start:start + batch_size], fields=fields, using=using,
+            raw=True, ignore_conflicts=ignore_conflicts,
+        )
+    return batch_size
+
+
+def insert_objects(model, deserialized, using, ignore_conflicts=False):
+    """Вставить пачку объектов одной модели, как это делает ``loaddata``.
+
+    Связи многие-ко-многим пишутся в промежуточные таблицы пачками после
+    вставки объектов.
+    """
+    batch_size = insert_rows(
+        model, [item.object for item in deserialized], using,
+        ignore_conflicts,
+    )
+    links = defaultdict(list)
+    for item in deserialized:
+        for name, pks in (item.m2m_data or {}).items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            links[through].extend(
+                through(**{source: item.object.pk, target: pk})
+                for pk in pks
+            )
+    for through, rows in links.items():
+        through._base_manager.using(using).bulk_create(
+            rows, batch_size=batch_size, ignore_conflicts=True
+        )
+
+
+def reset_sequences(models, using):
+    """Сдвинуть счётчики автоинкремента после вставки с явными pk."""
+    connection = connections[using]
+    sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+    if sequence_sql:
+        with connection.cursor() as cursor:
+            for line in sequence_sql:
+                cursor.execute(line)
+
+
+def refresh_derived_data(models, using, stdout=None, verbosity=1,
+                         search_index=True, comment_counts=True):
+    """Обновить то, что при обычном сохранении делают сигналы.
+
+    Нужно после массовой записи в обход ``save()``: пересчитать
+    счётчики комментариев (если их не заполнил сам загрузчик —
+    ``comment_counts=False``), пересобрать поисковый индекс и сбросить
+    закэшированные варианты выбора.
+    """
+    if comment_counts and models & {Post, Comment}:
+        recount_comments(using=using)
+    if (search_index and Post in models
+            and connections[using].vendor == 'sqlite'):
+        call_command(
+            'rebuild_search_index', database=using, stdout=stdout,
+            verbosity=verbosity,
+        )
+    for source in CHOICE_SOURCES.values():
+        if source.model in models:
+            source.bump_version()
+
+
+class StreamSerializer(PythonSerializer):
+    """Сериализатор, отдающий каждый объект в ``write`` сразу."""
+
+    def __init__(self, write):
+        super().__init__()
+        self.write = write
+
+    def end_object(self, obj):
+        self.write(self.get_dump_object(obj))
+        self._current = None
+
+
+def dump_json(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
@@ -1,8 +1,77 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from .choices import get_source
 from .models import Post, Comment
+from .widgets import PickerSelect
+
+
+class PickerChoiceIterator(forms.models.ModelChoiceIterator):
+    """Варианты из кэша источника; для больших таблиц — из БД как обычно."""
+
+    def __iter__(self):
+        instances = self.field.cached_instances()
+        if instances is None:
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in instances:
+            yield self.choice(obj)
+
+    def __len__(self):
+        instances = self.field.cached_instances()
+        if instances is None:
+            return super().__len__()
+        return len(instances) + (self.field.empty_label is not None)
+
+
+class PickerChoiceField(forms.ModelChoiceField):
+    """Выбор объекта по вариантам из кэша ``ChoiceSource``.
+
+    Небольшие таблицы рендерятся и валидируются без запросов к БД,
+    большие — через автодополнение и один запрос по первичному ключу.
+    В кэше лежат все строки модели, поэтому поле с отфильтрованным
+    ``queryset`` (например, через ``limit_choices_to``) рендерится и
+    валидируется по своему ``queryset``, как обычный ``ModelChoiceField``.
+    """
+
+    widget = PickerSelect
+    iterator = PickerChoiceIterator
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(queryset, **kwargs)
+        self.source = get_source(queryset.model)
+        self.widget.source = self.source
+        self.widget.empty_label = self.empty_label
+
+    def cached_instances(self):
+        """Объекты из кэша источника или ``None``, если кэш не подходит."""
+        if self.queryset.query.has_filters():
+            return None
+        return self.source.instances()
+
+    def to_python(self, value):
+        if self.queryset.query.has_filters():
+            return super().to_python(value)
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            return value
+        try:
+            pk = self.queryset.model._meta.pk.to_python(value)
+        except ValidationError:
+            pk = None
+        obj = None if pk is None else self.source.get(pk)
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
 
 
 class PostForm(forms.ModelForm):
@@ -11,6 +80,10 @@ class PostForm(forms.ModelForm):
         fields = (
             'title', 'text', 'pub_date', 'location', 'category', 'image'
         )
+        field_classes = {
+            'location': PickerChoiceField,
+            'category': PickerChoiceField,
+        }
         widgets = {
             'pub_date': forms.DateTimeInput(
                 attrs={'type': 'datetime-local'},
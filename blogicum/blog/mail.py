@@ -0,0 +1,157 @@
+"""Очередь исходящих писем.
+
+``QueuedEmailBackend`` не отправляет письма, а сохраняет их в таблицу
+``OutgoingEmail``: запрос (например, сброс пароля) не ждёт SMTP-сервер,
+а письмо, отправленное внутри транзакции, попадёт в очередь только
+вместе с её коммитом. Воркер ``manage.py send_queued_mail`` забирает
+письма пачками и отправляет через настоящий бэкенд
+``EMAIL_QUEUE_BACKEND`` по одному открытому соединению. Неудачные
+попытки повторяются с экспоненциальной задержкой, после
+``EMAIL_QUEUE_MAX_ATTEMPTS`` письмо остаётся в таблице для разбора.
+
+Перед отправкой воркер захватывает пачку: сдвигает ``next_attempt_at``
+на ``EMAIL_QUEUE_LEASE_SECONDS`` вперёд условным UPDATE, поэтому
+несколько воркеров не отправят одно письмо дважды. Если воркер упал,
+захваченные им письма вернутся в очередь по истечении аренды.
+"""
+import email
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+DEFAULT_SINK = 'django.core.mail.backends.filebased.EmailBackend'
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_SECONDS = 60
+DEFAULT_LEASE_SECONDS = 300
+
+
+class StoredMIME(MIMEMixin, email.message.Message):
+    """Разобранное письмо с ``as_bytes(linesep=...)``, как у Django."""
+
+
+class StoredMessage:
+    """Письмо из очереди в том виде, в каком его ждут бэкенды Django."""
+
+    encoding = None
+
+    def __init__(self, row):
+        self.from_email = row.from_email
+        self.to = row.recipients.splitlines()
+        self._message = email.message_from_bytes(
+            bytes(row.message), _class=StoredMIME
+        )
+
+    def recipients(self):
+        return self.to
+
+    def message(self):
+        return self._message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = [
+            OutgoingEmail(
+                from_email=message.from_email,
+                recipients='\n'.join(message.recipients()),
+                message=message.message().as_bytes(),
+            )
+            for message in email_messages if message.recipients()
+        ]
+        OutgoingEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_QUEUE_RETRY_SECONDS',
+                   DEFAULT_RETRY_SECONDS)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def send_queued(batch_size=None, connection=None):
+    """Отправить одну пачку писем; вернуть (отправлено, с ошибкой)."""
+    if batch_size is None:
+        batch_size = getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE',
+                             DEFAULT_BATCH_SIZE)
+    max_attempts = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS',
+                           DEFAULT_MAX_ATTEMPTS)
+    rows = claim(batch_size, max_attempts)
+    if not rows:
+        return 0, 0
+    if connection is None:
+        connection = get_connection(
+            getattr(settings, 'EMAIL_QUEUE_BACKEND', DEFAULT_SINK)
+        )
+    try:
+        connection.open()
+    except Exception as error:
+        # SMTP недоступен: откладывается вся пачка, воркер не падает.
+        for row in rows:
+            _postpone(row, error)
+        _save_results([], rows)
+        return 0, len(rows)
+    try:
+        sent, failed = _send_rows(connection, rows)
+    finally:
+        connection.close()
+    _save_results(sent, failed)
+    return len(sent), len(failed)
+
+
+def claim(batch_size, max_attempts):
+    """Захватить до ``batch_size`` готовых к отправке писем.
+
+    Письмо достаётся тому воркеру, чей UPDATE первым сдвинул его
+    ``next_attempt_at``; у остальных условие ``<= now`` уже не выполнится.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=getattr(
+        settings, 'EMAIL_QUEUE_LEASE_SECONDS', DEFAULT_LEASE_SECONDS
+    ))
+    with transaction.atomic():
+        ready = OutgoingEmail.objects.filter(
+            next_attempt_at__lte=now, attempts__lt=max_attempts
+        )
+        candidates = list(ready.values_list('pk', flat=True)[:batch_size])
+        if not candidates:
+            return []
+        ready.filter(pk__in=candidates).update(next_attempt_at=lease_until)
+        return list(OutgoingEmail.objects.filter(
+            pk__in=candidates, next_attempt_at=lease_until
+        ))
+
+
+def _send_rows(connection, rows):
+    """Отправить письма по одному; вернуть (id отправленных, отложенные)."""
+    sent, failed = [], []
+    for row in rows:
+        try:
+            connection.send_messages([StoredMessage(row)])
+        except Exception as error:
+            _postpone(row, error)
+            failed.append(row)
+        else:
+            sent.append(row.pk)
+    return sent, failed
+
+
+def _postpone(row, error):
+    row.attempts += 1
+    row.last_error = f'{type(error).__name__}: {error}'
+    row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+
+
+def _save_results(sent, failed):
+    with transaction.atomic():
+        OutgoingEmail.objects.filter(pk__in=sent).delete()
+        OutgoingEmail.objects.bulk_update(
+            failed, ['attempts', 'last_error', 'next_attempt_at']
+        )
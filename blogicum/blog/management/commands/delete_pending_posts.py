@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.deletion import delete_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Удалить посты из очереди удаления (PostDeletion). С --loop '
+        'работает как воркер и проверяет очередь каждые --interval секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = delete_pending()
+            if deleted:
+                self.stdout.write(f'Удалено публикаций: {deleted}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,84 @@
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.fixtures import StreamSerializer, dump_json, is_jsonl, open_fixture
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгрузить данные в фикстуру потоково: строки читаются через '
+        '.iterator(), объекты пишутся в файл по одному. Формат — '
+        'JSON-массив как у dumpdata или JSONL по расширению .jsonl.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'labels', nargs='*', metavar='app_label[.ModelName]',
+            help='Что выгрузить (по умолчанию — все приложения).',
+        )
+        parser.add_argument('--output', '-o', required=True)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--exclude', '-e', action='append', default=[],
+            metavar='app_label[.ModelName]',
+        )
+
+    def resolve(self, labels, excludes):
+        try:
+            excluded = {
+                model for label in excludes for model in self.models(label)
+            }
+            models = [
+                model for label in labels or [
+                    app.label for app in apps.get_app_configs()
+                ]
+                for model in self.models(label) if model not in excluded
+            ]
+        except LookupError as error:
+            raise CommandError(str(error)) from error
+        app_list = {}
+        for model in models:
+            app_list.setdefault(model._meta.app_config, []).append(model)
+        return serializers.sort_dependencies(app_list.items())
+
+    @staticmethod
+    def models(label):
+        if '.' in label:
+            return [apps.get_model(label)]
+        return list(apps.get_app_config(label).get_models())
+
+    def handle(self, *args, **options):
+        models = [
+            model for model in self.resolve(
+                options['labels'], options['exclude']
+            )
+            if not model._meta.proxy and model._meta.managed
+        ]
+        path = options['output']
+        jsonl = is_jsonl(path)
+        self.count = 0
+        with open_fixture(path, 'w') as stream:
+            def write(data):
+                if jsonl:
+                    stream.write(dump_json(data) + '\n')
+                else:
+                    stream.write((',\n' if self.count else '[\n'))
+                    stream.write(dump_json(data))
+                self.count += 1
+
+            serializer = StreamSerializer(write)
+            for model in models:
+                queryset = model._base_manager.using(
+                    options['database']
+                ).order_by(model._meta.pk.name)
+                serializer.serialize(
+                    queryset.iterator(chunk_size=options['batch_size'])
+                )
+            if not jsonl:
+                stream.write('\n]\n' if self.count else '[]\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено объектов: {self.count}.'
+        ))
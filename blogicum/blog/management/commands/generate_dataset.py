@@ -0,0 +1,266 @@
+import math
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from blog.fixtures import insert_rows, refresh_derived_data, reset_sequences
+from blog.models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+# Текст собирается из заранее сгенерированных предложений: Faker на
+# каждый пост сделал бы генерацию миллионов записей слишком долгой.
+SENTENCE_POOL = 5000
+TITLE_POOL = 2000
+# Показатель распределения Парето для числа комментариев: у большинства
+# постов их мало, у немногих — тысячи.
+COMMENTS_ALPHA = 1.3
+PASSWORD = 'generated-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сгенерировать большой набор данных для нагрузочных тестов: '
+        'пользователи, категории, местоположения, посты (часть скрыта '
+        'или отложена) и комментарии с «тяжёлым хвостом». Одинаковый '
+        '--seed даёт одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--locations', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument(
+            '--comments-per-post', type=float, default=5.0,
+            help='Среднее число комментариев у опубликованного поста.',
+        )
+        parser.add_argument('--max-comments', type=int, default=5000)
+        parser.add_argument('--unpublished', type=float, default=0.05,
+                            help='Доля снятых с публикации постов.')
+        parser.add_argument('--scheduled', type=float, default=0.03,
+                            help='Доля отложенных постов.')
+        parser.add_argument('--hidden-categories', type=float, default=0.1,
+                            help='Доля снятых с публикации категорий.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределены посты.')
+        parser.add_argument(
+            '--no-search-index', action='store_false', dest='search_index',
+            help='Не пересобирать поисковый индекс (rebuild_search_index).',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        for name in ('unpublished', 'scheduled', 'hidden_categories'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f'--{name} должна быть от 0 до 1.')
+        self.options = options
+        self.using = options['database']
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.now = timezone.now()
+        self.sentences = [
+            self.fake.sentence(nb_words=12) for _ in range(SENTENCE_POOL)
+        ]
+        self.titles = [
+            self.fake.sentence(nb_words=4).rstrip('.')
+            for _ in range(TITLE_POOL)
+        ]
+
+        users = self.create_users(options['users'])
+        categories = self.create_categories(options['categories'])
+        locations = self.create_locations(options['locations'])
+        if not users or not categories:
+            raise CommandError('Нужен хотя бы один пользователь и категория.')
+        self.create_posts(options['posts'], users, categories, locations)
+
+        models = {User, Category, Location, Post, Comment}
+        reset_sequences(models, self.using)
+        # comment_count заполнен при генерации вместе с комментариями,
+        # пересчитывать всю таблицу комментариев не нужно.
+        refresh_derived_data(
+            models, self.using, self.stdout, self.verbosity,
+            search_index=options['search_index'], comment_counts=False,
+        )
+        self.stdout.write(self.style.SUCCESS('Набор данных сгенерирован.'))
+
+    @property
+    def verbosity(self):
+        return self.options['verbosity']
+
+    def next_id(self, model):
+        last = model._base_manager.using(self.using).aggregate(
+            last=Max('pk')
+        )['last']
+        return (last or 0) + 1
+
+    def insert(self, model, objs):
+        with transaction.atomic(using=self.using):
+            insert_rows(model, objs, self.using)
+
+    def past(self, days):
+        seconds = self.random.uniform(0, days * 86400)
+        return self.now - timedelta(seconds=seconds)
+
+    def create_users(self, count):
+        start = self.next_id(User)
+        password = make_password(PASSWORD)
+        users = [
+            User(
+                pk=start + index,
+                username=f'{self.fake.user_name()}{start + index}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=self.fake.email(),
+                password=password,
+                date_joined=self.past(self.options['days'] * 2),
+            )
+            for index in range(count)
+        ]
+        for start in range(0, len(users), self.batch_size):
+            self.insert(User, users[start:start + self.batch_size])
+        return [user.pk for user in users]
+
+    def create_categories(self, count):
+        start = self.next_id(Category)
+        hidden = self.options['hidden_categories']
+        categories = [
+            Category(
+                pk=start + index,
+                title=self.fake.sentence(nb_words=2).rstrip('.'),
+                description=self.fake.paragraph(),
+                slug=f'category-{start + index}',
+                is_published=self.random.random() >= hidden,
+                created_at=self.past(self.options['days'] * 2),
+            )
+            for index in range(count)
+        ]
+        self.insert(Category, categories)
+        return [category.pk for category in categories]
+
+    def create_locations(self, count):
+        start = self.next_id(Location)
+        locations = [
+            Location(
+                pk=start + index,
+                name=self.fake.city(),
+                created_at=self.past(self.options['days'] * 2),
+            )
+            for index in range(count)
+        ]
+        self.insert(Location, locations)
+        return [location.pk for location in locations]
+
+    def zipf_weights(self, count, exponent=1.1):
+        """Накопленные веса: первые по списку выбираются заметно чаще."""
+        return list(accumulate(
+            1 / (rank ** exponent) for rank in range(1, count + 1)
+        ))
+
+    def comment_count(self):
+        mean = self.options['comments_per_post']
+        if mean <= 0:
+            return 0
+        tail = self.random.paretovariate(COMMENTS_ALPHA) - 1
+        # Среднее (X - 1) для Парето равно 1 / (alpha - 1).
+        count = math.floor(mean * (COMMENTS_ALPHA - 1) * tail)
+        return min(count, self.options['max_comments'])
+
+    def create_posts(self, count, users, categories, locations):
+        author_weights = self.zipf_weights(len(users))
+        category_weights = self.zipf_weights(len(categories))
+        post_id = self.next_id(Post)
+        comment_id = self.next_id(Comment)
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            posts = [
+                self.make_post(
+                    post_id + index, users, author_weights,
+                    categories, category_weights, locations,
+                )
+                for index in range(size)
+            ]
+            comments = []
+            for post in posts:
+                for _ in range(post.comment_count):
+                    comments.append(self.make_comment(
+                        comment_id, post, users, author_weights
+                    ))
+                    comment_id += 1
+            with transaction.atomic(using=self.using):
+                insert_rows(Post, posts, self.using)
+                for start in range(0, len(comments), self.batch_size):
+                    insert_rows(
+                        Comment, comments[start:start + self.batch_size],
+                        self.using,
+                    )
+            post_id += size
+            created += size
+            if self.verbosity >= 1:
+                self.stdout.write(f'Постов: {created} из {count}')
+
+    def make_post(self, pk, users, author_weights, categories,
+                  category_weights, locations):
+        rand = self.random.random()
+        scheduled = rand < self.options['scheduled']
+        if scheduled:
+            pub_date = self.now + timedelta(
+                seconds=self.random.uniform(60, 30 * 86400)
+            )
+        else:
+            pub_date = self.past(self.options['days'])
+        published = not (
+            self.options['scheduled'] <= rand
+            < self.options['scheduled'] + self.options['unpublished']
+        )
+        return Post(
+            pk=pk,
+            title=self.random.choice(self.titles),
+            text=' '.join(self.random.choices(
+                self.sentences, k=self.random.randint(3, 15)
+            )),
+            pub_date=pub_date,
+            created_at=min(pub_date, self.now),
+            is_published=published,
+            author_id=self.random.choices(
+                users, cum_weights=author_weights
+            )[0],
+            category_id=self.random.choices(
+                categories, cum_weights=category_weights
+            )[0],
+            location_id=(
+                self.random.choice(locations)
+                if locations and self.random.random() < 0.7 else None
+            ),
+            # Отложенные и скрытые посты ещё никто не успел обсудить.
+            comment_count=(
+                self.comment_count() if published and not scheduled else 0
+            ),
+        )
+
+    def make_comment(self, pk, post, users, author_weights):
+        age = (self.now - post.pub_date).total_seconds()
+        return Comment(
+            pk=pk,
+            text=self.random.choice(self.sentences),
+            created_at=post.pub_date + timedelta(
+                seconds=min(self.random.expovariate(1 / 86400), age)
+            ),
+            author_id=self.random.choices(
+                users, cum_weights=author_weights
+            )[0],
+            post_id=post.pk,
+        )
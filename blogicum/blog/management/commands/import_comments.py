@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.comment_import import DEFAULT_BATCH_SIZE, import_comments
+from blog.fixtures import open_fixture
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортировать комментарии из JSONL (можно .gz, "-" — stdin): '
+        'строка {"post": id, "author": "имя", "text": "…", '
+        '"created_at": "ISO 8601"}. Строки с ошибками пропускаются '
+        'и перечисляются в выводе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            if path == '-':
+                result = import_comments(
+                    sys.stdin, options['batch_size'], options['database']
+                )
+            else:
+                with open_fixture(path) as lines:
+                    result = import_comments(
+                        lines, options['batch_size'], options['database']
+                    )
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        for error in result.as_dict()['errors']:
+            self.stderr.write(f'Строка {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано комментариев: {result.created}, '
+            f'строк с ошибками: {len(result.errors)}.'
+        ))
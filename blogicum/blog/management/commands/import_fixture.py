@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from blog.fixtures import (
+    insert_objects, iter_objects, refresh_derived_data, reset_sequences,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузить фикстуру (JSON-массив или JSONL, можно .gz) потоково: '
+        'объекты вставляются пачками, каждая пачка — в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе.',
+        )
+        parser.add_argument(
+            '--ignorenonexistent', '-i', action='store_true',
+            help='Пропускать поля, которых нет в моделях.',
+        )
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        self.verbosity = options['verbosity']
+        self.ignore_conflicts = options['ignore_conflicts']
+        self.counts = Counter()
+        connection = connections[self.using]
+        batch_size = options['batch_size']
+        # Как и loaddata: внешние ключи проверяются один раз в конце,
+        # поэтому порядок моделей в файле не важен.
+        with connection.constraint_checks_disabled():
+            pending = defaultdict(list)
+            try:
+                for item in iter_objects(
+                    options['fixture'], self.using,
+                    options['ignorenonexistent'],
+                ):
+                    model = type(item.object)
+                    pending[model].append(item)
+                    if len(pending[model]) >= batch_size:
+                        self.flush(model, pending.pop(model))
+            except (DeserializationError, ValueError) as error:
+                raise CommandError(
+                    f'Ошибка в {options["fixture"]}: {error}'
+                ) from error
+            for model, items in pending.items():
+                self.flush(model, items)
+
+        models = set(self.counts)
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in models]
+        )
+        reset_sequences(models, self.using)
+        refresh_derived_data(
+            models, self.using, self.stdout, self.verbosity
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(self.counts.values())}.'
+        ))
+
+    def flush(self, model, items):
+        with transaction.atomic(using=self.using):
+            insert_objects(model, items, self.using, self.ignore_conflicts)
+        self.counts[model] += len(items)
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f'{model._meta.label}: {self.counts[model]}'
+            )
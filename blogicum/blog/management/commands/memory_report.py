@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blogicum.memtrack import read_entries
+
+
+def human(size):
+    for unit in ('Б', 'КиБ', 'МиБ'):
+        if abs(size) < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+    return f'{size:.1f} ГиБ'
+
+
+class ViewReport:
+    def __init__(self):
+        self.samples = 0
+        self.peaks = []
+        self.retained = 0
+        self.sites = defaultdict(int)
+
+    def add(self, entry):
+        self.samples += 1
+        self.peaks.append(entry['peak'])
+        self.retained += entry['retained']
+        for site in entry['sites']:
+            self.sites[site['site']] += site['size']
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка по выделениям памяти из MEMTRACK_DIR: пик и удержанная '
+        'память по представлениям и места, выделяющие больше всего.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*',
+                            help='Только эти представления.')
+        parser.add_argument('--dir', default=None,
+                            help='Каталог с результатами (MEMTRACK_DIR).')
+        parser.add_argument('--top', type=int, default=5,
+                            help='Сколько мест выделения показать.')
+
+    def handle(self, *args, **options):
+        reports = defaultdict(ViewReport)
+        for entry in read_entries(options['dir'] or settings.MEMTRACK_DIR):
+            if not options['views'] or entry['view'] in options['views']:
+                reports[entry['view']].add(entry)
+        if not reports:
+            raise CommandError(
+                'Нет данных: включите MEMTRACK_SAMPLE_RATE и дайте '
+                'серверу поработать.'
+            )
+        ranked = sorted(
+            reports.items(), key=lambda item: -max(item[1].peaks)
+        )
+        for view, report in ranked:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{view}: {report.samples} запр., пик в среднем '
+                f'{human(sum(report.peaks) / report.samples)}, максимум '
+                f'{human(max(report.peaks))}, удержано в среднем '
+                f'{human(report.retained / report.samples)}'
+            ))
+            sites = sorted(report.sites.items(), key=lambda item: -item[1])
+            for site, size in sites[:options['top']]:
+                self.stdout.write(
+                    f'  {human(size / report.samples):>10}  {site}'
+                )
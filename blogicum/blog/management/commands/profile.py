@@ -0,0 +1,80 @@
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from blogicum.profiler import (
+    make_token, profile_dir, read_collapsed, start_window, write_collapsed,
+)
+
+# Сколько ждать после окна, пока воркеры допишут свои файлы.
+WRITE_GRACE_SECONDS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Профилирование живого сервера: --token --user --path выдаёт '
+        'подписанный токен для параметра ?profile= одного запроса '
+        'сотрудника к странице, --seconds N включает '
+        'семплирование во всех воркерах на N секунд и склеивает их стеки '
+        'в один collapsed-файл для flamegraph.'
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--token', action='store_true')
+        group.add_argument('--seconds', type=float)
+        parser.add_argument(
+            '--user', help='Логин сотрудника, которому выдаётся токен.',
+        )
+        parser.add_argument(
+            '--path', help='Путь страницы, например /posts/1/.',
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help='Куда записать склеенные стеки окна.',
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(self.token(options['user'], options['path']))
+            return
+        if options['seconds'] <= 0:
+            raise CommandError('--seconds должно быть больше нуля.')
+        window = start_window(options['seconds'])
+        self.stdout.write(
+            f'Окно {window["id"]}: воркеры профилируются '
+            f'{options["seconds"]:g} с.'
+        )
+        time.sleep(options['seconds'] + WRITE_GRACE_SECONDS)
+
+        stacks = Counter()
+        files = sorted(
+            profile_dir().glob(f'window-{window["id"]}-*.collapsed')
+        )
+        for path in files:
+            read_collapsed(path, stacks)
+        if not files:
+            raise CommandError(
+                'Ни один воркер не записал стеки: за время окна не было '
+                'запросов или ProfilerMiddleware не подключён.'
+            )
+        output = options['output'] or (
+            profile_dir() / f'window-{window["id"]}.collapsed'
+        )
+        write_collapsed(stacks, Path(output))
+        self.stdout.write(self.style.SUCCESS(
+            f'Стеки {len(files)} процессов записаны в {output}.'
+        ))
+
+    def token(self, username, path):
+        if not username or not path:
+            raise CommandError('Для --token нужны --user и --path.')
+        user = get_user_model().objects.filter(
+            username=username, is_staff=True
+        ).first()
+        if user is None:
+            raise CommandError(f'Сотрудник {username} не найден.')
+        return make_token(user, path)
@@ -0,0 +1,142 @@
+import os
+from collections import deque
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from blog.models import Post
+from blog.search import FTS_TABLE, create_table, write_rows
+from blog.stemmer import stem_rows
+
+BUILD_TABLE = f'{FTS_TABLE}_build'
+# Id постов, изменённых во время сборки (пишут триггеры).
+CHANGES_TABLE = f'{FTS_TABLE}_changes'
+TRIGGERS = {
+    f'{CHANGES_TABLE}_insert': 'AFTER INSERT ON {posts}',
+    f'{CHANGES_TABLE}_update': 'AFTER UPDATE OF title, text ON {posts}',
+    f'{CHANGES_TABLE}_delete': 'AFTER DELETE ON {posts}',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобрать поисковый индекс постов: основы слов считаются '
+        'параллельно по частям, индекс строится в отдельной таблице и '
+        'подменяет старый одной транзакцией. Посты, сохранённые или '
+        'удалённые во время сборки, отмечают триггеры; перед подменой '
+        'они индексируются заново.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Число процессов (по умолчанию — по ядрам).')
+        parser.add_argument('--database', default=None,
+                            help='Алиас БД (по умолчанию — из роутера).')
+
+    def chunks(self, chunk_size):
+        last_id = 0
+        while True:
+            rows = list(
+                Post.objects.using(self.connection.alias)
+                .filter(pk__gt=last_id).order_by('pk')
+                .values_list('id', 'title', 'text')[:chunk_size]
+            )
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def handle(self, *args, **options):
+        alias = (
+            options['database'] or router.db_for_write(Post)
+            or DEFAULT_DB_ALIAS
+        )
+        self.connection = connections[alias]
+        if self.connection.vendor != 'sqlite':
+            raise CommandError('Поиск по FTS5 доступен только для SQLite.')
+        self.verbosity = options['verbosity']
+        self.total = 0
+        self.prepare()
+        self.build(
+            options['workers'] or os.cpu_count() or 1, options['chunk_size']
+        )
+        self.swap()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс пересобран: {self.total} постов.'
+        ))
+
+    def prepare(self):
+        """Пустая таблица сборки и триггеры, отмечающие изменения постов."""
+        posts = Post._meta.db_table
+        with self.connection.cursor() as cursor:
+            self.drop_triggers(cursor)
+            cursor.execute(f'DROP TABLE IF EXISTS {CHANGES_TABLE}')
+            cursor.execute(f'DROP TABLE IF EXISTS {BUILD_TABLE}')
+            create_table(cursor, BUILD_TABLE)
+            cursor.execute(
+                f'CREATE TABLE {CHANGES_TABLE} (post_id INTEGER PRIMARY KEY)'
+            )
+            for name, event in TRIGGERS.items():
+                row = 'OLD' if 'DELETE' in event else 'NEW'
+                cursor.execute(
+                    f'CREATE TRIGGER {name} {event.format(posts=posts)} '
+                    f'BEGIN INSERT OR IGNORE INTO {CHANGES_TABLE} '
+                    f'VALUES ({row}.id); END'
+                )
+
+    def build(self, workers, chunk_size):
+        # Чтение из БД и запись остаются в основном процессе, воркеры
+        # только считают основы; в работе не больше 2 частей на воркер.
+        with Pool(workers) as pool:
+            pending = deque()
+            for rows in self.chunks(chunk_size):
+                pending.append(pool.apply_async(stem_rows, (rows,)))
+                if len(pending) >= workers * 2:
+                    self.write(pending.popleft().get())
+            while pending:
+                self.write(pending.popleft().get())
+
+    def swap(self):
+        """Доиндексировать изменённые посты и подменить индекс.
+
+        Удаление триггеров — первая запись транзакции: дальше она держит
+        блокировку записи, и новые изменения постов ждут подмены.
+        """
+        with transaction.atomic(using=self.connection.alias), \
+                self.connection.cursor() as cursor:
+            self.drop_triggers(cursor)
+            cursor.execute(f'SELECT post_id FROM {CHANGES_TABLE}')
+            changed = [pk for pk, in cursor.fetchall()]
+            cursor.executemany(
+                f'DELETE FROM {BUILD_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in changed],
+            )
+            write_rows(cursor, stem_rows(
+                Post.objects.using(self.connection.alias)
+                .filter(pk__in=changed).values_list('id', 'title', 'text')
+            ), table=BUILD_TABLE)
+            cursor.execute(f'DROP TABLE {CHANGES_TABLE}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+            cursor.execute(f'ALTER TABLE {BUILD_TABLE} RENAME TO {FTS_TABLE}')
+        if changed and self.verbosity >= 1:
+            self.stdout.write(
+                f'Изменено во время сборки постов: {len(changed)}'
+            )
+
+    def drop_triggers(self, cursor):
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    def write(self, stemmed):
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                write_rows(cursor, stemmed, table=BUILD_TABLE)
+        self.total += len(stemmed)
+        if self.verbosity >= 1:
+            self.stdout.write(f'Проиндексировано постов: {self.total}')
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.mail import send_queued
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправить письма из очереди (QueuedEmailBackend) через '
+        'EMAIL_QUEUE_BACKEND. С --loop работает как воркер и проверяет '
+        'очередь каждые --interval секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.drain(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено: {sent}, отложено после ошибки: {failed}'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size):
+        """Отправлять пачки, пока в очереди есть готовые письма."""
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued(batch_size)
+            total_sent += sent
+            total_failed += failed
+            # Неудачные письма отложены, но при нулевой задержке их
+            # выбрало бы снова: без успешных отправок выходим.
+            if not sent:
+                return total_sent, total_failed
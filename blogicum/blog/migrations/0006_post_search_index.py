@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from blog.stemmer import stem_rows
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts "
+    "USING fts5(title, text, tokenize='unicode61 remove_diacritics 2')"
+)
+DROP_SQL = 'DROP TABLE IF EXISTS blog_post_fts'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('blog', 'Post')
+    schema_editor.execute(CREATE_SQL)
+    rows = stem_rows(Post.objects.values_list('id', 'title', 'text'))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO blog_post_fts(rowid, title, text) '
+            'VALUES (%s, %s, %s)',
+            rows,
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
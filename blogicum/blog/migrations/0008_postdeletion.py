@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, verbose_name='Запрошено')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_deletion', to='blog.post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'удаление публикации',
+                'verbose_name_plural': 'Очередь удаления публикаций',
+                'ordering': ['requested_at', 'pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_postdeletion'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='postdeletion',
+            options={'ordering': ['attempts', 'requested_at', 'pk'], 'verbose_name': 'удаление публикации', 'verbose_name_plural': 'Очередь удаления публикаций'},
+        ),
+        migrations.AddField(
+            model_name='postdeletion',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток'),
+        ),
+        migrations.AddField(
+            model_name='postdeletion',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Последняя ошибка'),
+        ),
+    ]
@@ -22,7 +22,8 @@ class BaseModel(models.Model):
 
 
 class Category(BaseModel):
-    title = models.CharField(max_length=TEXT_LENGTH, verbose_name='Заголовок')
+    title = models.CharField(max_length=TEXT_LENGTH, verbose_name='Заголовок',
+                             db_index=True)
     description = models.TextField(verbose_name='Описание')
     slug = models.SlugField(
         unique=True,
@@ -41,7 +42,8 @@ class Category(BaseModel):
 
 class Location(BaseModel):
     name = models.CharField(max_length=TEXT_LENGTH,
-                            verbose_name='Название места')
+                            verbose_name='Название места',
+                            db_index=True)
 
     class Meta:
         verbose_name = 'местоположение'
@@ -85,6 +87,12 @@ class Post(BaseModel):
         blank=True,
         verbose_name='Изображение'
     )
+    # Денормализованный счётчик: ленты не считают комментарии через JOIN.
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
 
     class Meta:
         verbose_name = 'публикация'
@@ -116,3 +124,56 @@ class Comment(models.Model):
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['created_at']
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (см. ``blog.mail``)."""
+
+    from_email = models.CharField(max_length=TEXT_LENGTH,
+                                  verbose_name='Отправитель')
+    recipients = models.TextField(verbose_name='Получатели',
+                                  help_text='По одному адресу в строке.')
+    message = models.BinaryField(verbose_name='Письмо (MIME)')
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      verbose_name='Добавлено')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток отправки'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, db_index=True,
+        verbose_name='Следующая попытка'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+
+    class Meta:
+        verbose_name = 'письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ['next_attempt_at', 'pk']
+
+    def __str__(self):
+        return f'{self.from_email} → {self.recipients.replace(chr(10), ", ")}'
+
+
+class PostDeletion(models.Model):
+    """Пост в очереди на удаление (см. ``blog.deletion``)."""
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='pending_deletion',
+        verbose_name='Публикация'
+    )
+    requested_at = models.DateTimeField(auto_now_add=True,
+                                        verbose_name='Запрошено')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Неудачных попыток'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+
+    class Meta:
+        verbose_name = 'удаление публикации'
+        verbose_name_plural = 'Очередь удаления публикаций'
+        ordering = ['attempts', 'requested_at', 'pk']
+
+    def __str__(self):
+        return f'Удаление публикации {self.post_id}'
@@ -0,0 +1,126 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+В таблице ``blog_post_fts`` (rowid = id поста) лежат основы слов
+заголовка и текста: FTS5 не умеет стемминг русского, поэтому текст
+проходит через ``blog.stemmer`` до записи и так же обрабатывается запрос.
+Индекс обновляется сигналами при сохранении и удалении поста; массовые
+загрузки вызывают ``index_posts()`` сами или пересобирают индекс командой
+``rebuild_search_index``.
+"""
+from django.core import signing
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import Category, Post
+from .stemmer import stem_rows, stem_words
+
+FTS_TABLE = 'blog_post_fts'
+# Вес совпадений в заголовке и в тексте для bm25().
+TITLE_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+CURSOR_SALT = 'blog.search.cursor'
+
+
+def _connection(write=False):
+    alias = router.db_for_write(Post) if write else router.db_for_read(Post)
+    return connections[alias or 'default']
+
+
+def create_table(cursor, table=FTS_TABLE):
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE {table} USING fts5(title, text, '
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+
+
+def write_rows(cursor, rows, table=FTS_TABLE):
+    """Записать уже обработанные стеммером строки ``(id, title, text)``."""
+    cursor.executemany(
+        f'INSERT OR REPLACE INTO {table}(rowid, title, text) '
+        'VALUES (%s, %s, %s)',
+        rows,
+    )
+
+
+def index_posts(rows):
+    """Проиндексировать посты, заданные кортежами ``(id, title, text)``."""
+    connection = _connection(write=True)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        write_rows(cursor, stem_rows(rows))
+
+
+def unindex_posts(post_ids):
+    connection = _connection(write=True)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in post_ids],
+        )
+
+
+def build_match(query):
+    """Выражение MATCH: все основы слов запроса, каждая как префикс."""
+    # Основы состоят только из символов \w, кавычки им не нужны для
+    # экранирования, но защищают от ключевых слов FTS5 (AND, NEAR...).
+    return ' '.join(f'"{word}"*' for word in stem_words(query))
+
+
+def encode_cursor(rank, pk):
+    return signing.dumps([rank, pk], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    try:
+        rank, pk = signing.loads(cursor, salt=CURSOR_SALT)
+        return float(rank), int(pk)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def search_post_ids(query, cursor=None, limit=10):
+    """Id видимых всем постов по запросу, лучшие совпадения первыми.
+
+    Возвращает ``(ids, next_cursor)``; курсор — подписанная пара
+    (ранг, id) последнего поста страницы.
+    """
+    match = build_match(query)
+    if not match:
+        return [], None
+    position = decode_cursor(cursor) if cursor else None
+    connection = _connection()
+    post_table = Post._meta.db_table
+    category_table = Category._meta.db_table
+    # Те же правила видимости, что у ленты index(): опубликован,
+    # не отложен, категория опубликована или не указана.
+    sql = (
+        'SELECT m.id, m.score FROM ('
+        f'SELECT rowid AS id, bm25({FTS_TABLE}, %s, %s) AS score '
+        f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        ') m '
+        f'JOIN {post_table} p ON p.id = m.id '
+        f'LEFT JOIN {category_table} c ON c.id = p.category_id '
+        'WHERE p.is_published AND p.pub_date <= %s '
+        'AND (p.category_id IS NULL OR c.is_published) '
+    )
+    params = [
+        TITLE_WEIGHT, TEXT_WEIGHT, match,
+        connection.ops.adapt_datetimefield_value(timezone.now()),
+    ]
+    if position is not None:
+        sql += 'AND (m.score > %s OR (m.score = %s AND m.id > %s)) '
+        params += [position[0], position[0], position[1]]
+    sql += 'ORDER BY m.score, m.id LIMIT %s'
+    params.append(limit + 1)
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        ranked = db_cursor.fetchall()
+    next_cursor = None
+    if len(ranked) > limit:
+        ranked = ranked[:limit]
+        next_cursor = encode_cursor(ranked[-1][1], ranked[-1][0])
+    return [pk for pk, _ in ranked], next_cursor
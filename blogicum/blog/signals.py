@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from blogicum import pagecache
+from blogicum.usercache import user_cache
+from .choices import CHOICE_SOURCES
+from .models import Category, Comment, Location, Post
+from .search import index_posts, unindex_posts
+from .typeahead import typeahead
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def bump_choices_version(sender, **kwargs):
+    """Сбросить закэшированные варианты выбора после изменения таблицы."""
+    for source in CHOICE_SOURCES.values():
+        if source.model is sender:
+            source.bump_version()
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    index_posts([(instance.pk, instance.title, instance.text)])
+    typeahead.post_saved(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    unindex_posts([instance.pk])
+    typeahead.post_deleted(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestions(sender, instance, **kwargs):
+    typeahead.category_saved(instance)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance, **kwargs):
+    typeahead.category_deleted(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def update_user_suggestions(sender, instance, **kwargs):
+    typeahead.user_saved(instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_user_suggestions(sender, instance, **kwargs):
+    typeahead.user_deleted(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбросить пользователя в кэше процесса (смена пароля, профиль)."""
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_pages(sender, update_fields=None, **kwargs):
+    """Сбросить кэш страниц после изменения показываемых на них данных."""
+    # Вход обновляет только last_login, на страницах его нет.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    pagecache.bump()
@@ -0,0 +1,112 @@
+"""Стеммер для русского языка (алгоритм Snowball/Портера) и токенизация.
+
+Модуль не зависит от Django: его функции выполняются в процессах
+пересборки поискового индекса.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'\w+')
+
+PERFECTIVE_GERUND_RE = re.compile(
+    r'(?:(?<=[ая])(?:вшись|вши|в)|ившись|ывшись|ивши|ывши|ив|ыв)$'
+)
+REFLEXIVE_RE = re.compile(r'(?:ся|сь)$')
+ADJECTIVE = (
+    'ими|ыми|его|ого|ему|ому|ее|ие|ые|ое|ей|ий|ый|ой|ем|им|ым|ом|'
+    'их|ых|ую|юю|ая|яя|ою|ею'
+)
+PARTICIPLE = '(?<=[ая])(?:ем|нн|вш|ющ|щ)|ивш|ывш|ующ'
+ADJECTIVAL_RE = re.compile(rf'(?:{PARTICIPLE})?(?:{ADJECTIVE})$')
+VERB_RE = re.compile(
+    r'(?:(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)'
+    r'|ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)$'
+)
+NOUN_RE = re.compile(
+    r'(?:иями|ями|ами|ией|иям|ием|иях|ев|ов|ие|ье|еи|ии|ей|ой|ий|ям|ем|'
+    r'ам|ом|ах|ях|ию|ью|ия|ья|а|е|и|й|о|у|ы|ь|ю|я)$'
+)
+SUPERLATIVE_RE = re.compile(r'ейше?$')
+DERIVATIONAL_RE = re.compile(r'ость?$')
+
+
+def _region_start(word, start):
+    """Начало области после первой пары «гласная + согласная»."""
+    for index in range(start + 1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip(regex, rv):
+    """``rv`` без окончания по ``regex`` и признак, что оно было."""
+    match = regex.search(rv)
+    if match:
+        return rv[:match.start()], True
+    return rv, False
+
+
+def _strip_ending(rv):
+    """Шаг 1: деепричастие или возвратная частица и окончание."""
+    rv, found = _strip(PERFECTIVE_GERUND_RE, rv)
+    if found:
+        return rv
+    rv = REFLEXIVE_RE.sub('', rv)
+    for regex in (ADJECTIVAL_RE, VERB_RE, NOUN_RE):
+        rv, found = _strip(regex, rv)
+        if found:
+            break
+    return rv
+
+
+def _strip_derivational(rv, offset, r2):
+    """Шаг 3: словообразовательный суффикс, если он целиком в R2."""
+    match = DERIVATIONAL_RE.search(rv)
+    if match and offset + match.start() >= r2:
+        return rv[:match.start()]
+    return rv
+
+
+def _strip_superlative(rv):
+    """Шаг 4: «нн», превосходная степень или мягкий знак."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    rv, found = _strip(SUPERLATIVE_RE, rv)
+    if found:
+        return rv[:-1] if rv.endswith('нн') else rv
+    return rv[:-1] if rv.endswith('ь') else rv
+
+
+def stem(word):
+    """Основа слова; нерусские слова только приводятся к нижнему регистру."""
+    word = word.lower().replace('ё', 'е')
+    first_vowel = next(
+        (index for index, char in enumerate(word) if char in VOWELS), None
+    )
+    if first_vowel is None:
+        return word
+    prefix, rv = word[:first_vowel + 1], word[first_vowel + 1:]
+    r2 = _region_start(word, _region_start(word, 0))
+
+    rv = _strip_ending(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    rv = _strip_derivational(rv, len(prefix), r2)
+    return prefix + _strip_superlative(rv)
+
+
+def stem_words(text):
+    """Основы всех слов текста в исходном порядке."""
+    return [stem(word) for word in WORD_RE.findall(text or '')]
+
+
+def stem_text(text):
+    return ' '.join(stem_words(text))
+
+
+def stem_rows(rows):
+    """``(id, title, text)`` -> строки индекса; для пула процессов."""
+    return [
+        (pk, stem_text(title), stem_text(text)) for pk, title, text in rows
+    ]
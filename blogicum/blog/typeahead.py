@@ -0,0 +1,380 @@
+"""Подсказки при вводе: заголовки постов, @имена пользователей, категории.
+
+Индекс живёт в памяти процесса: для каждого типа — отсортированный массив
+ключей (строка в ``casefold``), поиск по префиксу — двоичный поиск и
+проход по соседним элементам, без запросов к БД. Строится в фоне при
+старте сервера (``warm_up()`` из ``wsgi.py``/``asgi.py``) — запрос ждёт
+сборки, только если индекса ещё нет совсем, — и обновляется сигналами
+при сохранении и удалении объектов.
+Изменения, сделанные в других процессах, подхватываются полной
+пересборкой в фоне раз в ``TYPEAHEAD_REBUILD_SECONDS``: новый снимок
+подменяет старый одним присваиванием, а сохранения, пришедшие во время
+сборки, повторяются на нём перед подменой.
+"""
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Category, Post
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+RESULTS_PER_KIND = 5
+# Сколько изменений копится в буфере до слияния с основным массивом.
+COMPACT_THRESHOLD = 1024
+
+
+class SortedPrefixIndex:
+    """Отсортированный массив пар ``(ключ, id)`` с буфером изменений.
+
+    Всё состояние — один неизменяемый кортеж ``(ключи, id, добавленные,
+    удалённые)``, который при каждом изменении заменяется целиком одним
+    присваиванием, поэтому чтение идёт без блокировки по согласованному
+    снимку.
+    """
+
+    def __init__(self, items=()):
+        pairs = sorted(items)
+        self._state = (
+            tuple(key for key, _ in pairs),
+            tuple(ident for _, ident in pairs),
+            (),
+            frozenset(),
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        keys, _, added, removed = self._state
+        return len(keys) + len(added) - len(removed)
+
+    def add(self, key, ident):
+        with self._lock:
+            keys, ids, added, removed = self._state
+            pair = (key, ident)
+            if pair in removed:
+                removed = removed - {pair}
+            else:
+                added = list(added)
+                insort(added, pair)
+                added = tuple(added)
+            self._state = (keys, ids, added, removed)
+            if len(added) + len(removed) > COMPACT_THRESHOLD:
+                self._compact()
+
+    def remove(self, key, ident):
+        with self._lock:
+            keys, ids, added, removed = self._state
+            pair = (key, ident)
+            if pair in added:
+                added = tuple(item for item in added if item != pair)
+            else:
+                removed = removed | {pair}
+            self._state = (keys, ids, added, removed)
+
+    def _compact(self):
+        keys, ids, added, removed = self._state
+        pairs = [
+            pair for pair in heapq.merge(zip(keys, ids), added)
+            if pair not in removed
+        ]
+        self._state = (
+            tuple(key for key, _ in pairs),
+            tuple(ident for _, ident in pairs),
+            (),
+            frozenset(),
+        )
+
+    @staticmethod
+    def _range(keys, ids, prefix):
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix):
+            yield keys[index], ids[index]
+            index += 1
+
+    def search(self, prefix):
+        """Пары ``(ключ, id)`` с ключом, начинающимся с ``prefix``."""
+        keys, ids, added, removed = self._state
+        added_keys = [key for key, _ in added]
+        added_ids = [ident for _, ident in added]
+        for pair in heapq.merge(
+            self._range(keys, ids, prefix),
+            self._range(added_keys, added_ids, prefix),
+        ):
+            if pair not in removed:
+                yield pair
+
+
+def _key(text):
+    return text.casefold()
+
+
+class Snapshot:
+    """Индексы и сведения об объектах одной сборки.
+
+    Изменения из сигналов применяются к снимку на месте: сначала ключ
+    убирается из индекса, потом сведения об объекте, а читатели берут
+    сведения через ``get()`` и пропускают исчезнувшие id.
+    """
+
+    def __init__(self, post_info, category_info, usernames):
+        self.post_info = post_info
+        self.category_info = category_info
+        self.usernames = usernames
+        self.posts = SortedPrefixIndex(
+            (_key(title), pk) for pk, (title, _, _) in post_info.items()
+        )
+        self.categories = SortedPrefixIndex(
+            (_key(title), pk)
+            for pk, (title, _, published) in category_info.items()
+            if published
+        )
+        self.users = SortedPrefixIndex(
+            (_key(username), pk) for pk, username in usernames.items()
+        )
+
+    @classmethod
+    def build(cls):
+        posts = {
+            pk: (title, pub_date, category_id)
+            for pk, title, pub_date, category_id in Post.objects.filter(
+                is_published=True
+            ).values_list('id', 'title', 'pub_date', 'category_id')
+            .iterator()
+        }
+        categories = {
+            pk: (title, slug, is_published)
+            for pk, title, slug, is_published in Category.objects.values_list(
+                'id', 'title', 'slug', 'is_published'
+            )
+        }
+        users = dict(User.objects.values_list('id', 'username').iterator())
+        return cls(posts, categories, users)
+
+    def post_saved(self, pk, info):
+        self.post_deleted(pk)
+        if info is not None:
+            self.post_info[pk] = info
+            self.posts.add(_key(info[0]), pk)
+
+    def post_deleted(self, pk):
+        old = self.post_info.get(pk)
+        if old is not None:
+            self.posts.remove(_key(old[0]), pk)
+            self.post_info.pop(pk, None)
+
+    def category_saved(self, pk, info):
+        self.category_deleted(pk)
+        self.category_info[pk] = info
+        if info[2]:
+            self.categories.add(_key(info[0]), pk)
+
+    def category_deleted(self, pk):
+        old = self.category_info.get(pk)
+        if old is not None:
+            if old[2]:
+                self.categories.remove(_key(old[0]), pk)
+            self.category_info.pop(pk, None)
+
+    def user_saved(self, pk, username):
+        self.user_deleted(pk)
+        self.usernames[pk] = username
+        self.users.add(_key(username), pk)
+
+    def user_deleted(self, pk):
+        old = self.usernames.get(pk)
+        if old is not None:
+            self.users.remove(_key(old), pk)
+            self.usernames.pop(pk, None)
+
+
+class Typeahead:
+    def __init__(self):
+        self.built_at = None
+        self.snapshot = None
+        # Держит сборку снимка: синхронную при пустом индексе или
+        # фоновую — тогда её отпускает поток сборки.
+        self._build_lock = threading.Lock()
+        # Изменения из сигналов: применяются к текущему снимку, а пока
+        # строится новый — ещё и записываются, чтобы повторить их на нём.
+        self._update_lock = threading.Lock()
+        self._journal = None
+
+    def build(self):
+        now = timezone.now()
+        with self._update_lock:
+            self._journal = []
+        try:
+            fresh = Snapshot.build()
+        except Exception:
+            with self._update_lock:
+                self._journal = None
+            raise
+        with self._update_lock:
+            for method, args in self._journal:
+                getattr(fresh, method)(*args)
+            self._journal = None
+            self.snapshot = fresh
+            self.built_at = now
+
+    def ensure_built(self):
+        """Дождаться индекса, если его нет; устаревший — пересобрать в фоне."""
+        if self.built_at is None:
+            with self._build_lock:
+                if self.built_at is None:
+                    self.build()
+            return
+        max_age = getattr(settings, 'TYPEAHEAD_REBUILD_SECONDS', 300)
+        age = (timezone.now() - self.built_at).total_seconds()
+        if age > max_age:
+            self.rebuild_in_background()
+
+    def warm_up(self):
+        """Построить индекс в фоне при старте, не задерживая запуск."""
+        if self.built_at is None:
+            self.rebuild_in_background()
+
+    def rebuild_in_background(self):
+        # Неблокирующий захват: если сборка уже идёт, вторую не начинаем.
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            threading.Thread(
+                target=self._rebuild, name='typeahead-build', daemon=True
+            ).start()
+        except Exception:
+            self._build_lock.release()
+            raise
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except Exception:
+            # Запрос, которому нужен индекс, повторит сборку сам.
+            logger.exception('Не удалось построить индекс подсказок')
+        finally:
+            connection.close()
+            self._build_lock.release()
+
+    @staticmethod
+    def _is_visible(snapshot, info, now):
+        _, pub_date, category_id = info
+        if pub_date > now:
+            return False
+        if category_id is None:
+            return True
+        category = snapshot.category_info.get(category_id)
+        return category is not None and category[2]
+
+    def suggest(self, query, limit=RESULTS_PER_KIND):
+        """Подсказки по началу строки; ``@`` в начале — только авторы."""
+        self.ensure_built()
+        query = query.strip()
+        results = []
+        if not query:
+            return results
+        if query.startswith('@'):
+            sources = (self._suggest_users,)
+            query = query[1:]
+        else:
+            sources = (
+                self._suggest_posts, self._suggest_categories,
+                self._suggest_users,
+            )
+        prefix = _key(query)
+        snapshot = self.snapshot
+        for source in sources:
+            results.extend(source(snapshot, prefix, limit))
+        return results
+
+    def _suggest_posts(self, snapshot, prefix, limit):
+        now = timezone.now()
+        found = (
+            (pk, snapshot.post_info.get(pk))
+            for _, pk in snapshot.posts.search(prefix)
+        )
+        visible = (
+            (pk, info) for pk, info in found
+            if info is not None and self._is_visible(snapshot, info, now)
+        )
+        return [{
+            'type': 'post',
+            'text': info[0],
+            'url': reverse('blog:post_detail', args=[pk]),
+        } for pk, info in islice(visible, limit)]
+
+    def _suggest_categories(self, snapshot, prefix, limit):
+        results = []
+        for _, pk in snapshot.categories.search(prefix):
+            info = snapshot.category_info.get(pk)
+            if info is None:
+                continue
+            title, slug, _ = info
+            results.append({
+                'type': 'category',
+                'text': title,
+                'url': reverse('blog:category_posts', args=[slug]),
+            })
+            if len(results) == limit:
+                break
+        return results
+
+    def _suggest_users(self, snapshot, prefix, limit):
+        results = []
+        for _, pk in snapshot.users.search(prefix):
+            username = snapshot.usernames.get(pk)
+            if username is None:
+                continue
+            results.append({
+                'type': 'user',
+                'text': f'@{username}',
+                'url': reverse('blog:profile', args=[username]),
+            })
+            if len(results) == limit:
+                break
+        return results
+
+    # Инкрементальные обновления из сигналов; до первой сборки индекса
+    # обновлять нечего.
+
+    def _update(self, method, *args):
+        with self._update_lock:
+            if self._journal is not None:
+                self._journal.append((method, args))
+            if self.snapshot is not None:
+                getattr(self.snapshot, method)(*args)
+
+    def post_saved(self, post):
+        info = (
+            (post.title, post.pub_date, post.category_id)
+            if post.is_published else None
+        )
+        self._update('post_saved', post.pk, info)
+
+    def post_deleted(self, pk):
+        self._update('post_deleted', pk)
+
+    def category_saved(self, category):
+        self._update('category_saved', category.pk, (
+            category.title, category.slug, category.is_published
+        ))
+
+    def category_deleted(self, pk):
+        self._update('category_deleted', pk)
+
+    def user_saved(self, user):
+        self._update('user_saved', user.pk, user.username)
+
+    def user_deleted(self, pk):
+        self._update('user_deleted', pk)
+
+
+typeahead = Typeahead()
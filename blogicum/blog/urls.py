@@ -6,6 +6,8 @@ app_name = 'blog'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('search/', views.search, name='search'),
+    path('typeahead/', views.typeahead, name='typeahead'),
     path('posts/<int:id>/', views.post_detail, name='post_detail'),
     path('category/<slug:category_slug>/', views.category_posts,
          name='category_posts'),
@@ -23,8 +25,11 @@ urlpatterns = [
         views.comment_add,
         name='add_comment',
     ),
+    path('comments/import/', views.comment_import, name='import_comments'),
     path('posts/<int:post_id>/edit_comment/<int:comment_id>/',
          views.comment_edit, name='edit_comment'),
     path('posts/<int:post_id>/delete_comment/<int:comment_id>/',
          views.comment_delete, name='delete_comment'),
+    path('choices/<str:source>/', views.picker_choices,
+         name='picker_choices'),
 ]
@@ -1,15 +1,29 @@
+import math
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model, login, authenticate
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
 from django.utils import timezone
-from django.db.models import Count, Q
-from django.http import Http404
+from django.db.models import Q
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_POST
+
+from blogicum.pagecache import skip_for_viewer
 
+from .choices import CHOICE_SOURCES
+from .comment_import import import_comments
+from .comments import CommentQueueTimeout, save_comment
+from .deletion import request_deletion
+from .search import search_post_ids
+from .typeahead import typeahead as typeahead_index
 from .forms import CommentForm, PostForm, UserProfileForm
-from .models import Category, Post, Comment
+from .models import Category, Post, PostDeletion, Comment
 
 
 User = get_user_model()
@@ -21,14 +35,12 @@ POSTS_PER_PAGE = 10
 def posts_queryset():
     """Получение постов из БД"""
     # select_related берёт связанные объекты за один запрос,
-    # чтобы шаблонам не приходилось ходить в базу каждый раз
-    # annotate добавляет количество комментариев к каждому посту
+    # чтобы шаблонам не приходилось ходить в базу каждый раз.
+    # Количество комментариев хранится в самом посте (comment_count)
     return Post.objects.select_related(
         'category',
         'location',
         'author'
-    ).annotate(
-        comment_count=Count('comments')
     ).order_by('-pub_date')
 
 
@@ -46,6 +58,28 @@ def index(request):
     return render(request, 'blog/index.html', {'page_obj': page_obj})
 
 
+def search(request):
+    """Поиск по заголовкам и текстам публикаций."""
+    query = request.GET.get('q', '').strip()
+    post_ids, next_cursor = search_post_ids(
+        query, request.GET.get('cursor'), POSTS_PER_PAGE
+    )
+    posts_by_id = posts_queryset().in_bulk(post_ids)
+    context = {
+        'query': query,
+        'posts': [posts_by_id[pk] for pk in post_ids if pk in posts_by_id],
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'blog/search.html', context)
+
+
+def typeahead(request):
+    """Подсказки по началу заголовка поста, категории или @имени."""
+    return JsonResponse({
+        'results': typeahead_index.suggest(request.GET.get('q', ''))
+    })
+
+
 def post_detail(request, id):
     """Отображение полного описания выбранной записи."""
     post = get_object_or_404(posts_queryset(), id=id)
@@ -62,7 +96,11 @@ def post_detail(request, id):
     comments = post.comments.select_related('author').all()
     form = CommentForm()
     context = {'post': post, 'comments': comments, 'form': form}
-    return render(request, 'blog/detail.html', context)
+    response = render(request, 'blog/detail.html', context)
+    if not is_public:
+        # Скрытый пост видит только автор — в общий кэш страниц нельзя
+        patch_cache_control(response, private=True)
+    return response
 
 
 def category_posts(request, category_slug):
@@ -97,6 +135,9 @@ def _profile_posts(viewer, profile_user):
     return qs
 
 
+@skip_for_viewer(
+    lambda request, username: request.user.username == username
+)
 def profile(request, username):
     user = get_object_or_404(User, username=username)
     viewer = request.user if request.user.is_authenticated else None
@@ -104,7 +145,11 @@ def profile(request, username):
     paginator = Paginator(qs, POSTS_PER_PAGE)
     page_obj = paginator.get_page(request.GET.get('page'))
     context = {'profile': user, 'page_obj': page_obj}
-    return render(request, 'blog/profile.html', context)
+    response = render(request, 'blog/profile.html', context)
+    if viewer == user:
+        # Свой профиль показывает и неопубликованные записи
+        patch_cache_control(response, private=True)
+    return response
 
 
 @login_required
@@ -137,6 +182,10 @@ def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
         return redirect('blog:post_detail', id=post.id)
+    if PostDeletion.objects.filter(post=post).exists():
+        # Иначе автор мог бы снова опубликовать пост до его удаления
+        messages.error(request, 'Публикация удаляется, изменить её нельзя')
+        return redirect('blog:post_detail', id=post.id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
@@ -156,25 +205,93 @@ def post_delete(request, post_id):
     if request.user != post.author:
         return redirect('blog:post_detail', id=post.id)
     if request.method == 'POST':
-        post.delete()
-        messages.success(request, 'Публикация удалена')
+        if request_deletion(post):
+            messages.success(request, 'Публикация удалена')
+        else:
+            messages.success(
+                request, 'Публикация скрыта и будет удалена в фоне'
+            )
         return redirect('blog:index')
     form = PostForm(instance=post)
     return render(request, 'blog/create.html', {'form': form})
 
 
+def visible_posts(user):
+    """Посты, которые пользователь может открыть: публичные и свои."""
+    public = Q(
+        Q(category__is_published=True) | Q(category__isnull=True),
+        is_published=True,
+        pub_date__lte=timezone.now(),
+    )
+    if user.is_authenticated:
+        public |= Q(author=user)
+    return Post.objects.filter(public)
+
+
+def comment_timeout(request, post_id, fragment):
+    """Ответ, если пачка с комментарием не записалась вовремя.
+
+    Писатель мог закоммитить её уже после таймаута, поэтому пользователя
+    предупреждаем, что комментарий, возможно, уже опубликован.
+    """
+    text = (
+        'Комментарий не успел сохраниться. Возможно, он уже опубликован — '
+        'обновите страницу, прежде чем отправлять его снова.'
+    )
+    if fragment:
+        response = JsonResponse(
+            {'errors': {'__all__': [{'message': text, 'code': 'timeout'}]}},
+            status=503,
+        )
+        response['Retry-After'] = str(math.ceil(
+            getattr(settings, 'COMMENT_GROUP_COMMIT_TIMEOUT', 5)
+        ))
+        return response
+    messages.warning(request, text)
+    return redirect('blog:post_detail', id=post_id)
+
+
 @login_required
 def comment_add(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    form = CommentForm(request.POST or None)
-    if request.method == 'POST' and form.is_valid():
-        # save(commit=False) — чтобы заполнить автора и пост вручную
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
-        messages.success(request, 'Комментарий добавлен')
-    return redirect('blog:post_detail', id=post.id)
+    # Пост не загружаем: хватает проверки по первичному ключу
+    if not visible_posts(request.user).filter(pk=post_id).exists():
+        raise Http404
+    if request.method != 'POST':
+        return redirect('blog:post_detail', id=post_id)
+    fragment = request.headers.get('X-Fragment') == '1'
+    form = CommentForm(request.POST)
+    if not form.is_valid():
+        if fragment:
+            return JsonResponse(
+                {'errors': form.errors.get_json_data()}, status=400
+            )
+        return redirect('blog:post_detail', id=post_id)
+    # save(commit=False) — чтобы заполнить автора и пост вручную
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post_id = post_id
+    try:
+        save_comment(comment)
+    except CommentQueueTimeout:
+        return comment_timeout(request, post_id, fragment)
+    if fragment:
+        # fetch-клиенту — только разметка нового комментария
+        return render(
+            request, 'includes/comment.html', {'comment': comment},
+            status=201,
+        )
+    messages.success(request, 'Комментарий добавлен')
+    return redirect('blog:post_detail', id=post_id)
+
+
+@login_required
+@require_POST
+def comment_import(request):
+    """Импорт комментариев из JSONL в теле запроса (только персонал)."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    # Тело читается построчно, без загрузки целиком в память
+    return JsonResponse(import_comments(request).as_dict())
 
 
 @login_required
@@ -205,6 +322,18 @@ def comment_delete(request, post_id, comment_id):
     return render(request, 'blog/comment.html', {'comment': comment})
 
 
+@login_required
+def picker_choices(request, source):
+    """Варианты для автодополнения местоположения или категории."""
+    choice_source = CHOICE_SOURCES.get(source)
+    if choice_source is None:
+        raise Http404
+    results = choice_source.search(request.GET.get('q', ''))
+    return JsonResponse({
+        'results': [{'id': pk, 'text': label} for pk, label in results]
+    })
+
+
 def register(request):
     if request.user.is_authenticated:
         return redirect('blog:index')
@@ -0,0 +1,44 @@
+from django import forms
+from django.templatetags.static import static
+from django.urls import reverse
+
+
+class PickerSelect(forms.Select):
+    """Select, который для больших таблиц рендерит только выбранный вариант.
+
+    Остальные варианты подгружает ``static/js/picker.js`` через
+    эндпоинт ``blog:picker_choices``.
+    """
+
+    template_name = 'blog/widgets/picker_select.html'
+    source = None
+    empty_label = None
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        if self.source is not None and self.source.is_large():
+            context['widget']['attrs']['data-picker-url'] = reverse(
+                'blog:picker_choices', args=[self.source.name]
+            )
+            context['widget']['script_url'] = static('js/picker.js')
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        if self.source is None or not self.source.is_large():
+            return super().optgroups(name, value, attrs)
+        pk_field = self.source.model._meta.pk
+        pks = []
+        for item in value:
+            try:
+                pks.append(pk_field.to_python(item))
+            except forms.ValidationError:
+                continue
+        options = [('', self.empty_label)] if self.empty_label else []
+        options += self.source.labels(pks)
+        return [
+            (None, [self.create_option(
+                name, option_value, label,
+                str(option_value) in value, index, attrs=attrs,
+            )], index)
+            for index, (option_value, label) in enumerate(options)
+        ]
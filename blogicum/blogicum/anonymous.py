@@ -0,0 +1,40 @@
+"""Анонимные запросы без работы с сессией.
+
+Пока у клиента нет cookie сессии, войти он не мог: такой запрос сразу
+получает ``AnonymousUser``, и ни шаблоны с ``user``, ни контекстный
+процессор ``auth`` не создают и не читают сессию. Сообщения
+(``FallbackStorage``) живут в cookie и берут сессию, только когда их
+слишком много, — тогда она создаётся как обычно, как и при входе или
+сбросе пароля. Ответ при этом не получает ``Set-Cookie``, а
+``Vary: Cookie`` остаётся: вошедшему пользователю страница отдаётся
+другая. Вошедшие пользователи загружаются через ``blogicum.usercache``.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from .usercache import get_user
+
+
+def _lazy_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+class AnonymousAuthenticationMiddleware(AuthenticationMiddleware):
+    """``AuthenticationMiddleware`` без обращения к сессии у анонимов."""
+
+    def process_request(self, request):
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            # Пользователь берётся из кэша процесса (blogicum.usercache).
+            request.user = SimpleLazyObject(lambda: _lazy_user(request))
+        else:
+            request.user = AnonymousUser()
+
+    def process_response(self, request, response):
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            patch_vary_headers(response, ('Cookie',))
+        return response
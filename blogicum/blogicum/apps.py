@@ -0,0 +1,27 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class BlogicumConfig(AppConfig):
+    """Настройки проекта, общие для всех приложений.
+
+    Здесь к каждому новому соединению с БД подключаются PRAGMA SQLite
+    и обёртки запросов: подсчёт для роутера, Server-Timing, журнал
+    медленных запросов и трассировка.
+    """
+
+    name = 'blogicum'
+    verbose_name = 'Blogicum'
+
+    def ready(self):
+        from .routers import count_queries
+        from .slowlog import log_slow_queries
+        from .sqlite import configure_connection
+        from .timing import time_queries
+        from .tracing import trace_queries
+
+        connection_created.connect(configure_connection)
+        connection_created.connect(count_queries)
+        connection_created.connect(time_queries)
+        connection_created.connect(log_slow_queries)
+        connection_created.connect(trace_queries)
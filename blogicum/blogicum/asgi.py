@@ -5,3 +5,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
 application = get_asgi_application()
+
+# Индекс подсказок строится в фоне, пока сервер принимает запросы.
+from blog.typeahead import typeahead  # noqa: E402
+
+typeahead.warm_up()
@@ -0,0 +1,152 @@
+"""Учёт выделений памяти по представлениям через ``tracemalloc``.
+
+Включается ``MEMTRACK_SAMPLE_RATE > 0``: такая доля запросов
+выполняется под ``tracemalloc``. Для запроса сохраняются пик памяти и
+главные места выделения в коде проекта на «контрольной точке» с
+наибольшим объёмом — в конце рендеринга внешнего шаблона, пока контекст
+со всеми объектами ещё жив, или в конце запроса. Место — самый
+внутренний кадр проекта в стеке выделения, поэтому память, выделенную
+ORM или шаблонизатором, видно у строки представления, которая её
+запросила.
+
+``tracemalloc`` общий на процесс: одновременно отслеживается один
+запрос, а выделения соседних потоков попадают в его счёт. Результаты
+пишутся в ``MEMTRACK_DIR/<pid>.jsonl``, сводку строит
+``manage.py memory_report``.
+"""
+import json
+import os
+import random
+import threading
+import tracemalloc
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+DEFAULT_FRAMES = 50
+DEFAULT_TOP_SITES = 10
+# Обёртки самих замеров — не место выделения, ищем кадр глубже.
+INSTRUMENTATION = frozenset(
+    str(Path(__file__).with_name(name)) for name in (
+        'memtrack.py', 'metrics.py', 'nplusone.py', 'profiler.py',
+        'routers.py', 'slowlog.py', 'timing.py',
+    )
+)
+
+_current = ContextVar('memtrack', default=None)
+_tracking = threading.Lock()
+
+
+def _site(traceback, base_dir):
+    """Самый внутренний кадр проекта (или просто самый внутренний)."""
+    for frame in reversed(traceback):
+        filename = frame.filename
+        if (filename.startswith(base_dir)
+                and filename not in INSTRUMENTATION
+                and 'site-packages' not in filename):
+            return f'{filename[len(base_dir) + 1:]}:{frame.lineno}'
+    frame = traceback[-1]
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def top_sites(snapshot, limit):
+    base_dir = str(settings.BASE_DIR)
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    sites = {}
+    for stat in snapshot.statistics('traceback'):
+        site = _site(stat.traceback, base_dir)
+        size, count = sites.get(site, (0, 0))
+        sites[site] = (size + stat.size, count + stat.count)
+    ranked = sorted(sites.items(), key=lambda item: -item[1][0])
+    return [
+        {'site': site, 'size': size, 'count': count}
+        for site, (size, count) in ranked[:limit]
+    ]
+
+
+class Tracking:
+    def __init__(self):
+        self.size = -1
+        self.snapshot = None
+
+    def checkpoint(self):
+        size, _ = tracemalloc.get_traced_memory()
+        if size > self.size:
+            self.size = size
+            self.snapshot = tracemalloc.take_snapshot()
+
+
+def checkpoint():
+    """Снять снимок, если текущий запрос отслеживается и памяти больше."""
+    tracking = _current.get()
+    if tracking is not None:
+        tracking.checkpoint()
+
+
+def log_path():
+    return Path(settings.MEMTRACK_DIR) / f'{os.getpid()}.jsonl'
+
+
+def write_entry(entry):
+    path = log_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as output:
+        output.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def read_entries(directory):
+    for path in sorted(Path(directory).glob('*.jsonl')):
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class MemoryTrackingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'MEMTRACK_SAMPLE_RATE', 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (random.random() >= settings.MEMTRACK_SAMPLE_RATE
+                or tracemalloc.is_tracing()
+                or not _tracking.acquire(blocking=False)):
+            return self.get_response(request)
+        try:
+            return self.track(request)
+        finally:
+            _tracking.release()
+
+    def track(self, request):
+        tracking = Tracking()
+        token = _current.set(tracking)
+        tracemalloc.start(
+            getattr(settings, 'MEMTRACK_FRAMES', DEFAULT_FRAMES)
+        )
+        try:
+            response = self.get_response(request)
+            tracking.checkpoint()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            _current.reset(token)
+        match = request.resolver_match
+        write_entry({
+            'time': timezone.now().isoformat(),
+            'view': match.view_name if match else '<unresolved>',
+            'path': request.path,
+            'peak': peak,
+            'retained': tracking.size,
+            'sites': top_sites(
+                tracking.snapshot,
+                getattr(settings, 'MEMTRACK_TOP_SITES', DEFAULT_TOP_SITES),
+            ),
+        })
+        return response
@@ -0,0 +1,232 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы у себя в памяти (запись —
+несколько сложений под коротким замком) и раз в
+``METRICS_FLUSH_SECONDS`` сбрасывает их фоновым потоком в файл
+``<METRICS_DIR>/<pid>.json``. Представление ``metrics`` при опросе
+складывает файлы всех процессов, поэтому при нескольких воркерах
+gunicorn/uWSGI числа сходятся. После перезапуска сервера каталог стоит
+очищать: файлы завершившихся процессов тоже суммируются.
+
+Метки — имя представления (``blog:index``), а для счётчика запросов ещё
+метод и код ответа. Данные приходят из ``ServerTimingMiddleware``.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+DEFAULT_FLUSH_SECONDS = 5
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HELP = {
+    'blogicum_requests_total': ('counter', 'Обработанные запросы.'),
+    'blogicum_errors_total': ('counter', 'Ответы с кодом 5xx.'),
+    'blogicum_cache_requests_total': (
+        'counter', 'Обращения к кэшу: result="hit" или "miss".'
+    ),
+    'blogicum_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'
+    ),
+    'blogicum_db_queries': ('histogram', 'SQL-запросов на запрос.'),
+}
+BUCKETS = {
+    'blogicum_request_duration_seconds': DURATION_BUCKETS,
+    'blogicum_db_queries': QUERY_BUCKETS,
+}
+
+
+class Registry:
+    """Метрики одного процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self.counters = defaultdict(float)
+        # Значение гистограммы: счётчики корзин (последняя — +Inf)
+        # и сумма наблюдений.
+        self.histograms = {}
+
+    def _ensure_process(self):
+        # После fork у дочернего процесса свои числа и свой поток сброса.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._reset()
+        if getattr(settings, 'METRICS_DIR', None):
+            threading.Thread(
+                target=self._flush_loop, name='metrics-flush', daemon=True
+            ).start()
+            atexit.register(self.flush)
+
+    def _observe(self, name, labels, value):
+        buckets = BUCKETS[name]
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(buckets)
+        histogram[index] += 1
+        histogram[-1] += value
+
+    def observe_request(self, view, method, status, duration, timing):
+        view_labels = (('view', view),)
+        with self._lock:
+            self._ensure_process()
+            self.counters[(
+                'blogicum_requests_total',
+                view_labels + (('method', method), ('status', str(status))),
+            )] += 1
+            if status >= 500:
+                self.counters[('blogicum_errors_total', view_labels)] += 1
+            for result, count in (('hit', timing.cache_hits),
+                                  ('miss', timing.cache_misses)):
+                if count:
+                    self.counters[(
+                        'blogicum_cache_requests_total',
+                        view_labels + (('result', result),),
+                    )] += count
+            self._observe(
+                'blogicum_request_duration_seconds', view_labels, duration
+            )
+            self._observe('blogicum_db_queries', view_labels, timing.queries)
+
+    def dump(self):
+        with self._lock:
+            self._ensure_process()
+            return {
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, list(labels), list(values)]
+                    for (name, labels), values in self.histograms.items()
+                ],
+            }
+
+    def flush(self):
+        directory = Path(settings.METRICS_DIR)
+        path = directory / f'{os.getpid()}.json'
+        temp = path.with_suffix('.tmp')
+        data = json.dumps(self.dump())
+        # Файл заменяется целиком, чтобы опрос не прочитал половину.
+        with self._flush_lock:
+            directory.mkdir(parents=True, exist_ok=True)
+            temp.write_text(data)
+            os.replace(temp, path)
+
+    def _flush_loop(self):
+        interval = getattr(
+            settings, 'METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS
+        )
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception('Не удалось записать метрики')
+
+
+registry = Registry()
+
+
+def merge(dumps):
+    counters = defaultdict(float)
+    histograms = {}
+    for data in dumps:
+        for name, labels, value in data['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, values in data['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [
+                    a + b for a, b in zip(histograms[key], values)
+                ]
+            else:
+                histograms[key] = list(values)
+    return counters, histograms
+
+
+def collect():
+    """Метрики всех процессов, записавших файлы, и текущего."""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return merge([registry.dump()])
+    registry.flush()
+    dumps = []
+    for path in Path(directory).glob('*.json'):
+        try:
+            dumps.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Файл мог исчезнуть или ещё не дописаться.
+            continue
+    return merge(dumps)
+
+
+def _format_labels(labels):
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def render(counters, histograms):
+    lines = []
+    series = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        series[name].append(f'{name}{_format_labels(labels)} {value}')
+    for (name, labels), values in sorted(histograms.items()):
+        cumulative = 0
+        bounds = [*map(str, BUCKETS[name]), '+Inf']
+        for bound, count in zip(bounds, values):
+            cumulative += count
+            series[name].append(
+                f'{name}_bucket{_format_labels(labels + (("le", bound),))}'
+                f' {cumulative}'
+            )
+        series[name].append(f'{name}_sum{_format_labels(labels)} '
+                            f'{values[-1]}')
+        series[name].append(f'{name}_count{_format_labels(labels)} '
+                            f'{cumulative}')
+    for name, (kind, description) in HELP.items():
+        if name in series:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(series[name])
+    return '\n'.join(lines) + '\n'
+
+
+def metrics(request):
+    """Метрики для сборщика (адреса из ``METRICS_ALLOWED_IPS`` и персонал)."""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if (request.META.get('REMOTE_ADDR') not in allowed
+            and not request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(render(*collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,185 @@
+"""Поиск N+1: одинаковые по форме запросы, повторённые для каждой строки.
+
+Запросы группируются по «форме» — SQL без литералов и параметров. Если
+одна форма выполнилась за запрос страницы ``NPLUSONE_THRESHOLD`` раз и
+больше, скорее всего шаблон или код в цикле обращается к связи, не
+взятой через ``select_related``/``prefetch_related``. Для каждой такой
+формы запоминается место вызова: шаблон и строка или файл проекта.
+
+``NPlusOneMiddleware`` работает только в DEBUG: пишет найденное в лог
+``blogicum.nplusone`` и добавляет заголовок ``X-NPlusOne``. В тестах тот
+же ``Detector`` доступен через фикстуру ``nplusone``.
+"""
+import logging
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 3
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s')
+VALUES_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+# Служебные запросы транзакций повторяются законно.
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+
+_RENDER_CODE = Node.render_annotated.__code__
+_THIS_FILE = __file__
+
+
+class NPlusOneError(Exception):
+    """В запросе найдены повторяющиеся по строкам SQL-запросы."""
+
+
+def normalize(sql):
+    """Форма запроса: литералы и параметры заменены на ``?``."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = VALUES_RE.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def _origin(frame):
+    """Самый внутренний узел шаблона или первый кадр кода проекта."""
+    project_frame = None
+    base_dir = str(settings.BASE_DIR)
+    while frame is not None:
+        code = frame.f_code
+        if code is _RENDER_CODE:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            name = getattr(origin, 'template_name', None) or getattr(
+                origin, 'name', '?'
+            )
+            return f'{name}:{node.token.lineno}'
+        if (
+            project_frame is None
+            and code.co_filename != _THIS_FILE
+            and 'site-packages' not in code.co_filename
+            and code.co_filename.startswith(base_dir)
+        ):
+            project_frame = frame
+        frame = frame.f_back
+    if project_frame is None:
+        return '?'
+    path = Path(project_frame.f_code.co_filename)
+    return f'{path.relative_to(base_dir)}:{project_frame.f_lineno}'
+
+
+class Repeat:
+    def __init__(self, shape, count, sql, origins):
+        self.shape = shape
+        self.count = count
+        self.sql = sql
+        self.origins = origins
+
+    def __str__(self):
+        origins = ', '.join(
+            f'{origin} ×{count}'
+            for origin, count in self.origins.most_common()
+        )
+        return f'{self.count} раз: {self.sql}\n    из {origins}'
+
+
+class Detector:
+    """Собирает выполненные запросы и находит повторяющиеся формы."""
+
+    def __init__(self, threshold=None):
+        if threshold is None:
+            threshold = getattr(
+                settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD
+            )
+        self.threshold = threshold
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, _origin(sys._getframe(1))))
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self):
+        """Записывать запросы всех соединений внутри блока ``with``."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def repeats(self):
+        shapes = {}
+        for sql, origin in self.queries:
+            if sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+                continue
+            shape = normalize(sql)
+            if shape not in shapes:
+                shapes[shape] = (sql, Counter())
+            shapes[shape][1][origin] += 1
+        return [
+            Repeat(shape, sum(origins.values()), sql, origins)
+            for shape, (sql, origins) in shapes.items()
+            if sum(origins.values()) >= self.threshold
+        ]
+
+    def report(self, title=''):
+        lines = [f'N+1 {title}'.rstrip() + ':']
+        lines.extend(f'  {repeat}' for repeat in self.repeats())
+        return '\n'.join(lines)
+
+    def assert_no_repeats(self):
+        if self.repeats():
+            raise NPlusOneError(self.report())
+
+    def count(self, func):
+        """Сколько запросов выполняет ``func()``."""
+        start = len(self.queries)
+        with self.record():
+            func()
+        return len(self.queries) - start
+
+    def assert_not_growing(self, request, grow):
+        """Число запросов ``request()`` не растёт после ``grow()``.
+
+        ``grow`` добавляет строк на страницу (например, ещё постов).
+        """
+        before = self.count(request)
+        grow()
+        after = self.count(request)
+        if after > before:
+            raise NPlusOneError(
+                f'Число запросов выросло с {before} до {after} вместе с '
+                f'размером страницы.\n{self.report()}'
+            )
+
+
+class NPlusOneMiddleware:
+    """Ищет N+1 в каждом запросе при ``DEBUG = True``.
+
+    С ``NPLUSONE_RAISE = True`` вместо записи в лог выбрасывает
+    ``NPlusOneError``, чтобы проблему нельзя было не заметить.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = Detector()
+        with detector.record():
+            response = self.get_response(request)
+        repeats = detector.repeats()
+        if repeats:
+            if getattr(settings, 'NPLUSONE_RAISE', False):
+                raise NPlusOneError(detector.report(request.path))
+            logger.warning(detector.report(request.path))
+            response['X-NPlusOne'] = str(len(repeats))
+        return response
@@ -0,0 +1,180 @@
+"""Кэш страниц, общий для всех пользователей.
+
+Страница представления из ``PAGE_CACHE_VIEWS`` рендерится один раз и
+хранится в кэше без пользовательских частей: на их месте стоят метки,
+которые оставляет тег ``{% late %}`` из ``blogicum.pagecache_tags``
+(кнопки в шапке, форма комментария, ссылки на редактирование и
+удаление). На каждый запрос — и при промахе, и при попадании — метки
+заменяются фрагментами, отрендеренными для текущего пользователя:
+шаблон фрагмента видит только свои аргументы, ``content`` (тело тега,
+отрендеренное при кэшировании) и значения контекстных процессоров
+(``user``, ``csrf_token``, ``request``). Без кэша (или вне кэшируемых
+представлений) тег просто рендерит фрагмент на месте.
+
+Не кэшируются ответы с кодом не 200 и с ``Cache-Control: private``
+(``no-cache``, ``no-store``) — так представления помечают страницы,
+которые зависят от пользователя целиком, например скрытый пост для
+его автора. Но такой ответ лишь не сохраняется: поиск в кэше идёт до
+представления, и чужая копия страницы была бы отдана и тому, для кого
+она выглядит иначе. Поэтому представление, ответ которого зависит от
+зрителя, заранее объявляет это декоратором ``skip_for_viewer``: для
+подходящих запросов кэш не читается и не пишется.
+
+Изменения данных увеличивают версию в кэше (``bump()``), записи старых
+версий не используются; при кэше в памяти процесса другие процессы
+увидят изменения не позже чем через ``PAGE_CACHE_SECONDS``.
+"""
+import hashlib
+import re
+import secrets
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.template import Context, engines
+
+from .timing import count_cache
+
+DEFAULT_ALIAS = 'default'
+VERSION_KEY = 'pagecache:version'
+NO_STORE = ('private', 'no-cache', 'no-store')
+
+_collector = ContextVar('pagecache', default=None)
+
+
+def _cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', DEFAULT_ALIAS)]
+
+
+def bump():
+    """Сделать недействительными все закэшированные страницы."""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+class Collector:
+    """Фрагменты страницы, которая рендерится для кэша."""
+
+    def __init__(self):
+        # Метки с nonce: текст пользователя их не подделает.
+        self.nonce = secrets.token_hex(8)
+        self.fragments = []
+
+    def add(self, template_name, values):
+        self.fragments.append((template_name, values))
+        return f'<!--late:{self.nonce}:{len(self.fragments) - 1}-->'
+
+
+def current_collector():
+    """Сборщик фрагментов, если страница рендерится для кэша."""
+    return _collector.get()
+
+
+def fill(entry, request):
+    """Страница из кэша с фрагментами для пользователя запроса."""
+    engine = engines['django'].engine
+    context = Context(autoescape=engine.autoescape)
+    for processor in engine.template_context_processors:
+        context.update(processor(request))
+    fragments = entry['fragments']
+    templates = {}
+
+    def render(match):
+        template_name, values = fragments[int(match.group(1))]
+        if template_name not in templates:
+            templates[template_name] = engine.get_template(template_name)
+        with context.push(values):
+            return templates[template_name].render(context)
+
+    return re.sub(
+        rf'<!--late:{entry["nonce"]}:(\d+)-->', render, entry['content']
+    )
+
+
+def skip_for_viewer(predicate):
+    """Не использовать кэш, если ``predicate(request, **kwargs)`` истинен.
+
+    Например, для владельца профиля, которому видны и неопубликованные
+    записи.
+    """
+    def decorator(view):
+        view.page_cache_skip = predicate
+        return view
+    return decorator
+
+
+def cache_key(request):
+    url = request.build_absolute_uri().encode()
+    return f'pagecache:{hashlib.md5(url).hexdigest()}'
+
+
+def _storable(response):
+    cache_control = response.get('Cache-Control', '')
+    return (
+        response.status_code == 200
+        and not any(word in cache_control for word in NO_STORE)
+    )
+
+
+class PageCacheMiddleware:
+    """Отдаёт страницы из кэша и кэширует их при промахе.
+
+    Ставится после middleware аутентификации и CSRF: фрагментам нужны
+    ``request.user`` и токен.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PAGE_CACHE_SECONDS', 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.views = frozenset(getattr(settings, 'PAGE_CACHE_VIEWS', ()))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        pending = getattr(request, '_page_cache', None)
+        if pending is None:
+            return response
+        key, version, collector, token = pending
+        _collector.reset(token)
+        if response.streaming:
+            return response
+        entry = {
+            'version': version,
+            'nonce': collector.nonce,
+            'content': response.content.decode(response.charset),
+            'fragments': collector.fragments,
+            'content_type': response['Content-Type'],
+        }
+        if _storable(response):
+            _cache().set(key, entry, settings.PAGE_CACHE_SECONDS)
+        # Метки есть и в некэшируемом ответе (например, странице 404).
+        response.content = fill(entry, request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or request.resolver_match.view_name not in self.views):
+            return None
+        skip = getattr(view_func, 'page_cache_skip', None)
+        if skip is not None and skip(request, *view_args, **view_kwargs):
+            return None
+        key = cache_key(request)
+        found = _cache().get_many([VERSION_KEY, key])
+        version = found.get(VERSION_KEY, 0)
+        entry = found.get(key)
+        if entry is not None and entry['version'] == version:
+            count_cache(True)
+            return HttpResponse(
+                fill(entry, request), content_type=entry['content_type']
+            )
+        count_cache(False)
+        collector = Collector()
+        request._page_cache = (
+            key, version, collector, _collector.set(collector)
+        )
+        return None
@@ -0,0 +1,53 @@
+"""Встроенная библиотека шаблонов: тег ``{% late %}`` для кэша страниц.
+
+``{% late "includes/фрагмент.html" арг=значение %}тело{% endlate %}``
+рендерит шаблон фрагмента с аргументами и ``content`` — отрендеренным
+телом тега. Когда страница рендерится для ``blogicum.pagecache``, вместо
+фрагмента остаётся метка, и он рендерится для каждого запроса заново.
+Поэтому фрагмент может зависеть только от аргументов, ``content`` и
+значений контекстных процессоров (``user``, ``csrf_token``), а аргументы
+и тело — не зависеть от пользователя.
+"""
+from django import template
+from django.template.base import token_kwargs
+
+from .pagecache import current_collector
+
+register = template.Library()
+
+
+class LateNode(template.Node):
+    def __init__(self, template_name, extra, nodelist):
+        self.template_name = template_name
+        self.extra = extra
+        self.nodelist = nodelist
+
+    def render(self, context):
+        values = {
+            key: value.resolve(context) for key, value in self.extra.items()
+        }
+        values['content'] = self.nodelist.render(context)
+        template_name = self.template_name.resolve(context)
+        collector = current_collector()
+        if collector is not None:
+            return collector.add(template_name, values)
+        fragment = context.template.engine.get_template(template_name)
+        with context.push(values):
+            return fragment.render(context)
+
+
+@register.tag
+def late(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя шаблона фрагмента'
+        )
+    extra = token_kwargs(bits[2:], parser)
+    if len(extra) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: после имени шаблона — только аргументы ключ=значение'
+        )
+    nodelist = parser.parse(('endlate',))
+    parser.delete_first_token()
+    return LateNode(parser.compile_filter(bits[1]), extra, nodelist)
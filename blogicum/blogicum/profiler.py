@@ -0,0 +1,231 @@
+"""Семплирующий профилировщик для запросов на боевом сервере.
+
+Фоновый поток раз в ``PROFILE_INTERVAL_MS`` снимает стек нужного потока
+через ``sys._current_frames()`` и считает одинаковые стеки. Результат
+пишется в ``PROFILE_DIR`` в формате collapsed stacks («кадр;кадр;кадр
+число»), который понимают ``flamegraph.pl``, speedscope и inferno.
+
+Запустить профилирование можно:
+
+* для одного запроса — заголовком ``X-Profile: 1`` от персонала или
+  параметром ``?profile=<токен>`` (токен выдаёт
+  ``manage.py profile --token --user <логин> --path <путь>``); имя файла
+  придёт в ``X-Profile-File``. Токен подписан вместе с id сотрудника и
+  путём страницы: он действует только в сессии этого сотрудника и только
+  на этой странице, поэтому утёкшая ссылка не даёт профилировать сервер;
+* для всех воркеров на время — ``manage.py profile --seconds 30``:
+  команда кладёт файл-триггер, воркеры замечают его не позже чем через
+  секунду, профилируют все свои потоки и пишут по файлу, а команда
+  склеивает их.
+
+Без триггера ``ProfilerMiddleware`` только сравнивает время с моментом
+следующей проверки файла.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_TOKEN_MAX_AGE = 3600
+TOKEN_SALT = 'blogicum.profiler'
+WINDOW_FILE = 'window.json'
+WINDOW_CHECK_SECONDS = 1.0
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir) + 1:]
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages', 1)[1].lstrip('/\\')
+    return f'{filename}:{code.co_name}'
+
+
+def collapse(frame):
+    """Стек от корня к листу в виде ``кадр;кадр;…``."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """Снимает стеки потоков ``thread_ids`` (или всех) в фоне."""
+
+    def __init__(self, thread_ids=None, interval=None):
+        if interval is None:
+            interval = getattr(
+                settings, 'PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS
+            ) / 1000
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='profiler', daemon=True
+        )
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if self.thread_ids is None or ident in self.thread_ids:
+                    self.stacks[collapse(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+def write_collapsed(stacks, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        for stack, count in stacks.most_common():
+            output.write(f'{stack} {count}\n')
+
+
+def read_collapsed(path, stacks=None):
+    stacks = Counter() if stacks is None else stacks
+    with open(path, encoding='utf-8') as source:
+        for line in source:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+def make_token(user, path):
+    """Токен профилирования страницы ``path`` для сотрудника ``user``."""
+    return signing.dumps({'user': user.pk, 'path': path}, salt=TOKEN_SALT)
+
+
+def check_token(token, request):
+    """Токен подписан, не просрочен и выдан этому сотруднику и пути."""
+    max_age = getattr(
+        settings, 'PROFILE_TOKEN_MAX_AGE', DEFAULT_TOKEN_MAX_AGE
+    )
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return False
+    return (
+        request.user.is_staff
+        and payload.get('user') == request.user.pk
+        and payload.get('path') == request.path
+    )
+
+
+def start_window(seconds):
+    """Попросить все воркеры профилировать ``seconds`` секунд."""
+    window = {
+        'id': timezone.now().strftime('%Y%m%dT%H%M%S%f'),
+        'until': time.time() + seconds,
+    }
+    path = profile_dir() / WINDOW_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix('.tmp')
+    temp.write_text(json.dumps(window))
+    temp.replace(path)
+    return window
+
+
+class WindowWatcher:
+    """Следит за файлом-триггером и профилирует процесс в его окне."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._active_id = None
+
+    def check(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + WINDOW_CHECK_SECONDS
+            try:
+                window = json.loads(
+                    (profile_dir() / WINDOW_FILE).read_text()
+                )
+            except (OSError, ValueError):
+                return
+            remaining = window['until'] - time.time()
+            if remaining <= 0 or window['id'] == self._active_id:
+                return
+            self._active_id = window['id']
+        threading.Thread(
+            target=self._profile, args=(window['id'], remaining),
+            name='profiler-window', daemon=True,
+        ).start()
+
+    def _profile(self, window_id, seconds):
+        sampler = Sampler().start()
+        time.sleep(seconds)
+        write_collapsed(
+            sampler.stop(),
+            profile_dir() / f'window-{window_id}-{os.getpid()}.collapsed',
+        )
+
+
+window_watcher = WindowWatcher()
+
+
+class ProfilerMiddleware:
+    """Профилирует запрос по заголовку персонала или подписанному токену."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        window_watcher.check()
+        if not self.requested(request):
+            return self.get_response(request)
+        sampler = Sampler({threading.get_ident()}).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        name = (
+            f'{timezone.now():%Y%m%dT%H%M%S%f}-'
+            f'{view_name.replace(":", "-")}.collapsed'
+        )
+        write_collapsed(stacks, profile_dir() / name)
+        response['X-Profile-File'] = name
+        return response
+
+    @staticmethod
+    def requested(request):
+        # Строку запроса разбираем, только если в ней есть токен.
+        if 'profile=' in request.META.get('QUERY_STRING', ''):
+            token = request.GET.get('profile')
+            if token and check_token(token, request):
+                return True
+        return (
+            request.META.get('HTTP_X_PROFILE') == '1'
+            and request.user.is_staff
+        )
@@ -0,0 +1,123 @@
+"""Чтение read-only страниц с реплик и учёт запросов по алиасам БД.
+
+``ReplicaMiddleware`` помечает запросы к представлениям из
+``REPLICA_VIEWS``, и ``ReplicaRouter`` отправляет их чтения на одну из
+``DATABASE_REPLICAS``. Записи всегда идут в ``default``; после записи
+чтения этого запроса и следующих запросов того же клиента (на
+``REPLICA_PIN_SECONDS``) тоже идут в ``default``, чтобы автор сразу
+видел свои изменения. Сессии и пользователи (``PRIMARY_APPS``) всегда
+читаются из ``default``: только что созданная сессия или сменённый
+пароль могли ещё не дойти до реплики.
+"""
+import random
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PIN_COOKIE = 'db_pin_primary'
+# Приложения, которые никогда не читаются с реплик.
+PRIMARY_APPS = frozenset({'sessions', 'auth'})
+
+# Общее число запросов процесса по алиасам БД.
+query_counts = Counter()
+
+_route_state = ContextVar('route_state', default=None)
+
+
+class RouteState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.use_replica = False
+        self.wrote = False
+        self.query_counts = Counter()
+
+
+def _replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return 'default'
+        state = _route_state.get()
+        if (
+            state is None or not state.use_replica
+            or state.pinned or state.wrote or not _replicas()
+        ):
+            return None
+        return random.choice(_replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _route_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для ``REPLICA_VIEWS`` и закрепляет
+    клиента за основной БД после записи.
+
+    В DEBUG добавляет заголовок ``X-DB-Queries`` с числом запросов
+    по алиасам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RouteState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _route_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route_state.reset(token)
+        if state.wrote and _replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        if settings.DEBUG and state.query_counts:
+            response['X-DB-Queries'] = ', '.join(
+                f'{alias}={count}'
+                for alias, count in sorted(state.query_counts.items())
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _route_state.get()
+        if (
+            state is not None
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name
+            in getattr(settings, 'REPLICA_VIEWS', ())
+        ):
+            state.use_replica = True
+
+
+def count_queries(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: считать запросы соединения."""
+    alias = connection.alias
+
+    def wrapper(execute, sql, params, many, context):
+        query_counts[alias] += 1
+        state = _route_state.get()
+        if state is not None:
+            state.query_counts[alias] += 1
+        return execute(sql, params, many, context)
+
+    connection.execute_wrappers.append(wrapper)
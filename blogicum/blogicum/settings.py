@@ -29,18 +29,31 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django_bootstrap5',
+    # Database connection hooks (blogicum/apps.py).
+    'blogicum.apps.BlogicumConfig',
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
 ]
 
 MIDDLEWARE = [
+    'blogicum.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blogicum.timing.ServerTimingMiddleware',
+    'blogicum.memtrack.MemoryTrackingMiddleware',
+    'blogicum.nplusone.NPlusOneMiddleware',
+    'blogicum.routers.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Anonymous requests without a session cookie skip the session
+    # (blogicum/anonymous.py).
+    'blogicum.anonymous.AnonymousAuthenticationMiddleware',
+    'blogicum.profiler.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Needs request.user and the CSRF token (blogicum/pagecache.py).
+    'blogicum.pagecache.PageCacheMiddleware',
+    'blogicum.tracing.ViewSpanMiddleware',
 ]
 
 ROOT_URLCONF = 'blogicum.urls'
@@ -49,7 +62,9 @@ TEMPLATES_DIR = BASE_DIR / 'templates'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'blogicum.timing.TimedDjangoTemplates',
+        # Keep the default alias: code looks the engine up as 'django'.
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -59,6 +74,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # {% include %} with a tracing span (blogicum/tracing_tags.py)
+            # and {% late %} for the page cache (blogicum/pagecache_tags.py).
+            'builtins': ['blogicum.tracing_tags', 'blogicum.pagecache_tags'],
         },
     },
 ]
@@ -76,6 +94,40 @@ DATABASES = {
     }
 }
 
+# Read replicas: aliases from DATABASES used by the read-only views below.
+# A read-only copy of the SQLite file works as a replica, e.g.
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': f'file:{BASE_DIR / "replica.sqlite3"}?mode=ro',
+#     'OPTIONS': {'uri': True},
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['blogicum.routers.ReplicaRouter']
+REPLICA_VIEWS = (
+    'blog:index',
+    'blog:category_posts',
+    'blog:profile',
+    'blog:post_detail',
+    'blog:search',
+    'blog:typeahead',
+)
+# Reads of a client that has just written stay on primary this long.
+REPLICA_PIN_SECONDS = 5
+
+# Applied to every new SQLite connection (see blogicum/sqlite.py).
+# WAL lets readers work while a write is in progress; NORMAL sync is safe
+# with WAL; mmap and a bigger page cache cut read syscalls.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # KiB
+    'busy_timeout': 5000,  # ms
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -123,9 +175,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Media (user-uploaded files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Same as the defaults, plus tracing spans (blogicum/tracing.py).
+DEFAULT_FILE_STORAGE = 'blogicum.tracing.TracedFileSystemStorage'
+CACHES = {
+    'default': {
+        'BACKEND': 'blogicum.tracing.TracedLocMemCache',
+    },
+}
 
-# Email backend: file-based
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Email backend: mail is queued in the database (blog/mail.py) and sent
+# by `manage.py send_queued_mail` through the file-based backend.
+EMAIL_BACKEND = 'blog.mail.QueuedEmailBackend'
+EMAIL_QUEUE_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_QUEUE_BATCH_SIZE = 100
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_RETRY_SECONDS = 60
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 # Auth redirects
@@ -135,3 +199,108 @@ LOGIN_URL = '/auth/login/'
 
 # CSRF custom failure view
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
+
+# Group commit for new comments (blog/comments.py): requests queue their
+# comment and one writer thread per process commits batches collected
+# over WINDOW_MS, acknowledging each request after its batch commits.
+COMMENT_GROUP_COMMIT = False
+COMMENT_GROUP_COMMIT_WINDOW_MS = 5
+COMMENT_GROUP_COMMIT_MAX_BATCH = 200
+COMMENT_GROUP_COMMIT_TIMEOUT = 5  # seconds
+
+# Post deletion (blog/deletion.py): comments are deleted with plain SQL
+# in chunks of this many rows. Posts with more comments than
+# POST_DELETE_DEFER_COMMENTS are unpublished at once and deleted by a
+# background thread; `manage.py delete_pending_posts` finishes the queue
+# left by a restarted process. None always deletes in the request. A post
+# whose deletion failed this many times stays queued for inspection.
+POST_DELETE_CHUNK_SIZE = 1000
+POST_DELETE_DEFER_COMMENTS = 1000
+POST_DELETE_MAX_ATTEMPTS = 5
+
+# Location/category pickers in PostForm: tables up to this size are cached
+# whole (seconds to keep them), bigger ones switch to autocomplete. With a
+# per-process cache a save only resets the lists in its own process; other
+# workers keep the old lists for up to the timeout. Point the alias at a
+# shared cache to invalidate them everywhere at once.
+BLOG_PICKER_CHOICES_LIMIT = 500
+BLOG_PICKER_CACHE_TIMEOUT = 300
+BLOG_PICKER_CACHE_ALIAS = 'default'
+
+# Server-Timing header (blogicum/timing.py): always sent to staff, and to
+# this fraction of other requests. Per-view totals are kept regardless.
+SERVER_TIMING_SAMPLE_RATE = 0.01
+
+# Prometheus metrics at /metrics/ (blogicum/metrics.py). Every worker
+# process writes its numbers to METRICS_DIR and a scrape merges them;
+# with METRICS_DIR = None only the scraped process is reported.
+METRICS_DIR = BASE_DIR / '.metrics'
+METRICS_FLUSH_SECONDS = 5
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Slow query log (blogicum/slowlog.py): queries slower than SLOW_QUERY_MS
+# go to a rotating JSONL file with their EXPLAIN QUERY PLAN; each query
+# shape is written at most once per SLOW_QUERY_LOG_INTERVAL seconds.
+# None disables the log.
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG_FILE = BASE_DIR / 'logs' / 'slow_queries.jsonl'
+SLOW_QUERY_LOG_INTERVAL = 60
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# On-demand sampling profiler (blogicum/profiler.py): collapsed stacks
+# for flamegraphs are written to PROFILE_DIR. See `manage.py profile`.
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_INTERVAL_MS = 5
+PROFILE_TOKEN_MAX_AGE = 3600
+
+# Opt-in tracemalloc tracking (blogicum/memtrack.py): this fraction of
+# requests records peak memory and top allocation sites to MEMTRACK_DIR.
+# Tracing slows a request down several times; see `manage.py
+# memory_report`.
+MEMTRACK_SAMPLE_RATE = 0
+MEMTRACK_DIR = BASE_DIR / 'memtrack'
+MEMTRACK_FRAMES = 50
+MEMTRACK_TOP_SITES = 10
+
+# Request tracing (blogicum/tracing.py): this fraction of requests, and
+# requests with a sampled `traceparent`, is written as OTLP JSON lines to
+# TRACING_DIR. 0 disables tracing entirely.
+TRACING_SAMPLE_RATE = 0
+TRACING_DIR = BASE_DIR / 'traces'
+TRACING_MAX_SPANS = 1000
+
+# Per-process cache of logged-in users (blogicum/usercache.py). Saving a
+# user bumps its version in USER_CACHE_ALIAS; with a per-process cache
+# other workers keep old sessions (even after a password change or
+# deactivation) for up to the TTL, so keep it short or point the alias at
+# a shared cache; 0 disables.
+USER_CACHE_SECONDS = 30
+USER_CACHE_SIZE = 1000
+USER_CACHE_ALIAS = 'default'
+
+# Page cache (blogicum/pagecache.py): these views are rendered once for
+# all users and kept this many seconds; {% late %} fragments (header
+# buttons, comment form, edit/delete links) are filled in per request.
+# Writes bump a version in the cache, which other processes only see
+# with a shared cache backend. 0 disables.
+PAGE_CACHE_SECONDS = 10
+PAGE_CACHE_VIEWS = (
+    'blog:index',
+    'blog:category_posts',
+    'blog:profile',
+    'blog:post_detail',
+    'pages:about',
+    'pages:rules',
+)
+
+# N+1 detector (blogicum/nplusone.py), active only with DEBUG: a query
+# shape repeated this many times in one request is reported; set RAISE to
+# turn reports into errors.
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_RAISE = False
+
+# Typeahead index (blog/typeahead.py) lives in process memory and follows
+# local saves via signals; it is rebuilt in the background at most this
+# often (seconds) to pick up changes made by other processes.
+TYPEAHEAD_REBUILD_SECONDS = 300
@@ -0,0 +1,163 @@
+"""Журнал медленных SQL-запросов с планом выполнения.
+
+Запрос дольше ``SLOW_QUERY_MS`` записывается в JSONL-файл
+``SLOW_QUERY_LOG_FILE`` вместе с параметрами, представлением, из
+которого он выполнен, и ``EXPLAIN QUERY PLAN`` (для SELECT в SQLite):
+по строкам ``SCAN`` видно, какие запросы читают таблицу целиком.
+
+План снимается сразу, на том же соединении, а запись в файл идёт в
+фоновом потоке через ``QueueListener`` с ротацией файла. Одна и та же
+форма запроса (см. ``blogicum.nplusone.normalize``) пишется не чаще раза
+в ``SLOW_QUERY_LOG_INTERVAL`` секунд, пропущенные повторы считаются в
+поле ``suppressed``.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+from django.utils import timezone
+
+from .nplusone import normalize
+from .timing import current_view
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+MAX_PARAM_LENGTH = 200
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._listener = None
+        # Форма запроса -> (время последней записи, пропущено с тех пор).
+        self._last = {}
+
+    def _ensure_listener(self):
+        # Поток записи не переживает fork: у каждого процесса свой.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        path = Path(settings.SLOW_QUERY_LOG_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path, encoding='utf-8',
+            maxBytes=getattr(
+                settings, 'SLOW_QUERY_LOG_MAX_BYTES', DEFAULT_MAX_BYTES
+            ),
+            backupCount=getattr(
+                settings, 'SLOW_QUERY_LOG_BACKUP_COUNT', DEFAULT_BACKUP_COUNT
+            ),
+        )
+        records = queue.SimpleQueue()
+        self._listener = QueueListener(records, handler)
+        self._listener.start()
+        logger.handlers = [QueueHandler(records)]
+        logger.propagate = False
+        self._pid = pid
+
+    def stop(self):
+        """Дописать очередь и остановить поток записи."""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = self._pid = None
+
+    def _should_log(self, shape):
+        interval = getattr(
+            settings, 'SLOW_QUERY_LOG_INTERVAL', DEFAULT_INTERVAL
+        )
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._last.get(shape, (None, 0))
+            if last is not None and now - last < interval:
+                self._last[shape] = (last, suppressed + 1)
+                return None
+            self._last[shape] = (now, 0)
+            return suppressed
+
+    def __call__(self, execute, sql, params, many, context):
+        threshold = getattr(settings, 'SLOW_QUERY_MS', None)
+        if threshold is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration >= threshold:
+                self.slow_query(
+                    context['connection'], sql, params, many, duration
+                )
+
+    def slow_query(self, connection, sql, params, many, duration):
+        suppressed = self._should_log(normalize(sql))
+        if suppressed is None:
+            return
+        entry = {
+            'time': timezone.now().isoformat(),
+            'duration_ms': round(duration, 3),
+            'database': connection.alias,
+            'view': current_view(),
+            'sql': sql,
+            'params': None if many else _params(params),
+            'plan': None if many else self.explain(connection, sql, params),
+            'suppressed': suppressed,
+        }
+        with self._lock:
+            self._ensure_listener()
+        logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def explain(self, connection, sql, params):
+        if (connection.vendor != 'sqlite'
+                or not sql.lstrip().upper().startswith(('SELECT', 'WITH'))):
+            return None
+        # Курсор самого sqlite3: EXPLAIN не проходит через обёртки Django
+        # и не попадает в журнал и счётчики запросов.
+        cursor = connection.connection.cursor(factory=SQLiteCursorWrapper)
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return _plan_lines(cursor.fetchall())
+        except Exception as error:
+            return [f'EXPLAIN не удался: {error}']
+        finally:
+            cursor.close()
+
+
+def _params(params):
+    if params is None:
+        return None
+    return [
+        value[:MAX_PARAM_LENGTH] + '…'
+        if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH
+        else value
+        for value in params
+    ]
+
+
+def _plan_lines(rows):
+    """Строки плана с отступами по вложенности, как в ``sqlite3``."""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+slow_queries = SlowQueryLog()
+
+
+def log_slow_queries(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: журнал медленных запросов."""
+    connection.execute_wrappers.append(slow_queries)
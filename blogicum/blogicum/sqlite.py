@@ -0,0 +1,29 @@
+"""Настройка соединений SQLite прагмами из ``settings.SQLITE_PRAGMAS``."""
+import re
+
+from django.conf import settings
+
+PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+def apply_pragmas(cursor, pragmas):
+    """Выполнить ``PRAGMA name = value`` для каждой пары из ``pragmas``."""
+    for name, value in pragmas.items():
+        value = str(value)
+        if not (name.isidentifier() and PRAGMA_VALUE_RE.match(value)):
+            raise ValueError(f'Недопустимая прагма SQLite: {name}={value}')
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик ``connection_created`` для соединений SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', None) or {})
+    if 'mode=ro' in str(connection.settings_dict['NAME']):
+        # Режим журнала хранится в самом файле и задаётся основной
+        # базой; read-only копия не может его менять.
+        pragmas.pop('journal_mode', None)
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, pragmas)
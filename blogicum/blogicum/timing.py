@@ -0,0 +1,203 @@
+"""Время запроса по частям: SQL, рендеринг шаблонов и всё остальное.
+
+``ServerTimingMiddleware`` замеряет каждый запрос и складывает итоги по
+представлениям в ``view_stats`` процесса, а метки для Prometheus — в
+``blogicum.metrics``. Персоналу и доле
+``SERVER_TIMING_SAMPLE_RATE`` остальных запросов отдаётся заголовок
+``Server-Timing`` — его показывают инструменты разработчика браузера.
+
+Время SQL считает обёртка соединений (подключается через
+``connection_created``), время рендеринга — бэкенд шаблонов
+``TimedDjangoTemplates``.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (
+    DjangoTemplates, Template, reraise,
+)
+
+from . import memtrack, metrics, tracing
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self, request):
+        self.request = request
+        self.db = 0.0
+        self.queries = 0
+        self.render = 0.0
+        self.rendering = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def header(self, total):
+        app = max(total - self.db - self.render, 0.0)
+        return ', '.join((
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'render;dur={self.render * 1000:.1f}',
+            f'app;dur={app * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+def current_view():
+    """Имя представления текущего запроса (или путь, пока не найдено)."""
+    timing = _current.get()
+    if timing is None:
+        return None
+    match = timing.request.resolver_match
+    return match.view_name if match else timing.request.path
+
+
+def time_queries(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: время SQL текущего запроса."""
+    def wrapper(execute, sql, params, many, context):
+        timing = _current.get()
+        if timing is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timing.db += time.perf_counter() - start
+            timing.queries += 1
+
+    connection.execute_wrappers.append(wrapper)
+
+
+def count_cache(hit):
+    """Учесть обращение к кэшу в метриках текущего запроса."""
+    timing = _current.get()
+    if timing is not None:
+        if hit:
+            timing.cache_hits += 1
+        else:
+            timing.cache_misses += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with tracing.span(
+            'template.render', template=self.origin.template_name
+        ):
+            return self._render_timed(context, request)
+
+    def _render_timed(self, context, request):
+        timing = _current.get()
+        # Вложенные рендеры (render_to_string в тегах) уже входят во
+        # внешний.
+        if timing is None or timing.rendering:
+            return super().render(context, request)
+        timing.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.render += time.perf_counter() - start
+            timing.rendering = False
+            # Контекст со всеми объектами страницы ещё жив: удобная точка
+            # для снимка памяти, если запрос отслеживается.
+            memtrack.checkpoint()
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд Django-шаблонов, считающий время рендеринга запроса."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class ViewStats:
+    __slots__ = ('count', 'total', 'db', 'render', 'queries', 'max')
+
+    def __init__(self):
+        self.count = self.queries = 0
+        self.total = self.db = self.render = self.max = 0.0
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / count * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'db_ms': round(self.db / count * 1000, 3),
+            'render_ms': round(self.render / count * 1000, 3),
+            'queries': round(self.queries / count, 2),
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record(view_name, timing, total):
+    with _stats_lock:
+        stats = _stats.get(view_name)
+        if stats is None:
+            stats = _stats[view_name] = ViewStats()
+        stats.count += 1
+        stats.total += total
+        stats.db += timing.db
+        stats.render += timing.render
+        stats.queries += timing.queries
+        stats.max = max(stats.max, total)
+
+
+def view_stats():
+    """Средние по представлениям с запуска процесса."""
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+def reset_view_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming(request)
+        token = _current.set(timing)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        record(view_name, timing, total)
+        metrics.registry.observe_request(
+            view_name, request.method, response.status_code, total, timing
+        )
+        if self.expose(request):
+            response['Server-Timing'] = timing.header(total)
+        return response
+
+    @staticmethod
+    def expose(request):
+        # Пользователя проверяем только при наличии сессии, чтобы не
+        # делать ради заголовка лишних запросов для анонимов.
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_staff:
+                return True
+        rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
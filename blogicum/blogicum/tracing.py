@@ -0,0 +1,320 @@
+"""Трассировка отдельных запросов: спаны в JSONL-файлах в формате OTLP.
+
+Доля ``TRACING_SAMPLE_RATE`` запросов (и все запросы с заголовком
+``traceparent`` с флагом sampled) трассируется; при 0 трассировка
+выключена целиком. Спаны:
+
+* ``http.request`` — весь запрос (``TracingMiddleware``, первый в
+  ``MIDDLEWARE``), ``view`` — обработчик вместе с ``process_view``
+  (``ViewSpanMiddleware``, последний); разница между ними — время
+  остальных middleware;
+* ``sql`` — каждый запрос к БД (обёртка соединения);
+* ``template.render`` и ``template.include`` — шаблоны и их
+  ``{% include %}`` (бэкенд ``TimedDjangoTemplates`` и встроенная
+  библиотека ``blogicum.tracing_tags``);
+* ``cache.*`` и ``storage.*`` — кэш и файловое хранилище
+  (``TracedLocMemCache``, ``TracedFileSystemStorage``).
+
+Каждая трасса — строка ``TRACING_DIR/<pid>.jsonl`` в формате
+``ExportTraceServiceRequest`` (как у file exporter в OpenTelemetry
+Collector); пишет их фоновый поток. В записи логов добавляются
+атрибуты ``trace_id`` и ``span_id``, идентификатор трассы возвращается в
+заголовке ``X-Trace-Id``.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import FileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SPANS = 1000
+TRACEPARENT_RE = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$'
+)
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+
+_trace = ContextVar('trace', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'kind', 'start', 'end',
+                 'attributes', 'error')
+
+    def __init__(self, name, parent_id, kind, attributes):
+        self.name = name
+        self.span_id = random.getrandbits(64).to_bytes(8, 'big').hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+
+    def as_otlp(self, trace_id):
+        span = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            'status': (
+                {'code': 2, 'message': self.error} if self.error
+                else {'code': 0}
+            ),
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Trace:
+    def __init__(self, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or random.getrandbits(128).to_bytes(
+            16, 'big'
+        ).hex()
+        self.parent_id = parent_id
+        self.spans = []
+        self.stack = []
+        self.dropped = 0
+        self.max_spans = getattr(
+            settings, 'TRACING_MAX_SPANS', DEFAULT_MAX_SPANS
+        )
+
+    @property
+    def current_span_id(self):
+        return self.stack[-1].span_id if self.stack else self.parent_id
+
+    def start(self, name, kind, attributes):
+        span = Span(name, self.current_span_id, kind, attributes)
+        self.stack.append(span)
+        return span
+
+    def finish(self, span):
+        span.end = time.time_ns()
+        self.stack.remove(span)
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def as_otlp(self):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{
+                'key': 'service.name',
+                'value': {'stringValue': 'blogicum'},
+            }]},
+            'scopeSpans': [{
+                'scope': {'name': 'blogicum.tracing'},
+                'spans': [span.as_otlp(self.trace_id) for span in self.spans],
+            }],
+        }]}
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """Спан вокруг блока, если текущий запрос трассируется."""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start(name, kind, attributes)
+    try:
+        yield current
+    except BaseException as error:
+        current.error = repr(error)
+        raise
+    finally:
+        trace.finish(current)
+
+
+class Exporter:
+    """Фоновый поток, дописывающий трассы в файл процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def export(self, trace):
+        with self._lock:
+            # Поток записи не переживает fork: у каждого процесса свой.
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                threading.Thread(
+                    target=self._run, args=(self._queue,),
+                    name='tracing-export', daemon=True,
+                ).start()
+        path = Path(settings.TRACING_DIR) / f'{self._pid}.jsonl'
+        self._queue.put((path, trace.as_otlp()))
+
+    def _run(self, traces):
+        while True:
+            path, data = traces.get()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, 'a', encoding='utf-8') as output:
+                    output.write(json.dumps(data, ensure_ascii=False) + '\n')
+            except OSError:
+                logger.exception('Не удалось записать трассу')
+            finally:
+                traces.task_done()
+
+    def flush(self):
+        """Дождаться записи всех поставленных в очередь трасс."""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+
+exporter = Exporter()
+
+
+def trace_queries(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: спан на каждый SQL-запрос."""
+    def wrapper(execute, sql, params, many, context):
+        if _trace.get() is None:
+            return execute(sql, params, many, context)
+        with span('sql', SPAN_KIND_CLIENT, **{
+            'db.system': connection.vendor,
+            'db.name': connection.alias,
+            'db.statement': sql,
+        }):
+            return execute(sql, params, many, context)
+
+    connection.execute_wrappers.append(wrapper)
+
+
+def _traced(method, name, attribute):
+    def traced(self, key, *args, **kwargs):
+        if _trace.get() is None:
+            return method(self, key, *args, **kwargs)
+        with span(name, **{attribute: str(key)}):
+            return method(self, key, *args, **kwargs)
+    return traced
+
+
+class TracedLocMemCache(LocMemCache):
+    """``LocMemCache`` со спанами ``cache.*`` на каждое обращение."""
+
+    get = _traced(LocMemCache.get, 'cache.get', 'cache.key')
+    get_many = _traced(LocMemCache.get_many, 'cache.get_many', 'cache.key')
+    set = _traced(LocMemCache.set, 'cache.set', 'cache.key')
+    add = _traced(LocMemCache.add, 'cache.add', 'cache.key')
+    incr = _traced(LocMemCache.incr, 'cache.incr', 'cache.key')
+    delete = _traced(LocMemCache.delete, 'cache.delete', 'cache.key')
+
+
+class TracedFileSystemStorage(FileSystemStorage):
+    """Файловое хранилище со спанами ``storage.*``."""
+
+    _open = _traced(FileSystemStorage._open, 'storage.open', 'file.name')
+    _save = _traced(FileSystemStorage._save, 'storage.save', 'file.name')
+    delete = _traced(FileSystemStorage.delete, 'storage.delete', 'file.name')
+
+
+class TraceRecordFactory:
+    """Фабрика записей логов с ``trace_id`` и ``span_id``."""
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __call__(self, *args, **kwargs):
+        record = self.factory(*args, **kwargs)
+        trace = _trace.get()
+        record.trace_id = trace.trace_id if trace else ''
+        record.span_id = (trace.current_span_id or '') if trace else ''
+        return record
+
+
+def _install_record_factory():
+    factory = logging.getLogRecordFactory()
+    if not isinstance(factory, TraceRecordFactory):
+        logging.setLogRecordFactory(TraceRecordFactory(factory))
+
+
+class TracingMiddleware:
+    def __init__(self, get_response):
+        # Атрибуты нужны логам и при выключенной трассировке, иначе
+        # формат с ``%(trace_id)s`` сломается.
+        _install_record_factory()
+        if not getattr(settings, 'TRACING_SAMPLE_RATE', 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def start_trace(self, request):
+        match = TRACEPARENT_RE.match(request.META.get('HTTP_TRACEPARENT', ''))
+        if match and int(match.group(3), 16) & 1:
+            return Trace(match.group(1), match.group(2))
+        if random.random() < settings.TRACING_SAMPLE_RATE:
+            return Trace()
+        return None
+
+    def __call__(self, request):
+        trace = self.start_trace(request)
+        if trace is None:
+            return self.get_response(request)
+        token = _trace.set(trace)
+        try:
+            with span('http.request', SPAN_KIND_SERVER, **{
+                'http.method': request.method,
+                'http.target': request.get_full_path(),
+            }) as root:
+                response = self.get_response(request)
+                match = request.resolver_match
+                root.attributes['http.route'] = (
+                    match.view_name if match else ''
+                )
+                root.attributes['http.status_code'] = response.status_code
+        finally:
+            _trace.reset(token)
+        if trace.dropped:
+            root.attributes['dropped_spans'] = trace.dropped
+        exporter.export(trace)
+        response['X-Trace-Id'] = trace.trace_id
+        return response
+
+
+class ViewSpanMiddleware:
+    """Спан ``view``; ставится последним в ``MIDDLEWARE``."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TRACING_SAMPLE_RATE', 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if _trace.get() is None:
+            return self.get_response(request)
+        with span('view') as current:
+            response = self.get_response(request)
+            match = request.resolver_match
+            current.attributes['view'] = match.view_name if match else ''
+        return response
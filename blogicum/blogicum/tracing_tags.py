@@ -0,0 +1,25 @@
+"""Встроенная библиотека шаблонов: ``{% include %}`` со спаном трассировки.
+
+Подключается в ``TEMPLATES['OPTIONS']['builtins']`` и заменяет
+стандартный тег: поведение то же, но рендеринг вложенного шаблона
+попадает в трассу спаном ``template.include``.
+"""
+from django import template
+from django.template.loader_tags import IncludeNode, do_include
+
+from .tracing import span
+
+register = template.Library()
+
+
+class TracedIncludeNode(IncludeNode):
+    def render(self, context):
+        with span('template.include', template=self.template.token):
+            return super().render(context)
+
+
+@register.tag('include')
+def traced_include(parser, token):
+    node = do_include(parser, token)
+    node.__class__ = TracedIncludeNode
+    return node
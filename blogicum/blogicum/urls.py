@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import include, path
 from blog.views import register
+from blogicum.metrics import metrics
 
 urlpatterns = [
     path('', include('blog.urls')),
@@ -11,6 +12,7 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     path('auth/registration/', register, name='registration'),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
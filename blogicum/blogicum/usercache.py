@@ -0,0 +1,127 @@
+"""Кэш пользователей процесса для ``request.user``.
+
+Каждый запрос вошедшего пользователя читает сессию, а потом ещё и
+строку ``User``. Здесь проверенный пользователь запоминается в LRU
+процесса на ``USER_CACHE_SECONDS`` вместе с хэшем авторизации из
+сессии и версией пользователя: следующие запросы с той же сессией
+получают его копию без запроса к БД.
+
+Версия лежит в кэше ``USER_CACHE_ALIAS`` и увеличивается при сохранении
+или удалении пользователя (в том числе при смене пароля, блокировке и
+обновлении ``last_login``); запись с другой версией не используется, и
+пользователь заново проверяется по строке в БД — так старые сессии
+выходят сразу после смены пароля. Если этот кэш общий (Memcached,
+Redis, таблица в БД), это верно для всех процессов. С кэшем в памяти
+процесса версия видна только своему процессу: в остальных старые сессии
+работают ещё до ``USER_CACHE_SECONDS``, поэтому TTL короткий.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+DEFAULT_ALIAS = 'default'
+DEFAULT_SIZE = 1000
+DEFAULT_SECONDS = 30
+
+
+def _shared_cache():
+    return caches[getattr(settings, 'USER_CACHE_ALIAS', DEFAULT_ALIAS)]
+
+
+def _version_key(user_id):
+    return f'usercache:version:{user_id}'
+
+
+def current_version(user_id):
+    """Версия пользователя в общем кэше."""
+    cache = _shared_cache()
+    key = _version_key(user_id)
+    # Начальная версия уникальна, чтобы после вытеснения ключа не
+    # совпасть с версией старых записей.
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+class UserCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # pk -> (хэш авторизации, путь бэкенда, версия, пользователь,
+        # истекает).
+        self._entries = OrderedDict()
+
+    def get(self, user_id, backend_path, session_hash, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            cached_hash, cached_backend, cached_version, user, expires = (
+                entry
+            )
+            if time.monotonic() >= expires or cached_version != version:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        if (cached_backend != backend_path or not session_hash
+                or not constant_time_compare(cached_hash, session_hash)):
+            return None
+        # Копия: представления меняют request.user (например, форма
+        # профиля), а запись читают параллельные запросы.
+        return copy.copy(user)
+
+    def set(self, user_id, backend_path, session_hash, version, user):
+        ttl = getattr(settings, 'USER_CACHE_SECONDS', DEFAULT_SECONDS)
+        size = getattr(settings, 'USER_CACHE_SIZE', DEFAULT_SIZE)
+        with self._lock:
+            self._entries[user_id] = (
+                session_hash, backend_path, version, copy.copy(user),
+                time.monotonic() + ttl,
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Сбросить запись процесса и версию пользователя в общем кэше."""
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+        cache = _shared_cache()
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns(), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def get_user(request):
+    """Как ``django.contrib.auth.get_user``, но через ``user_cache``."""
+    session = request.session
+    try:
+        user_id = session[auth.SESSION_KEY]
+        backend_path = session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if not getattr(settings, 'USER_CACHE_SECONDS', DEFAULT_SECONDS):
+        return auth.get_user(request)
+    # Версия читается до загрузки из БД: сохранение между ними сбросит
+    # и только что записанную копию.
+    version = current_version(user_id)
+    user = user_cache.get(user_id, backend_path, session_hash, version)
+    if user is not None:
+        return user
+    user = auth.get_user(request)
+    if user.is_authenticated and session_hash:
+        user_cache.set(user_id, backend_path, session_hash, version, user)
+    return user
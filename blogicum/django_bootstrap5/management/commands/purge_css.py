@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from django_bootstrap5 import purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the purged and critical Bootstrap stylesheets from the '
+        'selectors used in project templates.'
+    )
+
+    def handle(self, *args, **options):
+        for path, size in purge.build().items():
+            self.stdout.write(f'{path}: {size} bytes')
+        self.stdout.write(self.style.SUCCESS('Stylesheets rebuilt.'))
@@ -0,0 +1,226 @@
+"""Build-time helpers that shrink ``bootstrap.min.css`` to what we use.
+
+The templates only need a small part of Bootstrap, so ``purge_css`` scans
+the project templates (and the tag implementations, which emit markup of
+their own) for class names, ids and element names, then keeps only the CSS
+rules whose selectors can match them.  The same pass, restricted to the
+templates that make up the top of every page, produces the critical
+stylesheet that ``bootstrap_css`` inlines.
+"""
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.template.utils import get_app_template_dirs
+
+SOURCE_CSS = 'css/bootstrap.min.css'
+PURGED_CSS = 'css/bootstrap.purged.css'
+CRITICAL_CSS = 'css/bootstrap.critical.css'
+
+# Templates rendered above the fold on every page.
+CRITICAL_TEMPLATES = (
+    'base.html', 'includes/header.html', 'includes/user_nav.html',
+)
+
+# Elements produced by ``form.as_p()`` and the error pages rather than
+# written literally in the templates.
+FORM_TAGS = frozenset({
+    'form', 'p', 'label', 'input', 'select', 'option', 'textarea',
+    'ul', 'li', 'span', 'button',
+})
+# Classes ``bootstrap_form`` passes to widgets as attrs at render time,
+# plus the search box ``js/picker.js`` inserts.
+WIDGET_CLASSES = frozenset({
+    'form-control', 'form-select', 'form-check-input', 'is-invalid', 'mb-1',
+})
+# Always present in the document even if no template spells them out.
+ROOT_TAGS = frozenset({'html', 'body'})
+
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}', re.S)
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*["\']([^"\']*)["\']')
+ID_ATTR_RE = re.compile(r'\bid\s*=\s*["\']([^"\']*)["\']')
+ELEMENT_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+LICENSE_RE = re.compile(r'/\*!.*?\*/', re.S)
+CHARSET_RE = re.compile(r'^\s*(@charset\s+"[^"]*";)')
+PARENS_RE = re.compile(r'\([^()]*\)')
+ATTRIBUTE_RE = re.compile(r'\[[^\]]*\]')
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+ID_RE = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+LEADING_TAG_RE = re.compile(r'^([a-zA-Z][\w-]*)')
+COMBINATOR_RE = re.compile(r'\s*[\s>+~]\s*')
+KEYFRAMES_RE = re.compile(r'^@(?:-webkit-)?keyframes\s+([\w-]+)')
+
+
+class UsedSelectors:
+    """Class names, ids and element names found in markup sources."""
+
+    def __init__(self, classes=(), ids=(), tags=()):
+        self.classes = set(classes)
+        self.ids = set(ids)
+        self.tags = set(tags)
+
+    def feed(self, markup):
+        for value in CLASS_ATTR_RE.findall(markup):
+            self.classes.update(TEMPLATE_TAG_RE.sub(' ', value).split())
+        for value in ID_ATTR_RE.findall(markup):
+            self.ids.update(TEMPLATE_TAG_RE.sub(' ', value).split())
+        self.tags.update(tag.lower() for tag in ELEMENT_RE.findall(markup))
+        return self
+
+    def matches(self, selector):
+        """Return whether ``selector`` may match an element we render."""
+        # Arguments of :not()/:is() and attribute values never add
+        # requirements of their own, so they are dropped before the check.
+        previous = None
+        while previous != selector:
+            previous, selector = selector, PARENS_RE.sub('', selector)
+        selector = ATTRIBUTE_RE.sub('', selector)
+        if not set(CLASS_RE.findall(selector)) <= self.classes:
+            return False
+        if not set(ID_RE.findall(selector)) <= self.ids:
+            return False
+        for compound in COMBINATOR_RE.split(selector.strip()):
+            tag = LEADING_TAG_RE.match(compound)
+            if tag and tag.group(1).lower() not in self.tags:
+                return False
+        return True
+
+
+def template_dirs():
+    dirs = []
+    for engine in settings.TEMPLATES:
+        dirs.extend(Path(path) for path in engine.get('DIRS', ()))
+    dirs.extend(Path(path) for path in get_app_template_dirs('templates'))
+    return dirs
+
+
+def collect_used(templates=None):
+    """Scan templates (all of them, or only the given names)."""
+    used = UsedSelectors(tags=ROOT_TAGS)
+    for directory in template_dirs():
+        if templates is None:
+            paths = directory.rglob('*.html')
+        else:
+            paths = (directory / name for name in templates)
+        for path in paths:
+            if path.is_file():
+                used.feed(path.read_text(encoding='utf-8'))
+    if templates is None:
+        used.tags.update(FORM_TAGS)
+        used.classes.update(WIDGET_CLASSES)
+        tags_dir = Path(__file__).resolve().parent / 'templatetags'
+        for path in tags_dir.glob('*.py'):
+            used.feed(path.read_text(encoding='utf-8'))
+    return used
+
+
+def split_blocks(css):
+    """Split a stylesheet into ``(prelude, body)`` pairs.
+
+    Statements without a block (``@charset``) get ``None`` as the body.
+    """
+    blocks = []
+    start = pos = 0
+    length = len(css)
+    while pos < length:
+        char = css[pos]
+        if char in '"\'':
+            pos = css.index(char, pos + 1)
+        elif char == ';':
+            prelude = css[start:pos].strip()
+            if prelude:
+                blocks.append((prelude, None))
+            start = pos + 1
+        elif char == '{':
+            depth, body_start = 1, pos + 1
+            while depth:
+                pos += 1
+                if css[pos] in '"\'':
+                    pos = css.index(css[pos], pos + 1)
+                elif css[pos] == '{':
+                    depth += 1
+                elif css[pos] == '}':
+                    depth -= 1
+            blocks.append((css[start:body_start - 1].strip(),
+                           css[body_start:pos]))
+            start = pos + 1
+        pos += 1
+    return blocks
+
+
+def split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for pos, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and not depth:
+            selectors.append(prelude[start:pos].strip())
+            start = pos + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def _purge_blocks(blocks, used, keyframes):
+    output = []
+    for prelude, body in blocks:
+        if body is None:
+            # @charset is restored by purge(); nothing else goes here.
+            continue
+        if prelude.startswith(('@media', '@supports')):
+            inner = _purge_blocks(split_blocks(body), used, keyframes)
+            if inner:
+                output.append(f'{prelude}{{{inner}}}')
+            continue
+        name = KEYFRAMES_RE.match(prelude)
+        if name:
+            keyframes.append((name.group(1), f'{prelude}{{{body}}}'))
+            continue
+        if prelude.startswith('@'):
+            output.append(f'{prelude}{{{body}}}')
+            continue
+        selectors = [
+            selector for selector in split_selectors(prelude)
+            if used.matches(selector)
+        ]
+        if selectors:
+            output.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(output)
+
+
+def purge(css, used):
+    """Return ``css`` with every rule that cannot match ``used`` removed."""
+    keyframes = []
+    purged = _purge_blocks(split_blocks(COMMENT_RE.sub('', css)), used,
+                           keyframes)
+    animations = ''.join(
+        block for name, block in keyframes
+        if re.search(rf'animation[\w-]*:[^;}}]*\b{name}\b', purged)
+    )
+    header = ''.join(
+        match.group(0).strip() + '\n'
+        for match in (CHARSET_RE.match(css), LICENSE_RE.search(css))
+        if match
+    )
+    return header + purged + animations
+
+
+def build(static_dir=None):
+    """Write the purged and critical stylesheets next to the source one.
+
+    Returns a mapping of written paths to their sizes in bytes.
+    """
+    if static_dir is None:
+        static_dir = Path(settings.STATICFILES_DIRS[0])
+    source = (static_dir / SOURCE_CSS).read_text(encoding='utf-8')
+    outputs = {
+        static_dir / PURGED_CSS: purge(source, collect_used()),
+        static_dir / CRITICAL_CSS: purge(
+            source, collect_used(CRITICAL_TEMPLATES)
+        ),
+    }
+    for path, css in outputs.items():
+        path.write_text(css, encoding='utf-8')
+    return {path: len(css.encode('utf-8')) for path, css in outputs.items()}
@@ -4,28 +4,216 @@ This stub is provided so the test environment does not require the
 third-party ``django_bootstrap5`` package.  The implementation covers only
 what the templates in this repository rely on.
 """
-from django import template
+import os
+from functools import lru_cache
+
+from django import forms, template
+from django.contrib.staticfiles import finders
+from django.forms.renderers import ROOT, DjangoTemplates
+from django.templatetags.static import static
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
+from django.utils.translation import gettext as _
+
+from django_bootstrap5.purge import CRITICAL_CSS, PURGED_CSS, SOURCE_CSS
 
 register = template.Library()
 
 
+@lru_cache(maxsize=8)
+def _read_stylesheet(path, mtime):
+    with open(path, encoding="utf-8") as stylesheet:
+        return stylesheet.read()
+
+
+def _critical_css():
+    """Return the critical stylesheet built by ``purge_css``, if any.
+
+    The file is re-read only when its modification time changes, so a
+    rebuild is picked up without restarting the server.
+    """
+    if not finders.find(PURGED_CSS):
+        return None
+    path = finders.find(CRITICAL_CSS)
+    if not path:
+        return None
+    return _read_stylesheet(path, os.stat(path).st_mtime_ns)
+
+
 @register.simple_tag
 def bootstrap_css():
-    """Return an empty string instead of relying on the real package."""
-    return ""
+    """Inline the critical CSS and load the purged stylesheet async.
 
+    Falls back to the full ``bootstrap.min.css`` until ``purge_css`` has
+    been run.
+    """
+    critical = _critical_css()
+    if critical is None:
+        return format_html(
+            '<link rel="stylesheet" href="{}">', static(SOURCE_CSS)
+        )
+    href = static(PURGED_CSS)
+    return format_html(
+        "<style>{}</style>\n"
+        '<link rel="preload" href="{}" as="style" '
+        "onload=\"this.onload=null;this.rel='stylesheet'\">\n"
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        mark_safe(critical),
+        href,
+        href,
+    )
 
-@register.simple_tag
-def bootstrap_button(*, button_type="submit", content="", **_kwargs):
-    html = (
-        f'<button type="{button_type}" class="btn btn-primary">'
+
+@lru_cache(maxsize=64)
+def _button_html(button_type, content, button_class):
+    return mark_safe(
+        f'<button type="{button_type}" class="btn {button_class}">'
         f"{content}</button>"
     )
-    return mark_safe(html)
+
+
+@register.simple_tag
+def bootstrap_button(
+    *, button_type="submit", content="", button_class="btn-primary",
+    **_kwargs
+):
+    return _button_html(button_type, str(content), button_class)
+
+
+def _widget_class(widget):
+    if isinstance(widget, forms.CheckboxInput):
+        return "form-check-input"
+    if isinstance(widget, forms.Select):
+        return "form-select"
+    return "form-control"
+
+
+class CompiledTemplates(DjangoTemplates):
+    """Default form renderer that always keeps compiled templates.
+
+    Django only enables the cached loader with ``DEBUG`` off, so in
+    development every widget and ``{% include %}`` is re-parsed on each
+    render.
+    """
+
+    @cached_property
+    def engine(self):
+        return self.backend({
+            "APP_DIRS": False,
+            "DIRS": [ROOT / self.backend.app_dirname],
+            "NAME": "djangoforms-compiled",
+            "OPTIONS": {
+                "loaders": [(
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )],
+            },
+        })
+
+
+_compiled_renderer = CompiledTemplates()
+
+
+class FieldPlan:
+    """Parts of a field's markup that do not depend on bound data."""
+
+    def __init__(self, bound_field, renderer):
+        self.name = bound_field.name
+        self.is_hidden = bound_field.is_hidden
+        widget = bound_field.field.widget
+        self.template = renderer.get_template(widget.template_name)
+        css_class = " ".join(
+            filter(None, (widget.attrs.get("class"), _widget_class(widget)))
+        )
+        self.attrs = {"class": css_class}
+        self.invalid_attrs = {"class": f"{css_class} is-invalid"}
+        self.label = bound_field.label_tag(attrs={"class": "form-label"})
+        help_text = bound_field.help_text
+        self.help = (
+            mark_safe(f'<div class="form-text">{help_text}</div>')
+            if help_text else ""
+        )
+
+    def render_widget(self, bound_field, attrs):
+        """Same markup as ``BoundField.as_widget`` minus template lookup."""
+        widget = bound_field.field.widget
+        attrs = bound_field.build_widget_attrs(dict(attrs), widget)
+        if bound_field.auto_id and "id" not in widget.attrs:
+            attrs.setdefault("id", bound_field.auto_id)
+        context = widget.get_context(
+            bound_field.html_name, bound_field.value(), attrs
+        )
+        return mark_safe(self.template.render(context).strip())
+
+
+class FormPlan:
+    """Rendering plan compiled once per form class, prefix and fields."""
+
+    def __init__(self, form):
+        renderer = form.renderer
+        if type(renderer) is DjangoTemplates:
+            renderer = _compiled_renderer
+        self.fields = [FieldPlan(form[name], renderer) for name in form.fields]
+
+    def render(self, form):
+        top_errors = list(form.non_field_errors())
+        parts = []
+        for plan in self.fields:
+            bound_field = form[plan.name]
+            errors = bound_field.errors
+            widget = plan.render_widget(
+                bound_field, plan.invalid_attrs if errors else plan.attrs
+            )
+            if plan.is_hidden:
+                # Shown at the top of the form, as ``form.as_p()`` does.
+                top_errors.extend(
+                    _("(Hidden field %(name)s) %(error)s")
+                    % {"name": plan.name, "error": str(error)}
+                    for error in errors
+                )
+                parts.append(widget)
+                continue
+            feedback = "".join(
+                format_html(
+                    '<div class="invalid-feedback d-block">{}</div>', error
+                )
+                for error in errors
+            )
+            parts.append(
+                f'<div class="mb-3">{plan.label}{widget}'
+                f"{plan.help}{feedback}</div>"
+            )
+        alerts = [
+            format_html('<div class="alert alert-danger">{}</div>', error)
+            for error in top_errors
+        ]
+        return mark_safe("".join(alerts + parts))
+
+
+_form_plans = {}
+
+
+def get_form_plan(form):
+    key = (
+        type(form), form.renderer, form.prefix, form.auto_id,
+        tuple(form.fields),
+    )
+    plan = _form_plans.get(key)
+    if plan is None:
+        plan = _form_plans[key] = FormPlan(form)
+    return plan
 
 
 @register.simple_tag
 def bootstrap_form(form, **_kwargs):
-    """Render the form using the default ``as_p`` representation."""
-    return mark_safe(form.as_p())
+    """Render the form with Bootstrap markup using a cached plan.
+
+    Field order, labels, help texts, widget classes and widget templates
+    are worked out once per form class; each render only draws widgets
+    and errors.
+    """
+    return get_form_plan(form).render(form)
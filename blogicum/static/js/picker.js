@@ -0,0 +1,48 @@
+// Автодополнение для больших списков местоположений и категорий:
+// над <select data-picker-url> появляется поле поиска, варианты
+// подгружаются из JSON-эндпоинта по введённому префиксу.
+(function () {
+  function attach(select) {
+    if (select.dataset.pickerReady) {
+      return;
+    }
+    select.dataset.pickerReady = '1';
+    var search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control mb-1';
+    search.placeholder = 'Начните вводить название';
+    search.autocomplete = 'off';
+    select.parentNode.insertBefore(search, select);
+    var timer = null;
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var url = select.dataset.pickerUrl + '?q=' +
+          encodeURIComponent(search.value);
+        fetch(url, {credentials: 'same-origin'})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            var keep = Array.prototype.filter.call(select.options,
+              function (option) { return !option.value || option.selected; });
+            select.innerHTML = '';
+            keep.forEach(function (option) { select.add(option); });
+            data.results.forEach(function (item) {
+              if (!select.querySelector('option[value="' + item.id + '"]')) {
+                select.add(new Option(item.text, item.id));
+              }
+            });
+          });
+      }, 200);
+    });
+  }
+
+  function init() {
+    document.querySelectorAll('select[data-picker-url]').forEach(attach);
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
@@ -0,0 +1,62 @@
+// Подсказки в поле поиска: по мере ввода запрашивает /typeahead/ и
+// показывает под полем ссылки на посты, категории и авторов.
+(function () {
+  var KINDS = {post: 'пост', category: 'категория', user: 'автор'};
+
+  function attach(input) {
+    var form = input.form;
+    var box = form.querySelector('[data-typeahead-results]');
+    var item = form.querySelector('template[data-typeahead-item]');
+    var timer = null;
+    var last = null;
+
+    function show(results) {
+      box.innerHTML = '';
+      results.forEach(function (result) {
+        var link = item.content.firstElementChild.cloneNode(true);
+        link.href = result.url;
+        link.insertBefore(document.createTextNode(result.text + ' '),
+          link.firstChild);
+        link.querySelector('small').textContent = KINDS[result.type];
+        box.appendChild(link);
+      });
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var query = input.value.trim();
+        if (query === last) {
+          return;
+        }
+        last = query;
+        if (!query) {
+          show([]);
+          return;
+        }
+        fetch(input.dataset.typeaheadUrl + '?q=' + encodeURIComponent(query),
+          {credentials: 'same-origin'})
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            if (query === last) {
+              show(data.results);
+            }
+          });
+      }, 100);
+    });
+    input.addEventListener('blur', function () {
+      // Даём клику по ссылке сработать до скрытия списка.
+      setTimeout(function () { show([]); }, 200);
+    });
+  }
+
+  function init() {
+    document.querySelectorAll('input[data-typeahead-url]').forEach(attach);
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
@@ -0,0 +1,9 @@
+import pytest
+
+from blogicum.nplusone import Detector
+
+
+@pytest.fixture
+def nplusone():
+    """Детектор N+1: ``with nplusone.record(): ...``, затем проверки."""
+    return Detector()
@@ -0,0 +1,35 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+def test_anonymous_pages_skip_session(mixer, user, client):
+    post = mixer.blend(
+        'blog.Post', author=user, is_published=True,
+        category__is_published=True,
+    )
+    urls = (
+        '/', f'/posts/{post.pk}/', f'/category/{post.category.slug}/',
+        f'/profile/{user.username}/', '/pages/about/', '/search/?q=пост',
+    )
+    for url in urls:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        assert not [
+            query for query in queries.captured_queries
+            if 'django_session' in query['sql']
+        ], f'Анонимный запрос к {url} не должен читать сессию.'
+        assert not response.cookies, (
+            f'Ответ анониму на {url} не должен ставить cookie.'
+        )
+        assert 'Cookie' in response['Vary']
+
+
+@pytest.mark.django_db
+def test_logged_in_user_still_recognised(user, user_client):
+    response = user_client.get('/')
+    assert response.context['user'] == user, (
+        'С cookie сессии пользователь должен определяться как раньше.'
+    )
@@ -0,0 +1,40 @@
+import pytest
+from django import forms
+
+from blog.forms import CommentForm
+from django_bootstrap5.templatetags.django_bootstrap5 import (
+    bootstrap_form, get_form_plan)
+
+
+@pytest.mark.django_db
+def test_bootstrap_form_reuses_plan_and_renders_errors():
+    form = CommentForm({'text': ''})
+    assert not form.is_valid()
+
+    assert get_form_plan(form) is get_form_plan(CommentForm()), (
+        'Убедитесь, что план рендеринга формы строится один раз на класс.'
+    )
+    html = bootstrap_form(form)
+    assert 'name="text"' in html and 'is-invalid' in html, (
+        'Убедитесь, что `bootstrap_form` выводит поля формы и отмечает '
+        'поля с ошибками.'
+    )
+    assert 'is-invalid' not in bootstrap_form(CommentForm()), (
+        'Ошибки одной формы не должны попадать в разметку другой.'
+    )
+
+
+class HiddenFieldForm(forms.Form):
+    token = forms.CharField(widget=forms.HiddenInput)
+    text = forms.CharField()
+
+
+def test_bootstrap_form_shows_hidden_field_errors():
+    form = HiddenFieldForm({'text': 'Текст'})
+    assert not form.is_valid()
+    html = bootstrap_form(form)
+    assert '(Скрытое поле token) Обязательное поле.' in html, (
+        'Ошибки скрытых полей должны выводиться над формой, как в '
+        '`form.as_p()`.'
+    )
+    assert html.index('alert-danger') < html.index('name="token"')
@@ -0,0 +1,64 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from blog.models import Comment, Post
+
+
+def jsonl(*rows):
+    return ''.join(
+        (row if isinstance(row, str) else json.dumps(row)) + '\n'
+        for row in rows
+    )
+
+
+@pytest.mark.django_db
+def test_import_endpoint_reports_row_errors(mixer, user, user_client):
+    post = mixer.blend('blog.Post', author=user)
+    body = jsonl(
+        {'post': post.id, 'author': user.username, 'text': 'Старый',
+         'created_at': '2015-03-01T12:00:00+00:00'},
+        'не json',
+        {'post': post.id + 1000, 'author': user.username, 'text': 'Текст'},
+        {'post': post.id, 'author': 'нет-такого', 'text': 'Текст'},
+        {'post': post.id, 'author': user.username, 'text': 'Новый'},
+    )
+    url = '/comments/import/'
+    response = user_client.post(url, body, content_type='application/jsonl')
+    assert response.status_code == 403, 'Импорт доступен только персоналу.'
+
+    user.is_staff = True
+    user.save()
+    response = user_client.post(url, body, content_type='application/jsonl')
+    assert response.status_code == 200
+    result = response.json()
+    assert result['created'] == 2
+    assert [error['line'] for error in result['errors']] == [2, 3, 4], (
+        'Ошибки должны сообщаться для каждой строки с её номером.'
+    )
+    assert Post.objects.get(pk=post.pk).comment_count == 2
+    old = Comment.objects.get(text='Старый')
+    assert old.created_at.year == 2015, 'Дата из файла должна сохраняться.'
+
+
+@pytest.mark.django_db
+def test_import_command_batches(mixer, user, django_assert_max_num_queries,
+                                tmp_path):
+    posts = mixer.cycle(3).blend('blog.Post', author=user)
+    path = tmp_path / 'comments.jsonl'
+    path.write_text(jsonl(*(
+        {'post': posts[i % 3].id, 'author': user.username, 'text': str(i)}
+        for i in range(30)
+    )), encoding='utf-8')
+    output = StringIO()
+    # На пачку: авторы, посты, вставка, счётчики и точка сохранения.
+    with django_assert_max_num_queries(3 * 6):
+        call_command(
+            'import_comments', str(path), batch_size=10, stdout=output
+        )
+    assert 'Импортировано комментариев: 30' in output.getvalue()
+    assert [
+        post.comment_count for post in Post.objects.order_by('pk')
+    ] == [10, 10, 10]
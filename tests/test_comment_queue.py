@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+
+from blog.comments import CommentQueueTimeout, save_comment
+from blog.models import Comment
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(COMMENT_GROUP_COMMIT=True)
+def test_group_commit_writes_comments_and_counters(mixer, user):
+    post = mixer.blend('blog.Post', author=user)
+
+    def comment():
+        save_comment(Comment(text='Комментарий', author=user, post=post))
+        connection.close()
+
+    threads = [threading.Thread(target=comment) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    post.refresh_from_db()
+    assert Comment.objects.filter(post=post).count() == 10, (
+        'Убедитесь, что все комментарии из очереди записаны в БД.'
+    )
+    assert post.comment_count == 10, (
+        'Убедитесь, что групповой коммит обновляет счётчик комментариев.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(COMMENT_GROUP_COMMIT=True)
+def test_group_commit_fragment_has_author_links(mixer, user, user_client):
+    post = mixer.blend(
+        'blog.Post', author=user, category__is_published=True
+    )
+    response = user_client.post(
+        f'/posts/{post.id}/comment/', data={'text': 'Из очереди'},
+        HTTP_X_FRAGMENT='1',
+    )
+    assert response.status_code == 201
+    comment = Comment.objects.get()
+    assert f'/edit_comment/{comment.id}/' in response.content.decode(), (
+        'После группового коммита фрагмент должен содержать ссылки автора.'
+    )
+
+
+@pytest.mark.django_db
+def test_comment_timeout_response(monkeypatch, mixer, user, user_client):
+    post = mixer.blend(
+        'blog.Post', author=user, category__is_published=True
+    )
+
+    def timeout(comment):
+        raise CommentQueueTimeout('Комментарий не записан за 5 с')
+
+    monkeypatch.setattr('blog.views.save_comment', timeout)
+    url = f'/posts/{post.id}/comment/'
+    response = user_client.post(
+        url, data={'text': 'Текст'}, HTTP_X_FRAGMENT='1'
+    )
+    assert response.status_code == 503, (
+        'Таймаут очереди не должен превращаться в ошибку 500.'
+    )
+    assert response['Retry-After'] == '5'
+    assert 'уже опубликован' in response.json()['errors']['__all__'][0]['message']
+
+    response = user_client.post(url, data={'text': 'Текст'}, follow=True)
+    assert response.redirect_chain[-1][0] == f'/posts/{post.id}/'
+    assert any(
+        'уже опубликован' in str(message) for message in response.context['messages']
+    ), 'Пользователь должен узнать, что комментарий мог сохраниться.'
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Comment, Post
+
+
+@pytest.fixture
+def public_post(mixer, another_user):
+    return mixer.blend(
+        'blog.Post', author=another_user, is_published=True,
+        category__is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+@pytest.mark.django_db
+def test_comment_fragment_without_loading_post(public_post, user_client):
+    url = f'/posts/{public_post.id}/comment/'
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.post(
+            url, data={'text': 'Комментарий через fetch'},
+            HTTP_X_FRAGMENT='1',
+        )
+    assert response.status_code == 201
+    content = response.content.decode()
+    comment = Comment.objects.get()
+    assert 'Комментарий через fetch' in content
+    assert f'/edit_comment/{comment.id}/' in content, (
+        'Фрагмент должен содержать ссылки автора на новый комментарий.'
+    )
+    assert '<html' not in content, 'Ответ fetch-клиенту — только фрагмент.'
+    post_reads = [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith('SELECT')
+        and '"blog_post"."title"' in query['sql']
+    ]
+    assert not post_reads, 'Пост не должен загружаться целиком.'
+    assert Post.objects.get(pk=public_post.pk).comment_count == 1
+
+    response = user_client.post(url, data={'text': ''}, HTTP_X_FRAGMENT='1')
+    assert response.status_code == 400 and 'text' in response.json()['errors']
+
+
+@pytest.mark.django_db
+def test_comment_to_hidden_post_rejected(public_post, user_client):
+    public_post.is_published = False
+    public_post.save()
+    response = user_client.post(
+        f'/posts/{public_post.id}/comment/', data={'text': 'Текст'}
+    )
+    assert response.status_code == 404, (
+        'Комментировать скрытый чужой пост нельзя.'
+    )
+    assert not Comment.objects.exists()
@@ -0,0 +1,32 @@
+from django_bootstrap5.purge import UsedSelectors, purge
+
+CSS = (
+    '@charset "UTF-8";/*! license */'
+    ':root{--bs-blue:#0d6efd}'
+    'body{margin:0}table{width:100%}'
+    '.btn,.card{display:block}.btn:not(.active){opacity:1}'
+    '.modal .btn{color:red}'
+    '@media (min-width:576px){.card{width:1px}.modal{width:2px}}'
+    '@keyframes spin{to{transform:rotate(360deg)}}'
+    '@keyframes unused{to{opacity:0}}'
+    '.card{animation:spin 1s}'
+)
+
+
+def test_purge_keeps_only_used_selectors():
+    used = UsedSelectors(tags={'html', 'body'}).feed(
+        '<div class="card {% if x %}btn{% endif %}"></div>'
+    )
+    purged = purge(CSS, used)
+
+    assert purged.startswith('@charset "UTF-8";\n/*! license */\n'), (
+        'Убедитесь, что очищенный CSS сохраняет `@charset` и лицензию.'
+    )
+    for kept in (':root{', 'body{', '.btn,.card{', '.btn:not(.active){',
+                 '@media (min-width:576px){.card{width:1px}}',
+                 '@keyframes spin'):
+        assert kept in purged, f'Правило `{kept}` должно остаться в CSS.'
+    for dropped in ('table{', '.modal', 'unused'):
+        assert dropped not in purged, (
+            f'Правило `{dropped}` не используется и должно быть удалено.'
+        )
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.core.serializers.base import DeserializationError
+
+from blog.fixtures import JsonArrayReader
+from blog.models import Comment, Post
+
+
+def test_json_array_reader_streams_items_across_chunks():
+    items = [{'pk': pk, 'fields': {'text': 'а' * pk}} for pk in range(50)]
+    stream = io.StringIO(json.dumps(items, ensure_ascii=False))
+    assert list(JsonArrayReader(stream, read_size=7)) == items, (
+        'Убедитесь, что массив разбирается правильно при чтении кусками.'
+    )
+
+
+def test_json_array_reader_stops_on_malformed_item():
+    stream = io.StringIO('[{"pk": 1}, {"pk": 2, "text": "' + 'а' * 100)
+    reader = iter(JsonArrayReader(stream, read_size=7, max_item_size=50))
+    assert next(reader) == {'pk': 1}
+    with pytest.raises(DeserializationError, match='Байт 12'):
+        next(reader)
+
+
+@pytest.mark.django_db
+def test_import_fixture_reports_offset_of_broken_item(tmp_path):
+    path = tmp_path / 'broken.json'
+    path.write_text('[{"model": "blog.location", "pk": 1, ', encoding='utf-8')
+    with pytest.raises(CommandError, match='Байт 1:'):
+        call_command('import_fixture', str(path))
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('name', ['dump.json', 'dump.jsonl.gz'])
+def test_export_import_fixture_round_trip(mixer, user, tmp_path, name):
+    posts = mixer.cycle(3).blend(
+        'blog.Post', author=user, category__is_published=True
+    )
+    mixer.cycle(4).blend('blog.Comment', author=user, post=posts[0])
+    # JSON фикстур, как и у dumpdata, хранит время с точностью до мс.
+    created_at = {
+        post.pk: post.created_at.replace(
+            microsecond=post.created_at.microsecond // 1000 * 1000
+        ) for post in Post.objects.all()
+    }
+    path = tmp_path / name
+    out = io.StringIO()
+
+    call_command('export_fixture', 'auth.user', 'blog', output=str(path),
+                 batch_size=2, stdout=out)
+    Post.objects.all().delete()
+    call_command('import_fixture', str(path), batch_size=2,
+                 ignore_conflicts=True, stdout=out)
+
+    assert {
+        post.pk: post.created_at for post in Post.objects.all()
+    } == created_at, (
+        'Импорт должен восстановить посты с исходными датами создания.'
+    )
+    assert Comment.objects.count() == 4
+    assert Post.objects.get(pk=posts[0].pk).comment_count == 4, (
+        'После импорта счётчик комментариев должен быть пересчитан.'
+    )
@@ -0,0 +1,42 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+from django.utils import timezone
+
+from blog.models import Category, Comment, Location, Post
+
+
+def generate():
+    call_command(
+        'generate_dataset', users=20, categories=3, locations=5, posts=300,
+        unpublished=0.2, scheduled=0.2, batch_size=50, search_index=False,
+        seed=7, stdout=io.StringIO(),
+    )
+    return list(Post.objects.order_by('pk').values_list(
+        'title', 'author__username', 'comment_count'
+    ))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_generate_dataset_is_deterministic_and_consistent(django_user_model):
+    first = generate()
+    assert len(first) == 300
+    assert Post.objects.filter(is_published=False).exists()
+    assert Post.objects.filter(pub_date__gt=timezone.now()).exists(), (
+        'В наборе должны быть отложенные посты.'
+    )
+    counted = Post.objects.annotate(total=Count('comments')).values_list(
+        'comment_count', 'total'
+    )
+    assert all(stored == total for stored, total in counted), (
+        'Счётчики комментариев должны совпадать с числом комментариев.'
+    )
+    assert Comment.objects.exists()
+
+    for model in (Post, Category, Location, django_user_model):
+        model.objects.all().delete()
+    assert generate() == first, (
+        'Одинаковый --seed должен давать одинаковые данные.'
+    )
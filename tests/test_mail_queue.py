@@ -0,0 +1,99 @@
+import pytest
+from django.core.mail import send_mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.mail import claim, send_queued
+from blog.models import OutgoingEmail
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+
+@pytest.fixture
+def queued_mail(tmp_path):
+    with override_settings(
+        EMAIL_BACKEND='blog.mail.QueuedEmailBackend',
+        EMAIL_QUEUE_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+        EMAIL_FILE_PATH=tmp_path,
+    ):
+        yield tmp_path
+
+
+@pytest.mark.django_db
+def test_queued_mail_sent_by_worker(queued_mail):
+    send_mail('Тема', 'Текст письма', 'from@example.com', ['a@example.com'])
+    send_mail('Тема 2', 'Ещё', 'from@example.com', ['b@example.com'])
+    assert OutgoingEmail.objects.count() == 2
+    assert not list(queued_mail.iterdir()), (
+        'Письмо должно отправляться воркером, а не во время запроса.'
+    )
+
+    call_command('send_queued_mail')
+    assert not OutgoingEmail.objects.exists()
+    (sent,) = queued_mail.iterdir()
+    content = sent.read_text()
+    assert 'a@example.com' in content and 'b@example.com' in content, (
+        'Пачка писем должна отправляться через одно соединение.'
+    )
+
+
+@pytest.mark.django_db
+def test_failed_mail_retried_later(queued_mail):
+    send_mail('Тема', 'Текст', 'from@example.com', ['a@example.com'])
+    with override_settings(
+        EMAIL_QUEUE_BACKEND='tests.test_mail_queue.FailingBackend'
+    ):
+        call_command('send_queued_mail')
+        call_command('send_queued_mail')
+    row = OutgoingEmail.objects.get()
+    assert row.attempts == 1, 'Повтор должен ждать задержки.'
+    assert 'SMTP недоступен' in row.last_error
+    assert row.next_attempt_at > timezone.now()
+
+    OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+    call_command('send_queued_mail')
+    assert not OutgoingEmail.objects.exists()
+    assert len(list(queued_mail.iterdir())) == 1
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('Без соединения письма не отправляются.')
+
+
+@pytest.mark.django_db
+def test_batch_postponed_when_connection_fails(queued_mail):
+    send_mail('Тема', 'Текст', 'from@example.com', ['a@example.com'])
+    send_mail('Тема 2', 'Ещё', 'from@example.com', ['b@example.com'])
+    with override_settings(
+        EMAIL_QUEUE_BACKEND='tests.test_mail_queue.UnreachableBackend'
+    ):
+        call_command('send_queued_mail')
+    rows = OutgoingEmail.objects.all()
+    assert [row.attempts for row in rows] == [1, 1], (
+        'Если соединение не открылось, откладывается вся пачка.'
+    )
+    assert all(row.next_attempt_at > timezone.now() for row in rows)
+
+
+@pytest.mark.django_db
+def test_claimed_mail_not_sent_by_another_worker(queued_mail):
+    send_mail('Тема', 'Текст', 'from@example.com', ['a@example.com'])
+    send_mail('Тема 2', 'Ещё', 'from@example.com', ['b@example.com'])
+    (claimed,) = claim(batch_size=1, max_attempts=5)
+    assert send_queued() == (1, 0), (
+        'Второй воркер должен отправить только незахваченные письма.'
+    )
+    assert send_queued() == (0, 0)
+    row = OutgoingEmail.objects.get()
+    assert row.pk == claimed.pk and row.next_attempt_at > timezone.now(), (
+        'Захваченное письмо ждёт окончания аренды.'
+    )
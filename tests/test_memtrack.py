@@ -0,0 +1,30 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from blogicum.memtrack import read_entries
+
+
+@pytest.mark.django_db
+def test_memory_tracking_and_report(tmp_path, mixer, user, client):
+    post = mixer.blend(
+        'blog.Post', author=user, category__is_published=True,
+        is_published=True,
+    )
+    mixer.cycle(30).blend('blog.Comment', post=post, author=user)
+    with override_settings(MEMTRACK_SAMPLE_RATE=1, MEMTRACK_DIR=tmp_path):
+        client.get(f'/posts/{post.pk}/')
+    entries = list(read_entries(tmp_path))
+    assert len(entries) == 1, 'Каждый отобранный запрос должен записываться.'
+    entry = entries[0]
+    assert entry['view'] == 'blog:post_detail'
+    assert entry['peak'] >= entry['retained'] > 0
+    assert any(site['site'].startswith('blog/') for site in entry['sites']), (
+        'Места выделения должны указывать на код проекта.'
+    )
+
+    out = StringIO()
+    call_command('memory_report', dir=tmp_path, stdout=out)
+    assert 'blog:post_detail: 1 запр.' in out.getvalue()
@@ -0,0 +1,59 @@
+import json
+import re
+
+import pytest
+from django.test import override_settings
+
+from blogicum.metrics import registry
+
+INDEX_REQUESTS = re.compile(
+    r'^blogicum_requests_total\{view="blog:index",method="GET",'
+    r'status="200"\} (\S+)$',
+    re.M,
+)
+INDEX_LABELS = {'view': 'blog:index', 'method': 'GET', 'status': '200'}
+
+
+def index_requests(text):
+    match = INDEX_REQUESTS.search(text)
+    return float(match.group(1)) if match else 0.0
+
+
+@pytest.mark.django_db
+def test_metrics_merge_worker_files(tmp_path, client):
+    with override_settings(METRICS_DIR=tmp_path):
+        client.get('/')
+        client.get('/')
+        # Файл другого воркера.
+        (tmp_path / '1.json').write_text(json.dumps({
+            'counters': [[
+                'blogicum_requests_total',
+                [['view', 'blog:index'], ['method', 'GET'],
+                 ['status', '200']],
+                5,
+            ]],
+            'histograms': [],
+        }))
+        own = sum(
+            value for name, labels, value in registry.dump()['counters']
+            if name == 'blogicum_requests_total'
+            and dict(labels) == INDEX_LABELS
+        )
+        response = client.get('/metrics/')
+    assert response.status_code == 200
+    text = response.content.decode()
+    assert own >= 2
+    assert index_requests(text) == own + 5, (
+        'Метрики должны складывать данные всех процессов.'
+    )
+    assert 'blogicum_request_duration_seconds_bucket{view="blog:index",' \
+        'le="+Inf"}' in text
+    assert 'blogicum_db_queries_count{view="blog:index"}' in text
+
+
+@pytest.mark.django_db
+@override_settings(METRICS_ALLOWED_IPS=[])
+def test_metrics_forbidden_for_others(client):
+    assert client.get('/metrics/').status_code == 403, (
+        'Метрики не должны быть доступны посторонним.'
+    )
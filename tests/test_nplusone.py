@@ -0,0 +1,51 @@
+import pytest
+from django.template import engines
+
+from blog.models import Post
+from blogicum.nplusone import NPlusOneError, normalize
+
+
+def test_normalize_drops_literals_and_parameters():
+    assert normalize(
+        "SELECT * FROM blog_post WHERE id = %s AND title = 'a''b' LIMIT 21"
+    ) == normalize('SELECT * FROM blog_post WHERE id = 7 AND title = %s '
+                   'LIMIT 5')
+    assert normalize('WHERE id IN (%s, %s, %s)') == 'WHERE id IN (...)'
+
+
+@pytest.mark.django_db
+def test_detector_reports_repeated_queries_with_origin(
+        mixer, user, nplusone):
+    mixer.cycle(4).blend('blog.Post', author=user)
+    template = engines['django'].from_string(
+        '{% for post in posts %}\n{{ post.author.username }}{% endfor %}'
+    )
+    with nplusone.record():
+        template.render({'posts': Post.objects.all()})
+
+    repeats = nplusone.repeats()
+    assert len(repeats) == 1 and repeats[0].count == 4, (
+        'Детектор должен найти запрос автора, повторённый для каждого поста.'
+    )
+    assert list(repeats[0].origins) == ['<unknown source>:2'], (
+        'Детектор должен указывать строку шаблона, вызвавшую запрос.'
+    )
+    with pytest.raises(NPlusOneError):
+        nplusone.assert_no_repeats()
+
+
+@pytest.mark.django_db
+def test_post_lists_have_constant_query_count(
+        mixer, user, client, nplusone):
+    def blend_posts(count=1):
+        mixer.cycle(count).blend(
+            'blog.Post', author=user, category__is_published=True,
+            location__is_published=True,
+        )
+
+    blend_posts()
+    for url in ('/', f'/profile/{user.username}/'):
+        nplusone.assert_not_growing(
+            lambda: client.get(url), lambda: blend_posts(5)
+        )
+    nplusone.assert_no_repeats()
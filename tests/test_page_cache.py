@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+
+def rendered_page(response):
+    return 'blog/detail.html' in [t.name for t in response.templates]
+
+
+@pytest.fixture
+def public_post(mixer, user):
+    return mixer.blend(
+        'blog.Post', author=user, is_published=True,
+        category__is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+@pytest.mark.django_db
+def test_cached_page_filled_per_user(
+    public_post, user, another_user, client, user_client, another_user_client
+):
+    url = f'/posts/{public_post.id}/'
+    comment_url = f'/posts/{public_post.id}/comment/'
+    edit_url = f'/posts/{public_post.id}/edit/'
+
+    first = client.get(url).content.decode()
+    assert comment_url not in first and 'Войти' in first
+
+    own = user_client.get(url)
+    assert not rendered_page(own), (
+        'Повторный запрос страницы должен отдаваться из кэша страниц.'
+    )
+    content = own.content.decode()
+    assert edit_url in content and comment_url in content, (
+        'Автору в странице из кэша должны подставляться форма комментария '
+        'и ссылки на редактирование.'
+    )
+    assert user.username in content and 'csrfmiddlewaretoken' in content
+    assert '<!--late:' not in content
+
+    content = another_user_client.get(url).content.decode()
+    assert edit_url not in content and comment_url in content
+    assert another_user.username in content
+
+    user_client.post(comment_url, data={'text': 'Новый комментарий'})
+    response = client.get(url)
+    assert rendered_page(response), (
+        'Новый комментарий должен сбрасывать кэш страниц.'
+    )
+    assert 'Новый комментарий' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_hidden_post_not_cached_for_author(public_post, client, user_client):
+    public_post.is_published = False
+    public_post.save()
+    url = f'/posts/{public_post.id}/'
+    response = user_client.get(url)
+    assert response.status_code == 200
+    assert 'private' in response['Cache-Control']
+    assert client.get(url).status_code == 404, (
+        'Скрытый пост, открытый автором, не должен попадать в общий кэш.'
+    )
+
+
+@pytest.mark.django_db
+def test_owner_profile_not_served_from_cache(
+    mixer, user, client, user_client
+):
+    draft = mixer.blend(
+        'blog.Post', author=user, is_published=False,
+        title='Черновик автора',
+    )
+    url = f'/profile/{user.username}/'
+    assert draft.title in user_client.get(url).content.decode()
+    assert draft.title not in client.get(url).content.decode()
+    response = user_client.get(url)
+    assert draft.title in response.content.decode(), (
+        'Владельцу профиля нельзя отдавать закэшированную чужую копию '
+        'страницы: в ней нет его неопубликованных записей.'
+    )
+    assert 'private' in response['Cache-Control']
@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+
+from blog.forms import PickerChoiceField, PostForm
+from blog.models import Category
+
+
+@pytest.mark.django_db
+def test_picker_choices_cached_and_invalidated(
+        mixer, django_assert_num_queries):
+    location = mixer.blend('blog.Location', name='Москва')
+    list(PostForm().fields['location'].choices)
+    with django_assert_num_queries(0):
+        form = PostForm()
+        assert (location.pk, 'Москва') in form.fields['location'].choices
+        assert form.fields['location'].clean(location.pk) == location
+
+    location.name = 'Казань'
+    location.save()
+    assert (location.pk, 'Казань') in PostForm().fields['location'].choices, (
+        'Убедитесь, что кэш вариантов сбрасывается при изменении записи.'
+    )
+
+
+@pytest.mark.django_db
+@override_settings(BLOG_PICKER_CHOICES_LIMIT=1)
+def test_picker_switches_to_autocomplete(mixer, user_client):
+    moscow = mixer.blend('blog.Location', name='Москва')
+    mixer.blend('blog.Location', name='Казань')
+
+    html = str(PostForm()['location'])
+    assert 'data-picker-url' in html and 'Казань' not in html, (
+        'Для больших таблиц форма должна рендерить поле автодополнения.'
+    )
+    response = user_client.get('/choices/location/', {'q': 'мос'})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'results': [{'id': moscow.pk, 'text': 'Москва'}]
+    }
+
+
+@pytest.mark.django_db
+def test_picker_respects_filtered_queryset(mixer):
+    published = mixer.blend('blog.Category', is_published=True)
+    hidden = mixer.blend('blog.Category', is_published=False)
+    field = PickerChoiceField(Category.objects.all())
+    field.limit_choices_to = {'is_published': True}
+    field.queryset = field.queryset.complex_filter(field.limit_choices_to)
+    assert field.clean(published.pk) == published
+    with pytest.raises(ValidationError):
+        field.clean(hidden.pk)
+    assert hidden.pk not in [value for value, _ in field.choices], (
+        'Поле с limit_choices_to не должно брать варианты из общего кэша.'
+    )
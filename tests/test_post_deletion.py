@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog import deletion
+from blog.deletion import delete_pending
+from blog.models import Comment, Post, PostDeletion
+from blog.search import search_post_ids
+
+
+@pytest.fixture
+def post_with_comments(mixer, user):
+    post = mixer.blend(
+        'blog.Post', author=user, is_published=True,
+        category__is_published=True, title='Удаляемая публикация',
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    mixer.cycle(25).blend('blog.Comment', post=post, author=user)
+    post.refresh_from_db()
+    return post
+
+
+@pytest.mark.django_db
+@override_settings(POST_DELETE_CHUNK_SIZE=10, POST_DELETE_DEFER_COMMENTS=None)
+def test_delete_without_loading_comments(post_with_comments, user_client):
+    url = f'/posts/{post_with_comments.id}/delete/'
+    with CaptureQueriesContext(connection) as queries:
+        user_client.post(url)
+    assert not Post.objects.filter(pk=post_with_comments.pk).exists()
+    assert not Comment.objects.exists()
+    sql = [query['sql'] for query in queries.captured_queries]
+    deletes = [
+        index for index, query in enumerate(sql)
+        if query.startswith('DELETE FROM "blog_comment"')
+    ]
+    loads = [
+        index for index, query in enumerate(sql)
+        if query.startswith('SELECT') and '"blog_comment"."text"' in query
+    ]
+    assert len(deletes) == 3, 'Комментарии удаляются кусками по 10.'
+    assert all(index > deletes[-1] for index in loads), (
+        'Комментарии не должны загружаться перед удалением.'
+    )
+
+
+@pytest.mark.django_db
+@override_settings(POST_DELETE_DEFER_COMMENTS=5)
+def test_big_post_hidden_and_deleted_later(post_with_comments, user_client,
+                                           client):
+    post_id = post_with_comments.pk
+    assert search_post_ids('удаляемая', None, 10)[0] == [post_id]
+    user_client.post(f'/posts/{post_id}/delete/')
+    assert Post.objects.filter(pk=post_id, is_published=False).exists(), (
+        'Пост с большой веткой комментариев должен сразу скрываться.'
+    )
+    assert PostDeletion.objects.filter(post_id=post_id).exists()
+    assert client.get(f'/posts/{post_id}/').status_code == 404
+
+    assert delete_pending() == 1
+    assert not Post.objects.filter(pk=post_id).exists()
+    assert not Comment.objects.exists()
+    assert not PostDeletion.objects.exists()
+    assert search_post_ids('удаляемая', None, 10)[0] == [], (
+        'Удалённый пост должен пропасть из поискового индекса.'
+    )
+
+
+@pytest.mark.django_db
+@override_settings(POST_DELETE_DEFER_COMMENTS=5)
+def test_queued_post_cannot_be_republished(post_with_comments, user_client):
+    post_id = post_with_comments.pk
+    user_client.post(f'/posts/{post_id}/delete/')
+    response = user_client.post(f'/posts/{post_id}/edit/', data={
+        'title': 'Снова опубликовано', 'text': 'Текст',
+        'pub_date': timezone.now().strftime('%Y-%m-%dT%H:%M'),
+        'category': post_with_comments.category_id, 'is_published': True,
+    })
+    assert response.status_code == 302
+    post = Post.objects.get(pk=post_id)
+    assert not post.is_published and post.title == 'Удаляемая публикация', (
+        'Пост в очереди на удаление нельзя редактировать.'
+    )
+
+
+@pytest.mark.django_db
+def test_failing_deletion_does_not_block_queue(mixer, user, monkeypatch):
+    broken, other = mixer.cycle(2).blend('blog.Post', author=user)
+    comments = mixer.cycle(2).blend('blog.Comment', post=broken, author=user)
+    PostDeletion.objects.create(post=broken)
+    PostDeletion.objects.create(post=other)
+    delete_post = deletion.delete_post
+
+    def fail_for_broken(post, chunk_size=None):
+        if post.pk == broken.pk:
+            Comment.objects.filter(pk=comments[0].pk).delete()
+            Post.objects.filter(pk=broken.pk).update(comment_count=10)
+            raise RuntimeError('диск заполнен')
+        delete_post(post, chunk_size)
+
+    monkeypatch.setattr(deletion, 'delete_post', fail_for_broken)
+    assert delete_pending() == 1, (
+        'Ошибка удаления одного поста не должна останавливать очередь.'
+    )
+    assert not Post.objects.filter(pk=other.pk).exists()
+    pending = PostDeletion.objects.get()
+    assert pending.post_id == broken.pk and pending.attempts == 1
+    assert 'диск заполнен' in pending.last_error
+    assert Post.objects.get(pk=broken.pk).comment_count == 1, (
+        'После прерванного удаления счётчик комментариев пересчитывается.'
+    )
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+from django.test import override_settings
+
+from blogicum.profiler import make_token, start_window, window_watcher
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    with override_settings(PROFILE_DIR=tmp_path, PROFILE_INTERVAL_MS=1):
+        yield tmp_path
+
+
+@pytest.mark.django_db
+def test_profile_single_request(profiles, user, client, user_client):
+    assert 'X-Profile-File' not in client.get('/', HTTP_X_PROFILE='1'), (
+        'Заголовок X-Profile работает только для персонала.'
+    )
+    user.is_staff = True
+    user.save()
+    response = user_client.get('/', HTTP_X_PROFILE='1')
+    assert (profiles / response['X-Profile-File']).exists()
+
+    token = make_token(user, '/')
+    response = user_client.get('/', {'profile': token})
+    assert (profiles / response['X-Profile-File']).exists(), (
+        'Подписанный токен должен включать профилирование запроса.'
+    )
+    assert 'X-Profile-File' not in client.get('/', {'profile': 'подделка'})
+    assert 'X-Profile-File' not in client.get('/', {'profile': token}), (
+        'Токен действует только в сессии сотрудника, которому выдан.'
+    )
+    assert 'X-Profile-File' not in user_client.get(
+        '/posts/1/', {'profile': token}
+    ), 'Токен действует только на пути, для которого выдан.'
+
+
+@pytest.mark.django_db
+def test_profile_window(profiles, client):
+    window = start_window(0.3)
+    window_watcher._next_check = 0
+    client.get('/')
+    time.sleep(0.6)
+    files = list(profiles.glob(f'window-{window["id"]}-*.collapsed'))
+    assert len(files) == 1, 'Воркер должен записать стеки окна в файл.'
+    assert files[0].read_text(), 'За окно должны накопиться стеки.'
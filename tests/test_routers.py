@@ -0,0 +1,111 @@
+import sqlite3
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.models import Post
+from blogicum.routers import (
+    PIN_COOKIE, ReplicaRouter, RouteState, _route_state, query_counts,
+)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+def test_replica_reads_until_write():
+    router = ReplicaRouter()
+    state = RouteState()
+    token = _route_state.set(state)
+    try:
+        assert router.db_for_read(Post) is None, (
+            'Без пометки read-only представления чтение идёт в основную БД.'
+        )
+        state.use_replica = True
+        assert router.db_for_read(Post) == 'replica'
+        assert router.db_for_read(Session) == 'default'
+        assert router.db_for_read(User) == 'default', (
+            'Сессии и пользователи всегда читаются из основной БД.'
+        )
+        assert router.db_for_write(Post) == 'default'
+        assert router.db_for_read(Post) is None, (
+            'После записи чтения должны идти в основную БД.'
+        )
+    finally:
+        _route_state.reset(token)
+
+    pinned = RouteState(pinned=True)
+    pinned.use_replica = True
+    token = _route_state.set(pinned)
+    try:
+        assert router.db_for_read(Post) is None
+    finally:
+        _route_state.reset(token)
+
+
+@pytest.fixture
+def file_replica(tmp_path):
+    """Снимок основной БД в файле, открытый как реплика через mode=ro."""
+    path = tmp_path / 'replica.sqlite3'
+
+    def copy():
+        target = sqlite3.connect(path)
+        connections['default'].ensure_connection()
+        connections['default'].connection.backup(target)
+        target.close()
+
+    copy()
+    connections.databases['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {'uri': True},
+    }
+    with override_settings(DATABASE_REPLICAS=['replica']):
+        yield copy
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_go_to_file_replica(mixer, user, client, user_client,
+                                  file_replica):
+    category = mixer.blend('blog.Category', is_published=True)
+    yesterday = timezone.now() - timedelta(days=1)
+    copied = mixer.blend(
+        'blog.Post', author=user, title='Пост из копии', is_published=True,
+        category=category, pub_date=yesterday,
+    )
+    file_replica()
+    fresh = mixer.blend(
+        'blog.Post', author=user, title='Пост после копии',
+        is_published=True, category=category, pub_date=yesterday,
+    )
+
+    before = query_counts.copy()
+    content = client.get('/').content.decode()
+    assert copied.title in content and fresh.title not in content, (
+        'Лента должна читаться с реплики, где ещё нет нового поста.'
+    )
+    assert query_counts['replica'] > before['replica']
+    assert query_counts['default'] == before['default'], (
+        'Чтение read-only страницы не должно идти в основную БД.'
+    )
+
+    response = user_client.post(
+        f'/posts/{copied.id}/comment/', data={'text': 'Комментарий'}
+    )
+    assert PIN_COOKIE in response.cookies, (
+        'После записи клиент закрепляется за основной БД.'
+    )
+    assert copied.comments.count() == 1
+    before = query_counts.copy()
+    content = user_client.get('/').content.decode()
+    assert fresh.title in content
+    assert query_counts['replica'] == before['replica'], (
+        'Закреплённый клиент читает только из основной БД.'
+    )
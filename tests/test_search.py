@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from blog.management.commands import rebuild_search_index
+from blog.search import search_post_ids
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_stems_ranks_and_hides_unpublished(mixer, user, user_client):
+    in_title = mixer.blend(
+        'blog.Post', author=user, title='Прогулки по Москве',
+        text='Заметки.', category__is_published=True,
+    )
+    in_text = mixer.blend(
+        'blog.Post', author=user, title='Выходные',
+        text='Долго гуляли по московским улицам и Москва понравилась.',
+        category__is_published=True,
+    )
+    mixer.blend(
+        'blog.Post', author=user, title='Москва', text='Черновик',
+        is_published=False, category__is_published=True,
+    )
+
+    ids, cursor = search_post_ids('москва')
+    assert ids == [in_title.id, in_text.id], (
+        'Убедитесь, что поиск учитывает словоформы, ставит совпадения в '
+        'заголовке выше и не показывает неопубликованные посты.'
+    )
+    assert cursor is None
+
+    first, cursor = search_post_ids('москва', limit=1)
+    second, _ = search_post_ids('москва', cursor=cursor, limit=1)
+    assert first + second == ids, 'Проверьте курсорную пагинацию поиска.'
+
+    response = user_client.get('/search/', {'q': 'Москвой'})
+    assert response.status_code == HTTPStatus.OK
+    assert in_title.title in response.content.decode('utf-8')
+
+    call_command('rebuild_search_index', workers=2, chunk_size=1,
+                 stdout=open('/dev/null', 'w'))
+    assert search_post_ids('москва')[0] == ids, (
+        'Пересборка индекса должна давать те же результаты.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_keeps_posts_saved_during_build(mixer, user, monkeypatch):
+    renamed, removed = mixer.cycle(2).blend(
+        'blog.Post', author=user, title='Черновик заметки',
+        category__is_published=True,
+    )
+    build = rebuild_search_index.Command.build
+
+    def build_and_write(command, *args):
+        build(command, *args)
+        renamed.title = 'Прогулки по Казани'
+        renamed.save()
+        removed.delete()
+        mixer.blend(
+            'blog.Post', author=user, title='Казанский кремль',
+            category__is_published=True,
+        )
+
+    monkeypatch.setattr(rebuild_search_index.Command, 'build',
+                        build_and_write)
+    call_command('rebuild_search_index', workers=1,
+                 stdout=open('/dev/null', 'w'))
+    ids, _ = search_post_ids('казань')
+    assert renamed.id in ids and len(ids) == 2, (
+        'Посты, сохранённые во время пересборки, должны попасть в индекс.'
+    )
+    assert search_post_ids('черновик')[0] == []
@@ -0,0 +1,29 @@
+import pytest
+from django.test import override_settings
+
+from blogicum.timing import reset_view_stats, view_stats
+
+
+@pytest.mark.django_db
+@override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+def test_server_timing_for_staff_and_view_stats(
+        mixer, user, client, user_client):
+    mixer.cycle(3).blend('blog.Post', author=user, category__is_published=True)
+    reset_view_stats()
+
+    assert 'Server-Timing' not in client.get('/'), (
+        'Без выборки анонимам заголовок Server-Timing не отдаётся.'
+    )
+    user.is_staff = True
+    user.save()
+    header = user_client.get('/')['Server-Timing']
+    for metric in ('db;dur=', 'queries', 'render;dur=', 'total;dur='):
+        assert metric in header, (
+            f'Заголовок Server-Timing должен содержать `{metric}`.'
+        )
+
+    stats = view_stats()['blog:index']
+    assert stats['count'] == 2
+    assert stats['queries'] > 0 and stats['render_ms'] > 0, (
+        'Статистика представления должна учитывать SQL и рендеринг.'
+    )
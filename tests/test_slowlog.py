@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from django.test import override_settings
+
+from blogicum.nplusone import normalize
+from blogicum.slowlog import slow_queries
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    path = tmp_path / 'slow.jsonl'
+    slow_queries._last.clear()
+    with override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG_FILE=path):
+        yield path
+    slow_queries.stop()
+    slow_queries._last.clear()
+
+
+def read_entries(path):
+    slow_queries.stop()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.django_db
+def test_slow_queries_logged_with_plan(slow_log, mixer, user, client):
+    mixer.cycle(3).blend('blog.Post', author=user, category__is_published=True)
+    client.get('/')
+    client.get('/')
+    entries = read_entries(slow_log)
+
+    from_index = [entry for entry in entries if entry['view'] == 'blog:index']
+    assert from_index, 'В журнал должны попасть запросы главной страницы.'
+    select = next(
+        entry for entry in from_index
+        if entry['sql'].startswith('SELECT') and 'blog_post' in entry['sql']
+    )
+    assert select['plan'] and any(
+        line.lstrip().startswith(('SCAN', 'SEARCH'))
+        for line in select['plan']
+    ), 'Для SELECT должен сохраняться EXPLAIN QUERY PLAN.'
+    shapes = [normalize(entry['sql']) for entry in entries]
+    assert len(shapes) == len(set(shapes)), (
+        'Одна форма запроса должна записываться не чаще раза за интервал.'
+    )
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from django.test import override_settings
+
+from blogicum.tracing import exporter
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+def read_spans(directory):
+    exporter.flush()
+    traces = [
+        json.loads(line)
+        for path in directory.glob('*.jsonl')
+        for line in path.read_text().splitlines()
+    ]
+    return [
+        [
+            span for resource in trace['resourceSpans']
+            for scope in resource['scopeSpans'] for span in scope['spans']
+        ]
+        for trace in traces
+    ]
+
+
+@pytest.mark.django_db
+def test_request_trace_spans(tmp_path, mixer, user, user_client):
+    mixer.cycle(3).blend('blog.Location')
+    with override_settings(TRACING_SAMPLE_RATE=1, TRACING_DIR=tmp_path):
+        response = user_client.get('/posts/create/')
+    (spans,) = read_spans(tmp_path)
+    by_id = {span['spanId']: span for span in spans}
+    names = {span['name'] for span in spans}
+    for name in ('http.request', 'view', 'sql', 'template.render',
+                 'template.include', 'cache.get'):
+        assert name in names, f'В трассе должен быть спан `{name}`.'
+    assert {span['traceId'] for span in spans} == {response['X-Trace-Id']}
+
+    root = next(span for span in spans if span['name'] == 'http.request')
+    assert 'parentSpanId' not in root
+    for span in spans:
+        if span is not root:
+            assert span['parentSpanId'] in by_id, (
+                'Все спаны должны быть связаны с корневым.'
+            )
+
+
+@pytest.mark.django_db
+def test_traceparent_propagation(tmp_path, client):
+    with override_settings(TRACING_SAMPLE_RATE=1e-9, TRACING_DIR=tmp_path):
+        client.get('/')
+        response = client.get(
+            '/', HTTP_TRACEPARENT=f'00-{TRACE_ID}-{PARENT_ID}-01'
+        )
+    assert response['X-Trace-Id'] == TRACE_ID
+    (spans,) = read_spans(tmp_path)
+    root = next(span for span in spans if span['name'] == 'http.request')
+    assert root['parentSpanId'] == PARENT_ID, (
+        'Трасса должна продолжать переданную в traceparent.'
+    )
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from blog.typeahead import Snapshot, SortedPrefixIndex, typeahead
+
+
+@pytest.fixture
+def fresh_typeahead():
+    typeahead.built_at = typeahead.snapshot = None
+    yield typeahead
+    typeahead.built_at = typeahead.snapshot = None
+
+
+def test_sorted_prefix_index_merges_pending_changes():
+    index = SortedPrefixIndex([('москва', 1), ('минск', 2), ('мурманск', 3)])
+    index.add('можайск', 4)
+    index.remove('минск', 2)
+    assert list(index.search('мо')) == [('можайск', 4), ('москва', 1)], (
+        'Поиск по префиксу должен учитывать добавленные и удалённые ключи.'
+    )
+    index._compact()
+    assert list(index.search('м')) == [
+        ('можайск', 4), ('москва', 1), ('мурманск', 3)
+    ]
+
+
+@pytest.mark.django_db
+def test_typeahead_suggests_visible_posts_and_follows_saves(
+        mixer, user, client, fresh_typeahead):
+    post = mixer.blend(
+        'blog.Post', author=user, title='Прогулки по Москве',
+        category__is_published=True, category__title='Путешествия',
+    )
+    mixer.blend(
+        'blog.Post', author=user, title='Прогулки завтра',
+        pub_date=timezone.now() + timedelta(days=1),
+        category__is_published=True,
+    )
+
+    response = client.get('/typeahead/', {'q': 'прог'})
+    assert response.status_code == HTTPStatus.OK
+    assert [item['text'] for item in response.json()['results']] == [
+        post.title
+    ], 'Подсказки должны содержать только опубликованные посты.'
+
+    post.title = 'Осень в Москве'
+    post.save()
+    assert not fresh_typeahead.suggest('прог'), (
+        'Индекс подсказок должен обновляться при сохранении поста.'
+    )
+    assert fresh_typeahead.suggest('осень')[0]['url'] == (
+        f'/posts/{post.id}/'
+    )
+    assert fresh_typeahead.suggest('пут')[0]['type'] == 'category'
+
+    results = fresh_typeahead.suggest(f'@{user.username[:3]}')
+    assert {'type': 'user', 'text': f'@{user.username}',
+            'url': f'/profile/{user.username}/'} in results
+
+
+@pytest.mark.django_db
+def test_saves_during_rebuild_are_replayed(
+        mixer, user, monkeypatch, fresh_typeahead):
+    post = mixer.blend(
+        'blog.Post', author=user, title='Старый заголовок',
+        category__is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    fresh_typeahead.suggest('стар')
+    read_from_db = Snapshot.build.__func__
+
+    def build_and_save(cls):
+        snapshot = read_from_db(cls)
+        post.title = 'Новый заголовок'
+        post.save()
+        return snapshot
+
+    monkeypatch.setattr(Snapshot, 'build', classmethod(build_and_save))
+    fresh_typeahead.build()
+    assert not fresh_typeahead.suggest('стар')
+    assert [item['text'] for item in fresh_typeahead.suggest('нов')] == [
+        'Новый заголовок'
+    ], 'Сохранение во время пересборки должно попасть в новый снимок.'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_warm_up_builds_index_in_background(mixer, user, fresh_typeahead):
+    mixer.blend(
+        'blog.Post', author=user, title='Разогрев индекса',
+        is_published=True, category__is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    fresh_typeahead.warm_up()
+    # Запрос без индекса ждёт фоновую сборку, а не строит второй снимок.
+    assert [item['text'] for item in fresh_typeahead.suggest('разог')] == [
+        'Разогрев индекса'
+    ], 'Индекс подсказок должен строиться при старте в фоне.'
+    snapshot = fresh_typeahead.snapshot
+    fresh_typeahead.warm_up()
+    assert fresh_typeahead.snapshot is snapshot, (
+        'Построенный индекс не пересобирается повторным разогревом.'
+    )
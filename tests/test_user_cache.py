@@ -0,0 +1,70 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blogicum.usercache import _version_key, user_cache
+
+
+def user_queries(client, url='/'):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    return response, [
+        query for query in queries.captured_queries
+        if 'FROM "auth_user"' in query['sql']
+        and '"auth_user"."id" =' in query['sql']
+    ]
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.mark.django_db
+def test_user_loaded_once_per_process(user, user_client):
+    _, first = user_queries(user_client)
+    response, second = user_queries(user_client)
+    assert first and not second, (
+        'Повторный запрос с той же сессией должен брать пользователя '
+        'из кэша процесса.'
+    )
+    assert response.context['user'] == user
+
+    user.first_name = 'Новое'
+    user.save()
+    response, queries = user_queries(user_client)
+    assert queries, 'Сохранение пользователя должно сбрасывать кэш.'
+    assert response.context['user'].first_name == 'Новое'
+
+
+@pytest.mark.django_db
+def test_password_change_ends_cached_session(user, user_client):
+    user_queries(user_client)
+    user.set_password('новый-пароль-123')
+    user.save()
+    response, _ = user_queries(user_client)
+    assert not response.context['user'].is_authenticated, (
+        'После смены пароля старая сессия не должна работать.'
+    )
+
+
+@pytest.mark.django_db
+def test_shared_version_ends_session_changed_elsewhere(user, user_client):
+    user_queries(user_client)
+    # Другой процесс меняет пароль: его сигнал сбрасывает только свою
+    # запись, а сюда доходит лишь новая версия в общем кэше.
+    user.set_password('новый-пароль-123')
+    type(user).objects.filter(pk=user.pk).update(password=user.password)
+    response, _ = user_queries(user_client)
+    assert response.context['user'].is_authenticated, (
+        'Без новой версии запись процесса ещё используется.'
+    )
+    cache.incr(_version_key(user.pk))
+    response, _ = user_queries(user_client)
+    assert not response.context['user'].is_authenticated, (
+        'Новая версия пользователя в общем кэше должна завершать '
+        'старые сессии в других процессах.'
+    )